@@ -180,6 +180,57 @@ JWT_AUTH_HTTPONLY = True                   # Prevent JavaScript access (XSS prot
 JWT_AUTH_SAMESITE = 'Lax'                 # CSRF protection ('Strict' or 'Lax')
 JWT_AUTH_COOKIE_PATH = '/'                 # Cookie path
 
+# ============================================================================
+# OCR SETTINGS
+# ============================================================================
+
+REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))  # Gunicorn worker timeout; OCR waits must give up (503) well before it
+OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'en').split(',')  # EasyOCR language codes
+OCR_READER_POOL_SIZE = int(os.getenv('OCR_READER_POOL_SIZE', '1'))  # Warm readers per process
+OCR_READER_LEASE_TIMEOUT = int(os.getenv('OCR_READER_LEASE_TIMEOUT', str(max(1, REQUEST_TIMEOUT // 4))))  # Seconds to wait for a free reader before returning 503
+OCR_PRELOAD_READERS = int(os.getenv('OCR_PRELOAD_READERS', '1'))  # Readers loaded before gunicorn forks (0 = lazy)
+OCR_INFERENCE_MODE = os.getenv('OCR_INFERENCE_MODE', 'int8')  # 'int8' (dynamic quantization, EasyOCR's CPU default) or 'fp32'
+OCR_TORCH_THREADS = int(os.getenv('OCR_TORCH_THREADS', '0'))  # Intra-op threads per process (0 = cores / OCR_PAGE_WORKERS); caps governor shares
+OCR_GOVERNOR_ENABLED = os.getenv('OCR_GOVERNOR_ENABLED', 'True') == 'True'  # Cap concurrent inferences across all workers on the node
+OCR_MAX_CONCURRENT_INFERENCES = int(os.getenv('OCR_MAX_CONCURRENT_INFERENCES', '0'))  # 0 = half of OCR_CPU_BUDGET
+OCR_CPU_BUDGET = int(os.getenv('OCR_CPU_BUDGET', '0'))  # Cores shared by concurrent inferences (0 = all cores)
+OCR_GOVERNOR_TIMEOUT = int(os.getenv('OCR_GOVERNOR_TIMEOUT', str(max(1, REQUEST_TIMEOUT // 4))))  # Seconds to wait for a CPU slot before returning 503
+OCR_GOVERNOR_DIR = Path(os.getenv('OCR_GOVERNOR_DIR', BASE_DIR / 'cache' / 'ocr-slots'))  # Slot lock files, shared by all workers on the node
+OCR_SIDECAR_SOCKET = os.getenv('OCR_SIDECAR_SOCKET', '')  # Unix socket of the run_ocr_sidecar process ('' = OCR in each worker)
+OCR_SIDECAR_TIMEOUT = int(os.getenv('OCR_SIDECAR_TIMEOUT', '120'))  # Seconds to wait for each page from the sidecar
+OCR_JOB_HEARTBEAT_TIMEOUT = int(os.getenv('OCR_JOB_HEARTBEAT_TIMEOUT', '300'))  # Seconds without a heartbeat before a running OCR job is requeued
+# Parallel page mode: OCR_PAGE_WORKERS is a node-wide budget of page processes,
+# split evenly between the OCR_WEB_WORKERS web workers, and each process loads its
+# own models. A worker with a share below 2 OCRs pages sequentially, so with the
+# default 2 * cores + 1 gunicorn workers parallel mode needs GUNICORN_WORKERS=1
+# (e.g. next to the OCR sidecar) or OCR_PAGE_WORKERS >= 2 * GUNICORN_WORKERS.
+OCR_PAGE_WORKERS = int(os.getenv('OCR_PAGE_WORKERS', '1'))  # Page processes on the node (1 = sequential)
+OCR_WEB_WORKERS = int(os.getenv('GUNICORN_WORKERS', '1'))  # Web workers on the node (exported by gunicorn_config.py)
+OCR_BATCHED_RECOGNITION = os.getenv('OCR_BATCHED_RECOGNITION', 'False') == 'True'  # Recognize crops of all pages in shared batches
+OCR_RECOGNIZER_BATCH_SIZE = int(os.getenv('OCR_RECOGNIZER_BATCH_SIZE', '32'))  # Crops per recognizer forward pass
+OCR_MAX_UPLOAD_BYTES = int(os.getenv('OCR_MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))  # Per uploaded image or PDF
+OCR_MAX_IMAGE_PIXELS = int(os.getenv('OCR_MAX_IMAGE_PIXELS', '40000000'))  # Checked from the header before decoding
+OCR_PDF_DPI = int(os.getenv('OCR_PDF_DPI', '200'))  # PDF pages are rasterized one at a time at this resolution
+OCR_PDF_MAX_PAGES = int(os.getenv('OCR_PDF_MAX_PAGES', '50'))  # Per uploaded PDF
+OCR_PREPROCESS_ENABLED = os.getenv('OCR_PREPROCESS_ENABLED', 'True') == 'True'  # Normalize pages before detection
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv('OCR_TARGET_TEXT_HEIGHT', '20'))  # Pixels; pages are only ever downscaled
+OCR_PREPROCESS_GRAYSCALE = os.getenv('OCR_PREPROCESS_GRAYSCALE', 'True') == 'True'
+OCR_PREPROCESS_DESKEW = os.getenv('OCR_PREPROCESS_DESKEW', 'False') == 'True'
+OCR_PREPROCESS_CROP_MARGINS = os.getenv('OCR_PREPROCESS_CROP_MARGINS', 'False') == 'True'
+OCR_TABLE_REGION_ENABLED = os.getenv('OCR_TABLE_REGION_ENABLED', 'False') == 'True'  # Only recognize the grades table and a header band
+OCR_TABLE_MIN_COLUMNS = int(os.getenv('OCR_TABLE_MIN_COLUMNS', '3'))  # Detected boxes in a row that make it a table row
+OCR_TABLE_MIN_ROWS = int(os.getenv('OCR_TABLE_MIN_ROWS', '3'))  # Pages with fewer table rows are recognized in full
+OCR_TABLE_HEADER_BAND = float(os.getenv('OCR_TABLE_HEADER_BAND', '0.25'))  # Top fraction of the page always recognized (name, school)
+OCR_REFINE_ENABLED = os.getenv('OCR_REFINE_ENABLED', 'False') == 'True'  # Recognize low-confidence boxes again from upscaled crops
+OCR_REFINE_THRESHOLD = float(os.getenv('OCR_REFINE_THRESHOLD', '0.5'))  # Boxes below this confidence get a second pass
+OCR_REFINE_MAX_CROPS = int(os.getenv('OCR_REFINE_MAX_CROPS', '16'))  # Cap on second-pass boxes per page
+OCR_EXPOSE_TIMINGS = os.getenv('OCR_EXPOSE_TIMINGS', 'False') == 'True'  # Per-stage timings in OCR responses (always on with DEBUG)
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'True') == 'True'  # Reuse results for identical page uploads
+OCR_CACHE_DIR = Path(os.getenv('OCR_CACHE_DIR', BASE_DIR / 'cache' / 'ocr'))  # Shared by all workers on the node
+OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))  # LRU eviction above this size
+OCR_CACHE_RESCAN_INTERVAL = int(os.getenv('OCR_CACHE_RESCAN_INTERVAL', '300'))  # Seconds between directory scans; writes in between only update a size estimate
+STARTUP_FORBIDDEN_MODULES = ['torch', 'easyocr', 'cv2']  # Packages import_time_report fails on if imported at startup (loaded on first OCR)
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -33,6 +33,12 @@ CACHES = {
     }
 }
 
+# Do not share cached OCR results between test runs
+OCR_CACHE_ENABLED = False
+
+# Do not contend for CPU slots with other OCR processes on the machine
+OCR_GOVERNOR_ENABLED = False
+
 # Email backend - console for tests
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 
@@ -0,0 +1,159 @@
+"""
+Import-time profiling of the Django startup path.
+
+Every ``manage.py`` command, test run and worker boot sets Django up and
+loads the URLconf, which imports every app's views and services. The
+profiler runs exactly that in a fresh interpreter under
+``python -X importtime`` and summarizes where the time goes, so a module
+that starts importing something heavy at startup shows up in the report.
+"""
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+# What the interpreter under test runs: setup plus URLconf loading
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+IMPORTTIME_PREFIX = 'import time:'
+
+
+@dataclass
+class ImportRecord:
+    """One line of ``-X importtime`` output"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """
+    Parse ``-X importtime`` output.
+
+    Lines that are not import timings (including the column header) are
+    skipped.
+    """
+    records = []
+
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+
+        try:
+            self_us, cumulative_us, name = line[len(IMPORTTIME_PREFIX):].split('|', 2)
+            record = ImportRecord(
+                module=name.strip(),
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+            )
+        except ValueError:
+            continue
+
+        records.append(record)
+
+    return records
+
+
+def summarize(
+    records: List[ImportRecord],
+    top: int = 20,
+    forbidden: Iterable[str] = ()
+) -> Dict[str, any]:
+    """
+    Summarize parsed import timings.
+
+    Args:
+        records: Output of :func:`parse_importtime`
+        top: Entries per ranking
+        forbidden: Top-level packages that must not be imported at startup
+
+    Returns:
+        Dictionary with the total import time, the slowest imports by
+        cumulative time, the top-level packages by own time and the
+        forbidden packages that were imported
+    """
+    by_package = defaultdict(int)
+    for record in records:
+        by_package[record.module.split('.')[0]] += record.self_us
+
+    imported = {record.module.split('.')[0] for record in records}
+    slowest = sorted(records, key=lambda record: record.cumulative_us, reverse=True)
+
+    return {
+        'modules': len(records),
+        'total_seconds': round(sum(record.self_us for record in records) / 1e6, 3),
+        'slowest': [
+            {
+                'module': record.module,
+                'cumulative_ms': round(record.cumulative_us / 1000, 1),
+                'self_ms': round(record.self_us / 1000, 1),
+            }
+            for record in slowest[:top]
+        ],
+        'packages': [
+            {'package': package, 'self_ms': round(us / 1000, 1)}
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        'forbidden_imported': sorted(set(forbidden) & imported),
+    }
+
+
+def measure_startup(
+    settings_module: Optional[str] = None,
+    top: int = 20,
+    forbidden: Iterable[str] = ()
+) -> Dict[str, any]:
+    """
+    Profile imports of the Django startup path in a fresh interpreter.
+
+    Args:
+        settings_module: DJANGO_SETTINGS_MODULE for the child (default:
+            this process's)
+        top: Entries per ranking
+        forbidden: Top-level packages that must not be imported at startup
+
+    Returns:
+        :func:`summarize` output plus the child's wall time
+
+    Raises:
+        RuntimeError: If the child interpreter fails to start up
+    """
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = (
+        settings_module or os.environ.get('DJANGO_SETTINGS_MODULE') or settings.SETTINGS_MODULE
+    )
+    env['PYTHONPATH'] = os.pathsep.join(
+        path for path in (str(settings.BASE_DIR), env.get('PYTHONPATH')) if path
+    )
+
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - start
+
+    if completed.returncode != 0:
+        errors = [
+            line for line in completed.stderr.splitlines()
+            if not line.startswith(IMPORTTIME_PREFIX)
+        ]
+        raise RuntimeError(f"Startup failed: {' '.join(errors[-3:])}")
+
+    report = summarize(parse_importtime(completed.stderr), top, forbidden)
+    report['wall_seconds'] = round(wall_seconds, 3)
+    report['settings'] = env['DJANGO_SETTINGS_MODULE']
+    return report
@@ -0,0 +1,67 @@
+"""
+Management command that reports import time of the Django startup path.
+"""
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.importtime import measure_startup
+
+
+class Command(BaseCommand):
+    help = 'Profile imports of the Django startup path and fail on slow or forbidden imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Entries per ranking (default: 20)')
+        parser.add_argument('--settings-module', help='Settings to start up with (default: current)')
+        parser.add_argument(
+            '--forbid',
+            action='append',
+            help='Top-level package that must not be imported at startup; '
+                 'repeat for several (default: STARTUP_FORBIDDEN_MODULES)',
+        )
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            help='Exit with an error if total import time exceeds this many seconds',
+        )
+        parser.add_argument('--output', help='Also write the report to this JSON file')
+
+    def handle(self, *args, **options):
+        forbidden = options['forbid'] or getattr(settings, 'STARTUP_FORBIDDEN_MODULES', [])
+
+        try:
+            report = measure_startup(options['settings_module'], options['top'], forbidden)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"Startup with {report['settings']}: {report['modules']} modules, "
+            f"{report['total_seconds']:.2f} s importing, {report['wall_seconds']:.2f} s wall"
+        )
+
+        self.stdout.write('\nSlowest imports (cumulative):')
+        for entry in report['slowest']:
+            self.stdout.write(f"  {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+
+        self.stdout.write('\nPackages (own time):')
+        for entry in report['packages']:
+            self.stdout.write(f"  {entry['self_ms']:>9.1f} ms  {entry['package']}")
+
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"\nReport written to {path}")
+
+        failures = []
+        if report['forbidden_imported']:
+            failures.append(f"imported at startup: {', '.join(report['forbidden_imported'])}")
+        if options['max_seconds'] is not None and report['total_seconds'] > options['max_seconds']:
+            failures.append(
+                f"import time {report['total_seconds']:.2f} s exceeds {options['max_seconds']:.2f} s"
+            )
+        if failures:
+            raise CommandError('; '.join(failures))
+
+        self.stdout.write(self.style.SUCCESS('\nStartup imports OK'))
@@ -0,0 +1,151 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+A deliberately small registry of labelled histograms. Values live in the
+memory of the process that observed them, so every gunicorn worker serves
+its own numbers; scrape each worker or aggregate in Prometheus.
+"""
+import math
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Seconds; spans fast Python stages up to slow model inference on CPU
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects"""
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """Escape a label value"""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Histogram:
+    """
+    Cumulative histogram with optional labels.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], Dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value
+            **labels: One value per label name
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._series[key] = series
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict]:
+        """Return a copy of every labelled series"""
+        with self._lock:
+            return {
+                key: {
+                    'counts': list(series['counts']),
+                    'sum': series['sum'],
+                    'count': series['count'],
+                }
+                for key, series in self._series.items()
+            }
+
+    def reset(self) -> None:
+        """Drop all observations"""
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> str:
+        """Render the histogram in Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+
+        for key, series in sorted(self.snapshot().items()):
+            labels = [
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labelnames, key)
+            ]
+
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                le = ','.join(labels + [f'le="{_format_value(bound)}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+
+            suffix = f"{{{','.join(labels)}}}" if labels else ''
+            lines.append(f"{self.name}_sum{suffix} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{suffix} {series['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Iterable[float]] = None
+    ) -> Histogram:
+        """Return the histogram with this name, creating it if needed"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Histogram(
+                    name, documentation, labelnames, buckets or DEFAULT_BUCKETS
+                )
+                self._metrics[name] = metric
+            return metric
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(metric.render() for metric in metrics)
+
+
+registry = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
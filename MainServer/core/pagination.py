@@ -1,7 +1,12 @@
 """Custom pagination classes"""
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.db.models import Q
 from collections import OrderedDict
+from core.exceptions import ValidationException
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -61,4 +66,125 @@ class SmallResultsSetPagination(PageNumberPagination):
             ('page_size', self.get_page_size(self.request)),
             ('total_pages', self.page.paginator.num_pages),
             ('results', data)
-        ]))
\ No newline at end of file
+        ]))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique, ascending ordering.
+    
+    Each page continues after the last row of the previous one
+    (``WHERE (ordering) > (cursor)``) instead of skipping an OFFSET, so deep
+    pages cost the same index range scan as the first and rows inserted
+    while a client pages through do not shift later pages. The cursor is an
+    opaque token of the last row's ordering values. Pages only go forward
+    and no total count is computed.
+    
+    Subclasses set ``ordering``; its last field must be unique (e.g. ``id``).
+    """
+    ordering = ('id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the rows of the requested page"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        
+        queryset = queryset.order_by(*self.ordering)
+        
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+        
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        
+        return self.page
+    
+    def get_page_size(self, request) -> int:
+        """Requested page size, capped at max_page_size"""
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        
+        return max(1, min(size, self.max_page_size))
+    
+    def after(self, values) -> Q:
+        """
+        Filter for rows ordered after ``values``.
+        
+        The row comparison is expanded into ORs; the extra bound on the
+        leading field lets the database range-scan its index.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            clause = Q(**{f'{field}__gt': values[index]})
+            for previous, value in zip(self.ordering[:index], values[:index]):
+                clause &= Q(**{previous: value})
+            condition |= clause
+        
+        return Q(**{f'{self.ordering[0]}__gte': values[0]}) & condition
+    
+    def encode_cursor(self, row) -> str:
+        """Cursor pointing after ``row``"""
+        values = [getattr(row, field) for field in self.ordering]
+        data = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+    
+    def decode_cursor(self, cursor: str) -> list:
+        """
+        Ordering values of a cursor.
+        
+        Raises:
+            ValidationException: If the cursor is malformed
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, UnicodeError):
+            values = None
+        
+        if (
+            not isinstance(values, list)
+            or len(values) != len(self.ordering)
+            or not all(isinstance(value, (str, int, float)) for value in values)
+        ):
+            raise ValidationException("Invalid cursor", field=self.cursor_query_param)
+        
+        return values
+    
+    def get_next_cursor(self):
+        """Cursor of the next page, or None on the last page"""
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
+    
+    def get_next_link(self):
+        """URL of the next page, or None on the last page"""
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+    
+    def get_first_link(self):
+        """URL of the first page"""
+        return remove_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param
+        )
+    
+    def get_paginated_response(self, data):
+        """Return paginated response with custom format"""
+        return Response(OrderedDict([
+            ('success', True),
+            ('next', self.get_next_link()),
+            ('next_cursor', self.get_next_cursor()),
+            ('first', self.get_first_link()),
+            ('page_size', self.page_size),
+            ('results', data)
+        ]))
@@ -6,13 +6,19 @@ import os
 bind = "0.0.0.0:8000"
 backlog = 2048
 
-# Worker processes
+# Worker processes. Concurrent OCR inferences across all of them are capped
+# by the OCR CPU governor (OCR_MAX_CONCURRENT_INFERENCES).
 workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# Read back by the OCR_WEB_WORKERS setting, which splits the node's
+# OCR_PAGE_WORKERS page processes between the workers
+os.environ["GUNICORN_WORKERS"] = str(workers)
 worker_class = "sync"
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
-timeout = 30
+# Same variable as the REQUEST_TIMEOUT setting, which the OCR reader and CPU
+# slot waits are derived from, so busy workers answer 503 before being killed
+timeout = int(os.getenv("REQUEST_TIMEOUT", 30))
 keepalive = 2
 graceful_timeout = 30
 
@@ -52,6 +58,14 @@ def on_reload(server):
 def when_ready(server):
     """Called just after the server is started"""
     print(f"Gunicorn server is ready. Listening on: {bind}")
+    
+    # Load OCR models in the master so forked workers share them copy-on-write.
+    # With OCR_SIDECAR_SOCKET set the models live in the run_ocr_sidecar
+    # process instead and nothing is loaded here.
+    if preload_app:
+        from torchecker.ocr.reader_pool import warm_reader_pool
+        loaded = warm_reader_pool()
+        print(f"Preloaded {loaded} OCR reader(s)")
 
 def worker_int(worker):
     """Called when a worker receives the SIGINT or SIGQUIT signal"""
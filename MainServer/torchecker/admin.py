@@ -1,6 +1,7 @@
 """Admin configuration for torchecker app"""
 from django.contrib import admin
 from .models import TorTransferee
+from .services.tor_service import TorService
 
 
 @admin.register(TorTransferee)
@@ -65,6 +66,23 @@ class TorTransfereeAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        """Save the entry and refresh its account's student summary"""
+        previous_account_id = form.initial.get('account_id')
+        super().save_model(request, obj, form, change)
+        TorService.refresh_student_summaries([previous_account_id, obj.account_id])
+    
+    def delete_model(self, request, obj):
+        """Delete the entry and refresh its account's student summary"""
+        super().delete_model(request, obj)
+        TorService.refresh_student_summaries([obj.account_id])
+    
+    def delete_queryset(self, request, queryset):
+        """Delete the entries and refresh their accounts' student summaries"""
+        account_ids = set(queryset.values_list('account_id', flat=True))
+        super().delete_queryset(request, queryset)
+        TorService.refresh_student_summaries(account_ids)
+    
     def get_readonly_fields(self, request, obj=None):
         """Make certain fields readonly when editing"""
         if obj:  # Editing existing object
@@ -5,4 +5,7 @@ from django.apps import AppConfig
 class TorcheckerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'torchecker'
-    verbose_name = 'TOR Checker'
\ No newline at end of file
+    verbose_name = 'TOR Checker'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registers system checks)
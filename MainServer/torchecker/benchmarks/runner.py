@@ -0,0 +1,287 @@
+"""
+Benchmark runner for the OCR pipeline.
+
+Runs synthetic pages through ``OCRService.process_image``,
+``sort_ocr_results`` and ``extract_fields_from_lines`` and reports
+throughput, latency percentiles and peak RSS per stage, plus extraction
+accuracy against the ground truth. Reports are plain JSON-serializable
+dicts so runs can be stored and compared across commits.
+"""
+import logging
+import platform
+import resource
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+logger = logging.getLogger(__name__)
+
+REPORT_VERSION = 1
+
+# Metrics compared between reports, and whether higher is better
+COMPARED_METRICS = {
+    'pages_per_sec': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'peak_rss_mb': False,
+}
+
+
+def _reset_peak_rss() -> bool:
+    """Reset this process's peak RSS counter (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """Return this process's peak RSS in megabytes"""
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def git_commit() -> Optional[str]:
+    """Return the current git commit, if run from a checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _versions() -> Dict[str, Optional[str]]:
+    """Versions of the libraries that dominate OCR performance"""
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+
+    for module in ('torch', 'easyocr', 'cv2'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+
+    return versions
+
+
+def score_entries(expected: List[Dict], extracted: List[Dict]) -> Dict[str, int]:
+    """
+    Count ground-truth entries the parser recovered.
+
+    An entry counts as found when its subject code was extracted, and as
+    exact when description, units, grade and remarks match as well.
+    """
+    by_code = {entry['subject_code']: entry for entry in extracted}
+    found = exact = 0
+
+    for entry in expected:
+        match = by_code.get(entry['subject_code'])
+        if match is None:
+            continue
+        found += 1
+        if all(
+            match.get(key) == entry[key]
+            for key in ('subject_description', 'total_academic_units', 'final_grade', 'remarks')
+        ):
+            exact += 1
+
+    return {
+        'expected': len(expected),
+        'extracted': len(extracted),
+        'found': found,
+        'exact': exact,
+    }
+
+
+class StageTimer:
+    """
+    Collects latencies and peak RSS for one pipeline stage.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.peak_rss_mb = 0.0
+        self.rss_scope = 'stage'
+
+    def measure(self, fn: Callable, *args, **kwargs):
+        """Run ``fn`` once, recording its latency and peak RSS"""
+        if not _reset_peak_rss():
+            self.rss_scope = 'process'
+
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        self.peak_rss_mb = max(self.peak_rss_mb, _peak_rss_mb())
+
+        return result
+
+    def summary(self) -> Dict[str, any]:
+        """Aggregate the recorded runs"""
+        if not self.latencies:
+            return {'runs': 0}
+
+        latencies_ms = np.array(self.latencies) * 1000
+        return {
+            'runs': len(self.latencies),
+            'pages_per_sec': round(len(self.latencies) / sum(self.latencies), 3),
+            'mean_ms': round(float(latencies_ms.mean()), 3),
+            'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+            'max_ms': round(float(latencies_ms.max()), 3),
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'peak_rss_scope': self.rss_scope,
+        }
+
+
+class OCRBenchmark:
+    """
+    Runs the OCR pipeline over synthetic pages and builds a report.
+    """
+
+    def __init__(self, ocr_service, run_ocr: bool = True, repeat: int = 1, warmup: int = 1):
+        """
+        Args:
+            ocr_service: OCRService under test
+            run_ocr: Also benchmark end-to-end ``process_image`` (needs
+                EasyOCR); when False only the parser stages run
+            repeat: Times each page is run through each stage
+            warmup: Untimed ``process_image`` calls before measuring, so
+                model loading is not counted
+        """
+        self.ocr_service = ocr_service
+        self.run_ocr = run_ocr
+        self.repeat = max(1, repeat)
+        self.warmup = warmup
+
+    def run(self, pages: List[Dict], config: Optional[Dict] = None) -> Dict[str, any]:
+        """
+        Benchmark the given pages.
+
+        Args:
+            pages: Output of ``synthetic.generate_pages``
+            config: Generator settings to record in the report
+
+        Returns:
+            JSON-serializable report
+        """
+        timers = {
+            name: StageTimer(name)
+            for name in ('process_image', 'sort_ocr_results', 'extract_fields_from_lines')
+        }
+        accuracy = {'ocr': [], 'parser': []}
+
+        if self.run_ocr:
+            for page in pages[:self.warmup]:
+                self.ocr_service.process_image(SimpleUploadedFile(page['name'], page['png']))
+
+            for page in pages:
+                for _ in range(self.repeat):
+                    result = timers['process_image'].measure(
+                        self.ocr_service.process_image,
+                        SimpleUploadedFile(page['name'], page['png'])
+                    )
+                accuracy['ocr'].append(score_entries(page['entries'], result['entries']))
+
+        # The parser stages run on the rendered word boxes, which isolates
+        # them from model accuracy
+        for page in pages:
+            for _ in range(self.repeat):
+                lines = timers['sort_ocr_results'].measure(
+                    self.ocr_service.sort_ocr_results, page['boxes']
+                )
+                structured = timers['extract_fields_from_lines'].measure(
+                    self.ocr_service.extract_fields_from_lines, lines
+                )
+            accuracy['parser'].append(score_entries(page['entries'], structured['entries']))
+
+        return {
+            'version': REPORT_VERSION,
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'git_commit': git_commit(),
+                'host': platform.node(),
+                'versions': _versions(),
+                'settings': {
+                    name: str(getattr(settings, name))
+                    for name in dir(settings) if name.startswith('OCR_')
+                },
+                'config': dict(config or {}, repeat=self.repeat, run_ocr=self.run_ocr),
+                'reader': self._reader_stats(),
+            },
+            'stages': {
+                name: timer.summary() for name, timer in timers.items()
+            },
+            'accuracy': {
+                kind: self._aggregate_accuracy(scores)
+                for kind, scores in accuracy.items() if scores
+            },
+        }
+
+    def _reader_stats(self) -> Optional[Dict[str, any]]:
+        """Inference mode, threads and model load time of the readers used"""
+        pool = getattr(self.ocr_service, 'reader_pool', None)
+        if not self.run_ocr or pool is None:
+            return None
+        return pool.stats()
+
+    @staticmethod
+    def _aggregate_accuracy(scores: List[Dict[str, int]]) -> Dict[str, any]:
+        """Sum per-page scores and add recall ratios"""
+        totals = {
+            key: sum(score[key] for score in scores)
+            for key in ('expected', 'extracted', 'found', 'exact')
+        }
+        expected = totals['expected'] or 1
+        totals['recall'] = round(totals['found'] / expected, 4)
+        totals['exact_recall'] = round(totals['exact'] / expected, 4)
+        return totals
+
+
+def compare_reports(baseline: Dict, current: Dict) -> List[Dict[str, any]]:
+    """
+    Compare two benchmark reports stage by stage.
+
+    Returns:
+        One row per stage and metric with both values, the relative change
+        in percent and whether the change is a regression
+    """
+    rows = []
+
+    for stage, current_stats in current.get('stages', {}).items():
+        baseline_stats = baseline.get('stages', {}).get(stage, {})
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old = baseline_stats.get(metric)
+            new = current_stats.get(metric)
+            if old is None or new is None:
+                continue
+
+            change = ((new - old) / old * 100) if old else 0.0
+            rows.append({
+                'stage': stage,
+                'metric': metric,
+                'baseline': old,
+                'current': new,
+                'change_pct': round(change, 1),
+                'regression': change < 0 if higher_is_better else change > 0,
+            })
+
+    return rows
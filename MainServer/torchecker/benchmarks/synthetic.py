@@ -0,0 +1,264 @@
+"""
+Synthetic TOR pages for OCR benchmarks.
+
+Pages are rendered offline with PIL from a randomly generated transcript,
+so every page comes with its ground truth: the entries the parser should
+extract and the word boxes a perfect detector would return.
+"""
+import io
+import math
+import random
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+DEFAULT_FONTS = ('DejaVuSans.ttf', 'DejaVuSerif.ttf', 'DejaVuSansMono.ttf')
+
+STUDENT_NAMES = [
+    'Juan Dela Cruz', 'Maria Santos', 'Jose Rizal Reyes',
+    'Ana Marie Gonzales', 'Mark Anthony Bautista', 'Kristine Mae Villanueva',
+]
+
+SCHOOL_NAMES = [
+    'Previous State University', 'Saint Mary Institute of Technology',
+    'Central Polytechnic University', 'Eastern Visayas State University',
+]
+
+SUBJECT_PREFIXES = ['CS', 'IT', 'MATH', 'ENG', 'PE', 'NSTP', 'PHYS', 'FIL', 'HIST']
+
+SUBJECT_TITLES = [
+    'Introduction to Computing', 'Computer Programming', 'Data Structures',
+    'Discrete Mathematics', 'Purposive Communication', 'Physical Fitness',
+    'Calculus', 'Modern Physics', 'Readings in Philippine History',
+    'Object Oriented Programming', 'Information Management',
+    'Networking Fundamentals', 'Art Appreciation', 'Ethics',
+    'Web Systems and Technologies', 'Operating Systems', 'Statistics',
+]
+
+GRADES = ['1.0', '1.25', '1.5', '1.75', '2.0', '2.25', '2.5', '2.75', '3.0', '5.0']
+
+SEMESTERS = ['First', 'Second', 'Summer']
+
+# Column x positions as fractions of the page width
+COLUMNS = {
+    'code': 0.06,
+    'description': 0.2,
+    'units': 0.68,
+    'grade': 0.76,
+    'remarks': 0.85,
+}
+
+
+def load_font(name: str, size: int) -> ImageFont.ImageFont:
+    """Load a TrueType font by file name or path, falling back to PIL's"""
+    try:
+        return ImageFont.truetype(name, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def generate_transcript(rng: random.Random, rows: int) -> Dict[str, any]:
+    """
+    Generate the content of one transcript page.
+
+    Args:
+        rng: Random generator
+        rows: Number of subject rows
+
+    Returns:
+        Dictionary with student_name, school_name and terms, each term a
+        dict with semester, school_year and entries
+    """
+    start_year = rng.randint(2015, 2022)
+    terms = []
+    codes = set()
+
+    for index in range(rows):
+        if index % 8 == 0:
+            year = start_year + len(terms) // 2
+            terms.append({
+                'semester': SEMESTERS[len(terms) % 2],
+                'school_year': f"{year}-{year + 1}",
+                'entries': [],
+            })
+
+        code = None
+        while code is None or code in codes:
+            code = f"{rng.choice(SUBJECT_PREFIXES)}{rng.randint(100, 499)}"
+        codes.add(code)
+
+        grade = rng.choice(GRADES)
+        terms[-1]['entries'].append({
+            'subject_code': code,
+            'subject_description': rng.choice(SUBJECT_TITLES),
+            'total_academic_units': float(rng.choice([1, 2, 3, 3, 3, 4, 5])),
+            'final_grade': float(grade),
+            'grade_text': grade,
+            'remarks': 'Failed' if grade == '5.0' else 'Passed',
+        })
+
+    return {
+        'student_name': rng.choice(STUDENT_NAMES),
+        'school_name': rng.choice(SCHOOL_NAMES),
+        'terms': terms,
+    }
+
+
+def _rotate_box(box: List[List[float]], angle: float, center: Sequence[float]) -> List[List[float]]:
+    """Rotate box corners like Image.rotate(angle) rotates the page"""
+    # PIL rotates counter-clockwise; in image coordinates (y down) that is a
+    # negative angle in the usual rotation matrix
+    theta = math.radians(-angle)
+    cos, sin = math.cos(theta), math.sin(theta)
+    cx, cy = center
+    return [
+        [cx + (x - cx) * cos - (y - cy) * sin, cy + (x - cx) * sin + (y - cy) * cos]
+        for x, y in box
+    ]
+
+
+def render_page(
+    transcript: Dict[str, any],
+    font: str = DEFAULT_FONTS[0],
+    font_size: int = 24,
+    width: int = 1700,
+    noise: float = 0.0,
+    rotation: float = 0.0,
+    seed: Optional[int] = None
+) -> Dict[str, any]:
+    """
+    Render a transcript to a page image.
+
+    Args:
+        transcript: Output of :func:`generate_transcript`
+        font: TrueType font file name or path
+        font_size: Text size in pixels
+        width: Page width in pixels; height follows the content
+        noise: Standard deviation of Gaussian pixel noise (0-255 scale)
+        rotation: Page rotation in degrees, counter-clockwise
+        seed: Seed for the noise
+
+    Returns:
+        Dictionary with ``png`` (encoded page), ``image`` (RGB array),
+        ``boxes`` (readtext-style (bbox, text, confidence) tuples for every
+        drawn text cell) and ``entries`` (ground truth entries)
+    """
+    typeface = load_font(font, font_size)
+    line_height = int(font_size * 1.9)
+    margin = int(width * COLUMNS['code'])
+    rows = sum(len(term['entries']) + 2 for term in transcript['terms'])
+    height = margin * 2 + line_height * (rows + 4)
+
+    page = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(page)
+    boxes = []
+
+    def text(x: float, y: float, value: str) -> None:
+        draw.text((x, y), value, fill='black', font=typeface)
+        left, top, right, bottom = draw.textbbox((x, y), value, font=typeface)
+        boxes.append((
+            [[left, top], [right, top], [right, bottom], [left, bottom]],
+            value,
+            1.0,
+        ))
+
+    y = margin
+    text(margin, y, f"Name: {transcript['student_name']}")
+    y += line_height
+    text(margin, y, transcript['school_name'])
+    y += line_height * 2
+
+    entries = []
+    for term in transcript['terms']:
+        text(margin, y, f"{term['semester']} Semester")
+        text(width * COLUMNS['units'], y, term['school_year'])
+        y += line_height
+
+        for entry in term['entries']:
+            text(width * COLUMNS['code'], y, entry['subject_code'])
+            text(width * COLUMNS['description'], y, entry['subject_description'])
+            text(width * COLUMNS['units'], y, f"{entry['total_academic_units']:g}")
+            text(width * COLUMNS['grade'], y, entry['grade_text'])
+            text(width * COLUMNS['remarks'], y, entry['remarks'])
+            y += line_height
+            entries.append({
+                key: entry[key] for key in (
+                    'subject_code', 'subject_description',
+                    'total_academic_units', 'final_grade', 'remarks',
+                )
+            })
+
+        y += line_height
+
+    if rotation:
+        page = page.rotate(rotation, resample=Image.BICUBIC, fillcolor='white')
+        center = (width / 2, height / 2)
+        boxes = [
+            (_rotate_box(box, rotation, center), value, conf)
+            for box, value, conf in boxes
+        ]
+
+    image = np.asarray(page)
+    if noise:
+        rng = np.random.default_rng(seed)
+        noisy = image.astype(np.float32) + rng.normal(0, noise, image.shape)
+        image = np.clip(noisy, 0, 255).astype(np.uint8)
+        page = Image.fromarray(image)
+
+    buffer = io.BytesIO()
+    page.save(buffer, format='PNG')
+
+    return {
+        'png': buffer.getvalue(),
+        'image': image,
+        'boxes': boxes,
+        'entries': entries,
+    }
+
+
+def generate_pages(
+    count: int,
+    rows: int = 24,
+    fonts: Sequence[str] = DEFAULT_FONTS,
+    font_size: int = 24,
+    noise: float = 0.0,
+    rotation: float = 0.0,
+    seed: int = 0
+) -> List[Dict[str, any]]:
+    """
+    Generate a reproducible set of synthetic pages.
+
+    Fonts are cycled across pages, and each page is rotated by a random
+    angle within +/- ``rotation`` degrees.
+
+    Returns:
+        List of :func:`render_page` results with ``name``, ``font``,
+        ``rotation``, ``student_name`` and ``school_name`` added
+    """
+    rng = random.Random(seed)
+    pages = []
+
+    for index in range(count):
+        transcript = generate_transcript(rng, rows)
+        font = fonts[index % len(fonts)]
+        angle = round(rng.uniform(-rotation, rotation), 2) if rotation else 0.0
+
+        page = render_page(
+            transcript,
+            font=font,
+            font_size=font_size,
+            noise=noise,
+            rotation=angle,
+            seed=seed + index,
+        )
+        page.update({
+            'name': f"synthetic-{seed}-{index + 1}.png",
+            'font': font,
+            'rotation': angle,
+            'student_name': transcript['student_name'],
+            'school_name': transcript['school_name'],
+        })
+        pages.append(page)
+
+    return pages
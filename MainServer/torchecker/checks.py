@@ -0,0 +1,31 @@
+"""
+System checks for torchecker settings.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.compatibility)
+def check_ocr_timeouts(app_configs, **kwargs):
+    """
+    Check OCR waits end before the gunicorn worker timeout.
+
+    A page waits for a reader and then for a CPU slot. If those waits can
+    outlast REQUEST_TIMEOUT, gunicorn kills the busy worker (502) before it
+    can answer 503 OCR_BUSY.
+    """
+    request_timeout = getattr(settings, 'REQUEST_TIMEOUT', 30)
+    waits = (
+        getattr(settings, 'OCR_READER_LEASE_TIMEOUT', 0)
+        + getattr(settings, 'OCR_GOVERNOR_TIMEOUT', 0)
+    )
+
+    if waits >= request_timeout:
+        return [Error(
+            f"OCR_READER_LEASE_TIMEOUT + OCR_GOVERNOR_TIMEOUT ({waits}s) must be "
+            f"below REQUEST_TIMEOUT ({request_timeout}s)",
+            hint='Lower the OCR wait timeouts or raise REQUEST_TIMEOUT (gunicorn timeout).',
+            id='torchecker.E001',
+        )]
+
+    return []
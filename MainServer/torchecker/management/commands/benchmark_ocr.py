@@ -0,0 +1,178 @@
+"""
+Management command that benchmarks the OCR pipeline on synthetic pages.
+"""
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from torchecker.benchmarks.runner import OCRBenchmark, compare_reports
+from torchecker.benchmarks.synthetic import DEFAULT_FONTS, generate_pages
+from torchecker.ocr.reader_pool import (
+    EASYOCR_AVAILABLE,
+    INFERENCE_MODES,
+    ReaderPool,
+    default_torch_threads,
+)
+from torchecker.services.ocr_service import OCRService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark OCR throughput, latency and memory on synthetic TOR pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=10, help='Pages to generate (default: 10)')
+        parser.add_argument('--rows', type=int, default=24, help='Subject rows per page (default: 24)')
+        parser.add_argument(
+            '--font',
+            action='append',
+            dest='fonts',
+            help='TrueType font file or path; repeat to cycle fonts across pages',
+        )
+        parser.add_argument('--font-size', type=int, default=24, help='Text size in pixels (default: 24)')
+        parser.add_argument('--noise', type=float, default=0.0, help='Gaussian noise std dev, 0-255 (default: 0)')
+        parser.add_argument(
+            '--rotation',
+            type=float,
+            default=0.0,
+            help='Rotate each page by a random angle within +/- this many degrees',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--repeat', type=int, default=1, help='Runs per page and stage (default: 1)')
+        parser.add_argument(
+            '--skip-ocr',
+            action='store_true',
+            help='Only benchmark sorting and extraction, without EasyOCR',
+        )
+        parser.add_argument(
+            '--inference-mode',
+            choices=INFERENCE_MODES,
+            help='Reader inference mode (default: OCR_INFERENCE_MODE)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Torch intra-op threads, 0 for one per core (default: from settings)',
+        )
+        parser.add_argument(
+            '--use-cache',
+            action='store_true',
+            help='Leave the OCR result cache enabled (disabled by default)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Report path (default: benchmarks/ocr-<commit>-<time>.json)',
+        )
+        parser.add_argument('--compare', help='Baseline report to compare against')
+        parser.add_argument(
+            '--fail-threshold',
+            type=float,
+            help='Exit with an error if any metric regresses by more than this percentage',
+        )
+
+    def handle(self, *args, **options):
+        run_ocr = not options['skip_ocr']
+        if run_ocr and not EASYOCR_AVAILABLE:
+            raise CommandError('EasyOCR is not installed; use --skip-ocr to benchmark the parser only')
+
+        config = {
+            'pages': options['pages'],
+            'rows': options['rows'],
+            'fonts': options['fonts'] or list(DEFAULT_FONTS),
+            'font_size': options['font_size'],
+            'noise': options['noise'],
+            'rotation': options['rotation'],
+            'seed': options['seed'],
+            'inference_mode': options['inference_mode'] or settings.OCR_INFERENCE_MODE,
+            'threads': default_torch_threads() if options['threads'] is None else options['threads'],
+        }
+
+        self.stdout.write(f"Rendering {config['pages']} synthetic pages...")
+        pages = generate_pages(
+            config['pages'],
+            rows=config['rows'],
+            fonts=config['fonts'],
+            font_size=config['font_size'],
+            noise=config['noise'],
+            rotation=config['rotation'],
+            seed=config['seed'],
+        )
+
+        # A dedicated pool, so the mode and threads apply even when the
+        # process-wide pool was already built with other settings
+        reader_pool = None
+        if run_ocr:
+            reader_pool = ReaderPool(
+                languages=settings.OCR_LANGUAGES,
+                inference_mode=config['inference_mode'],
+                threads=config['threads'],
+            )
+
+        benchmark = OCRBenchmark(
+            OCRService(reader_pool=reader_pool), run_ocr=run_ocr, repeat=options['repeat']
+        )
+        with override_settings(OCR_CACHE_ENABLED=options['use_cache'] and settings.OCR_CACHE_ENABLED):
+            report = benchmark.run(pages, config)
+
+        self.print_report(report)
+
+        output = Path(options['output'] or self.default_output(report))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Report written to {output}"))
+
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline report: {e}")
+
+            rows = compare_reports(baseline, report)
+            self.print_comparison(baseline, rows)
+
+            threshold = options['fail_threshold']
+            if threshold is not None:
+                regressions = [
+                    row for row in rows
+                    if row['regression'] and abs(row['change_pct']) > threshold
+                ]
+                if regressions:
+                    raise CommandError(
+                        f"{len(regressions)} metrics regressed by more than {threshold}%"
+                    )
+
+    @staticmethod
+    def default_output(report):
+        """Report path under BASE_DIR/benchmarks named by commit and time"""
+        stamp = report['meta']['timestamp'].replace(':', '').replace('+0000', 'Z')
+        commit = report['meta']['git_commit'] or 'nogit'
+        return Path(settings.BASE_DIR) / 'benchmarks' / f"ocr-{commit}-{stamp}.json"
+
+    def print_report(self, report):
+        """Print stage and accuracy summaries"""
+        self.stdout.write(f"\n{'stage':<28}{'runs':>6}{'pages/s':>11}{'p50 ms':>11}{'p95 ms':>11}{'peak MB':>10}")
+        for stage, stats in report['stages'].items():
+            if not stats['runs']:
+                continue
+            self.stdout.write(
+                f"{stage:<28}{stats['runs']:>6}{stats['pages_per_sec']:>11.2f}"
+                f"{stats['p50_ms']:>11.2f}{stats['p95_ms']:>11.2f}{stats['peak_rss_mb']:>10.1f}"
+            )
+
+        for kind, scores in report['accuracy'].items():
+            self.stdout.write(
+                f"{kind} accuracy: {scores['found']}/{scores['expected']} entries found "
+                f"(recall {scores['recall']:.2%}, exact {scores['exact_recall']:.2%})"
+            )
+        self.stdout.write('')
+
+    def print_comparison(self, baseline, rows):
+        """Print per-metric changes against a baseline report"""
+        self.stdout.write(f"Compared with {baseline['meta'].get('git_commit') or 'baseline'}:")
+        for row in rows:
+            line = (
+                f"  {row['stage']:<28}{row['metric']:<15}"
+                f"{row['baseline']:>11.2f} -> {row['current']:>11.2f} ({row['change_pct']:+.1f}%)"
+            )
+            style = self.style.ERROR if row['regression'] and abs(row['change_pct']) >= 5 else self.style.SUCCESS
+            self.stdout.write(style(line))
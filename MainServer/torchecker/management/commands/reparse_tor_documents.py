@@ -0,0 +1,146 @@
+"""
+Management command that re-parses stored OCR boxes.
+
+Pages whose entries came from an older parser are run through line grouping
+and field extraction again, from their stored boxes and without the OCR
+models, and their TorTransferee entries are replaced. Parsing is spread
+over a process pool one batch of pages at a time; results are written from
+this process, one transaction per page.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from torchecker.models import TorDocumentPage
+from torchecker.ocr.boxes import reparse_packed
+from torchecker.services.ocr_service import OCRService
+from torchecker.services.tor_service import TorService
+
+
+class Command(BaseCommand):
+    help = 'Re-run TOR field extraction over stored OCR boxes without re-running OCR'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account-id', help='Only re-parse documents of this account')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-parse pages already extracted with the current parser version',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Pages loaded and parsed per batch (default: 200)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Parser processes, 1 to parse in this process (default: up to 4)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Parse and report entry counts without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be at least 1')
+
+        parser_version = OCRService.PARSER_VERSION
+
+        pages = TorDocumentPage.objects.all()
+        if options['account_id']:
+            pages = pages.filter(document__account_id=options['account_id'])
+        if not options['force']:
+            pages = pages.exclude(parser_version=parser_version)
+
+        # Document order keeps a document's pages together, so names found on
+        # one page carry over to the next as they do during upload
+        page_ids = list(
+            pages.order_by('document_id', 'page_number').values_list('id', flat=True)
+        )
+        if not page_ids:
+            self.stdout.write('No pages to re-parse')
+            return
+
+        workers = options['workers']
+        executor = None
+        if workers > 1:
+            # spawn: the parser processes need neither Django nor this
+            # process's DB connections
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+
+        totals = {'pages': 0, 'before': 0, 'after': 0, 'unreadable': 0}
+        carried = {'document_id': None, 'student_name': None, 'school_name': None}
+
+        try:
+            for start in range(0, len(page_ids), options['batch_size']):
+                batch_ids = page_ids[start:start + options['batch_size']]
+                batch = list(
+                    TorDocumentPage.objects.filter(id__in=batch_ids)
+                    .select_related('document')
+                    .annotate(entry_count=Count('entries'))
+                    .order_by('document_id', 'page_number')
+                )
+
+                parsed = dict(self._parse(batch, executor, workers))
+
+                for page in batch:
+                    structured = parsed.get(page.id)
+                    if structured is None:
+                        totals['unreadable'] += 1
+                        self.stderr.write(f"Page {page.id}: stored boxes could not be read")
+                        continue
+
+                    if carried['document_id'] != page.document_id:
+                        carried.update(document_id=page.document_id, student_name=None, school_name=None)
+                    carried['student_name'] = carried['student_name'] or structured['student_name']
+                    carried['school_name'] = carried['school_name'] or structured['school_name']
+
+                    totals['pages'] += 1
+                    totals['before'] += page.entry_count
+                    totals['after'] += len(structured['entries'])
+
+                    if not options['dry_run']:
+                        TorService.replace_page_entries(
+                            page,
+                            structured['entries'],
+                            carried['student_name'],
+                            carried['school_name'],
+                            parser_version
+                        )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        verb = 'Would re-parse' if options['dry_run'] else 'Re-parsed'
+        summary = (
+            f"{verb} {totals['pages']} pages with parser v{parser_version}: "
+            f"{totals['before']} entries before, {totals['after']} after"
+        )
+        if totals['unreadable']:
+            summary += f" ({totals['unreadable']} unreadable)"
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    @staticmethod
+    def _parse(pages, executor, workers):
+        """Parse a batch of pages, split into one chunk per worker"""
+        items = [(page.id, bytes(page.boxes)) for page in pages]
+
+        if executor is None:
+            return reparse_packed(items)
+
+        size = -(-len(items) // workers)
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        return [
+            result
+            for chunk_results in executor.map(reparse_packed, chunks)
+            for result in chunk_results
+        ]
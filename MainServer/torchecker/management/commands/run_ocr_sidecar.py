@@ -0,0 +1,49 @@
+"""
+Management command that runs the OCR sidecar.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from torchecker.ocr.reader_pool import EASYOCR_AVAILABLE
+from torchecker.ocr.sidecar import SidecarServer
+from torchecker.services.ocr_service import OCRService
+
+
+class Command(BaseCommand):
+    help = 'Serve OCR requests from web workers over a local Unix socket'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            help='Socket path to listen on (default: OCR_SIDECAR_SOCKET)',
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            help='Readers to load before accepting requests '
+                 '(default: OCR_READER_POOL_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['socket'] or getattr(settings, 'OCR_SIDECAR_SOCKET', '')
+        if not path:
+            raise CommandError('Set OCR_SIDECAR_SOCKET or pass --socket')
+        if not EASYOCR_AVAILABLE:
+            raise CommandError('EasyOCR is not installed')
+
+        ocr_service = OCRService(in_process=True)
+
+        readers = options['readers'] or getattr(settings, 'OCR_READER_POOL_SIZE', 1)
+        loaded = ocr_service.reader_pool.warm(readers)
+        self.stdout.write(f"Loaded {loaded} OCR reader(s)")
+
+        server = SidecarServer(path, ocr_service)
+        self.stdout.write(self.style.SUCCESS(f"OCR sidecar listening on {path}"))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+        self.stdout.write(self.style.SUCCESS('OCR sidecar stopped'))
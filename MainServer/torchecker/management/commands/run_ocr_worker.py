@@ -0,0 +1,63 @@
+"""
+Management command that runs queued OCR jobs.
+"""
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from torchecker.services.ocr_job_service import OcrJobService
+from torchecker.services.ocr_service import OCRService
+
+
+class Command(BaseCommand):
+    help = 'Process queued OCR jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process all queued jobs and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--requeue-stale',
+            type=int,
+            default=settings.OCR_JOB_HEARTBEAT_TIMEOUT,
+            help='Before each claim, requeue running jobs without a heartbeat for '
+                 'this many seconds (default: OCR_JOB_HEARTBEAT_TIMEOUT, 0 disables)',
+        )
+
+    def handle(self, *args, **options):
+        # One service per worker so the reader stays warm between jobs
+        ocr_service = OCRService()
+
+        self.stdout.write(self.style.SUCCESS('OCR worker started'))
+
+        try:
+            while True:
+                close_old_connections()
+                # Jobs of crashed workers, including this one before a restart
+                if options['requeue_stale']:
+                    OcrJobService.requeue_stale_jobs(options['requeue_stale'])
+                job = OcrJobService.claim_next_job()
+
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                job = OcrJobService.run_job(job, ocr_service=ocr_service)
+                self.stdout.write(
+                    f"Job {job.id}: {job.status} "
+                    f"({job.processed_pages}/{job.total_pages} pages)"
+                )
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('OCR worker stopped'))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-17 04:35
+
+import core.validators
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('torchecker', '0003_tordocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcrJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('account_id', models.CharField(db_index=True, help_text='Student account identifier', max_length=100, validators=[core.validators.validate_account_id])),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', help_text='Current job status', max_length=20)),
+                ('total_pages', models.PositiveIntegerField(default=0)),
+                ('processed_pages', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, help_text='Final OCR payload (ocr_results, school_tor, ...)', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'OCR Job',
+                'verbose_name_plural': 'OCR Jobs',
+                'db_table': 'ocr_job',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='ocr_job_status_508727_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OcrJobPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('document', models.ForeignKey(help_text='Stored page image', on_delete=django.db.models.deletion.CASCADE, related_name='ocr_pages', to='torchecker.tordocument')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='torchecker.ocrjob')),
+            ],
+            options={
+                'verbose_name': 'OCR Job Page',
+                'verbose_name_plural': 'OCR Job Pages',
+                'db_table': 'ocr_job_page',
+                'ordering': ['job', 'page_number'],
+                'constraints': [models.UniqueConstraint(fields=('job', 'page_number'), name='unique_ocr_job_page')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 05:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('torchecker', '0004_ocr_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjobpage',
+            name='source_page',
+            field=models.PositiveIntegerField(blank=True, help_text='Page within the stored PDF (empty for images)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='ocrjobpage',
+            name='document',
+            field=models.ForeignKey(help_text='Stored page image or PDF', on_delete=django.db.models.deletion.CASCADE, related_name='ocr_pages', to='torchecker.tordocument'),
+        ),
+        migrations.AlterField(
+            model_name='tordocument',
+            name='file',
+            field=models.FileField(help_text='Uploaded TOR image or PDF', upload_to='tor_documents/%Y/%m/'),
+        ),
+    ]
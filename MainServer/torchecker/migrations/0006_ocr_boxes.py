@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-17 05:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('torchecker', '0005_pdf_pages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TorDocumentPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField(default=1, help_text='Page within the document (1 for images)')),
+                ('boxes', models.BinaryField(help_text="Packed readtext output (gzip'd JSON)")),
+                ('box_count', models.PositiveIntegerField(default=0)),
+                ('parser_version', models.CharField(help_text='Parser version that produced the saved entries', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='torchecker.tordocument')),
+            ],
+            options={
+                'verbose_name': 'TOR Document Page',
+                'verbose_name_plural': 'TOR Document Pages',
+                'db_table': 'tor_document_page',
+                'ordering': ['document', 'page_number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tortransferee',
+            name='source_page',
+            field=models.ForeignKey(blank=True, help_text='OCR page the entry was extracted from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='entries', to='torchecker.tordocumentpage'),
+        ),
+        migrations.AddIndex(
+            model_name='tordocumentpage',
+            index=models.Index(fields=['parser_version'], name='tor_documen_parser__2d1049_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tordocumentpage',
+            constraint=models.UniqueConstraint(fields=('document', 'page_number'), name='unique_tor_document_page'),
+        ),
+    ]
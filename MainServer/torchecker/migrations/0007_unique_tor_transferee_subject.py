@@ -0,0 +1,87 @@
+# Generated by Django 5.2 on 2026-10-17 05:52
+"""
+Make TOR entries unique per dated subject taking.
+
+Entries whose school year or semester is empty or "Unknown" (after
+stripping whitespace) are not deduplicated: two of them may be a subject
+and its retake. Older duplicates of dated takings are copied to the
+``tor_transferee_removed_0007`` table before being deleted. The table is
+not managed by Django; once its rows have been reviewed (or restored), drop
+it with ``python manage.py dbshell`` and
+``DROP TABLE tor_transferee_removed_0007;``.
+"""
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Max
+
+from torchecker.models import sync_dated
+
+logger = logging.getLogger(__name__)
+
+# Removed duplicates are copied here instead of being dropped
+ARCHIVE_TABLE = 'tor_transferee_removed_0007'
+
+
+def mark_dated_entries(apps, schema_editor):
+    """Set ``dated`` exactly as TorTransferee.save() would"""
+    TorTransferee = apps.get_model('torchecker', 'TorTransferee')
+
+    sync_dated(TorTransferee.objects.all())
+
+
+def archive_duplicate_entries(apps, schema_editor):
+    """
+    Keep only the most recent row of each dated subject taking.
+
+    Entries without a school year or semester are left alone: two of them
+    may be a subject and its retake, so they are never merged. The older
+    duplicates of dated takings are copied to ARCHIVE_TABLE (created only
+    when there are any) before they are deleted; see the module docstring
+    for dropping it.
+    """
+    TorTransferee = apps.get_model('torchecker', 'TorTransferee')
+
+    latest = (
+        TorTransferee.objects
+        .filter(dated=True)
+        .values('account_id', 'subject_code', 'school_year_offered', 'semester')
+        .annotate(latest_id=Max('id'))
+        .values('latest_id')
+    )
+    duplicates = TorTransferee.objects.filter(dated=True).exclude(id__in=latest)
+
+    if not duplicates.exists():
+        return
+
+    sql, params = duplicates.query.sql_with_params()
+    schema_editor.execute(
+        f"CREATE TABLE {schema_editor.quote_name(ARCHIVE_TABLE)} AS {sql}", params
+    )
+    removed, _ = duplicates.delete()
+    logger.warning(
+        f"Removed {removed} duplicate TOR entries; copies are in {ARCHIVE_TABLE} "
+        f"(drop it once reviewed)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('torchecker', '0006_ocr_boxes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tortransferee',
+            name='dated',
+            field=models.BooleanField(editable=False, help_text='True when school year and semester are known, else NULL', null=True),
+        ),
+        migrations.RunPython(mark_dated_entries, migrations.RunPython.noop),
+        migrations.RunPython(archive_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tortransferee',
+            constraint=models.UniqueConstraint(fields=('account_id', 'subject_code', 'school_year_offered', 'semester', 'dated'), name='unique_tor_transferee_subject'),
+        ),
+    ]
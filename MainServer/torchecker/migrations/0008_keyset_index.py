@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-17 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('torchecker', '0007_unique_tor_transferee_subject'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tortransferee',
+            name='tor_transfe_account_df0e10_idx',
+        ),
+        migrations.AddIndex(
+            model_name='tortransferee',
+            index=models.Index(fields=['account_id', 'subject_code', 'id'], name='tor_transfe_account_1c6e44_idx'),
+        ),
+    ]
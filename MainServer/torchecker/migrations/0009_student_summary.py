@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-17 05:58
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def build_summaries(apps, schema_editor):
+    """Summarize the entries saved before the summary table existed"""
+    TorTransferee = apps.get_model('torchecker', 'TorTransferee')
+    TorStudentSummary = apps.get_model('torchecker', 'TorStudentSummary')
+
+    groups = (
+        TorTransferee.objects
+        .values('account_id', 'student_name', 'school_name')
+        .annotate(entry_count=Count('id'), last_upload_at=Max('updated_at'))
+        .order_by()
+    )
+    TorStudentSummary.objects.bulk_create(
+        (TorStudentSummary(**group) for group in groups.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('torchecker', '0008_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TorStudentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_id', models.CharField(help_text='Student account identifier', max_length=100)),
+                ('student_name', models.CharField(max_length=100)),
+                ('school_name', models.CharField(max_length=255)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('last_upload_at', models.DateTimeField(help_text='Latest save of any of the entries')),
+            ],
+            options={
+                'verbose_name': 'TOR Student Summary',
+                'verbose_name_plural': 'TOR Student Summaries',
+                'db_table': 'tor_student_summary',
+                'ordering': ['student_name', 'id'],
+                'indexes': [models.Index(fields=['student_name', 'id'], name='tor_student_student_bd5833_idx')],
+                'constraints': [models.UniqueConstraint(fields=('account_id', 'student_name', 'school_name'), name='unique_tor_student_summary')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
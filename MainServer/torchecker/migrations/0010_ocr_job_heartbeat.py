@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-17 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('torchecker', '0009_student_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last sign of life from the worker running the job', null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrjobpage',
+            name='result',
+            field=models.JSONField(blank=True, help_text='Names and saved entries of the page, for rebuilding the job result', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ocrjob',
+            index=models.Index(fields=['status', 'heartbeat_at'], name='ocr_job_status_7602a0_idx'),
+        ),
+    ]
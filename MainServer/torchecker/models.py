@@ -1,7 +1,8 @@
 """
 TOR (Transcript of Records) models with improved validation.
 """
-from django.db import models
+import uuid
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from core.validators import (
     validate_account_id,
@@ -12,6 +13,86 @@ from core.validators import (
 )
 
 
+# School year / semester values that do not identify a taking (compared
+# after stripping whitespace and lowercasing)
+UNDATED_VALUES = ('', 'unknown')
+
+# Fields that decide TorTransferee.dated
+DATED_SOURCE_FIELDS = ('school_year_offered', 'semester')
+
+
+def dated_marker(school_year_offered, semester):
+    """
+    Value of ``TorTransferee.dated`` for a school year and semester.
+    
+    Returns:
+        True if both are known, else None
+    """
+    for value in (school_year_offered, semester):
+        if (value or '').strip().lower() in UNDATED_VALUES:
+            return None
+    return True
+
+
+def sync_dated(queryset, batch_size=1000):
+    """
+    Recompute ``dated`` for the rows of a TorTransferee queryset.
+    
+    Values are normalized in Python with :func:`dated_marker`, so rows get
+    the same flag here as when they are saved. Also used by migration 0007.
+    
+    Args:
+        queryset: Rows to update (current or historical model)
+        batch_size: Rows per UPDATE statement
+    """
+    manager = queryset.model._base_manager
+    ids = {True: [], None: []}
+    
+    for pk, school_year_offered, semester in queryset.values_list(
+        'pk', *DATED_SOURCE_FIELDS
+    ).iterator(chunk_size=batch_size):
+        ids[dated_marker(school_year_offered, semester)].append(pk)
+    
+    for value, pks in ids.items():
+        for start in range(0, len(pks), batch_size):
+            manager.filter(pk__in=pks[start:start + batch_size]).update(dated=value)
+
+
+class TorTransfereeQuerySet(models.QuerySet):
+    """
+    Keeps ``dated`` in step with the school year and semester on bulk
+    writes, which bypass :meth:`TorTransferee.save`.
+    """
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.dated = dated_marker(obj.school_year_offered, obj.semester)
+        return super().bulk_create(objs, *args, **kwargs)
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if any(field in DATED_SOURCE_FIELDS for field in fields):
+            objs = list(objs)
+            for obj in objs:
+                obj.dated = dated_marker(obj.school_year_offered, obj.semester)
+            if 'dated' not in fields:
+                fields = [*fields, 'dated']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+    
+    def update(self, **kwargs):
+        # bulk_update() passes the dated values it computed itself
+        if 'dated' in kwargs or not any(field in kwargs for field in DATED_SOURCE_FIELDS):
+            return super().update(**kwargs)
+        
+        # The new values may be expressions, so they are read back. Rows
+        # are undated (never conflicting) until then.
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            updated = super().update(dated=None, **kwargs)
+            sync_dated(self.model._base_manager.filter(pk__in=pks))
+        return updated
+
+
 class TorTransferee(models.Model):
     """
     Transcript of Records for transferee students.
@@ -77,6 +158,15 @@ class TorTransferee(models.Model):
         max_length=20,
         help_text='Academic year (e.g., 2023-2024)'
     )
+    # Part of unique_tor_transferee_subject. NULL never equals NULL there
+    # (PostgreSQL's default NULLS DISTINCT), so undated entries, e.g. retakes
+    # whose year was not read, are never merged into one row. Kept in sync
+    # by save() and TorTransfereeQuerySet; see the Meta comment.
+    dated = models.BooleanField(
+        null=True,
+        editable=False,
+        help_text='True when school year and semester are known, else NULL'
+    )
     total_academic_units = models.FloatField(
         validators=[validate_units],
         help_text='Number of academic units/credits'
@@ -92,16 +182,41 @@ class TorTransferee(models.Model):
         help_text='Additional remarks (PASSED/FAILED)'
     )
     
+    # OCR provenance, so re-parsing a page can replace its entries
+    source_page = models.ForeignKey(
+        'TorDocumentPage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='entries',
+        help_text='OCR page the entry was extracted from'
+    )
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = TorTransfereeQuerySet.as_manager()
 
     class Meta:
         db_table = 'tor_transferee'
         verbose_name = 'TOR Transferee'
         verbose_name_plural = 'TOR Transferees'
+        # One row per subject taking, so re-uploads update rather than append.
+        # Only dated entries identify a taking: ``dated`` is NULL otherwise,
+        # and rows with a NULL in the key never conflict. A partial
+        # constraint (condition=...) would express the same, but
+        # bulk_create(update_conflicts=True) emits ON CONFLICT without the
+        # index predicate PostgreSQL needs to match a partial index.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account_id', 'subject_code', 'school_year_offered', 'semester', 'dated'],
+                name='unique_tor_transferee_subject'
+            ),
+        ]
         indexes = [
-            models.Index(fields=['account_id', 'subject_code']),
+            # Serves keyset pages in (account_id, subject_code, id) order
+            models.Index(fields=['account_id', 'subject_code', 'id']),
             models.Index(fields=['student_name']),
             models.Index(fields=['created_at']),
         ]
@@ -110,6 +225,10 @@ class TorTransferee(models.Model):
     def __str__(self):
         return f"{self.student_name} - {self.subject_code}"
 
+    def save(self, *args, **kwargs):
+        self.dated = dated_marker(self.school_year_offered, self.semester)
+        super().save(*args, **kwargs)
+
     def clean(self):
         """Validate model instance"""
         super().clean()
@@ -133,6 +252,46 @@ class TorTransferee(models.Model):
         return f"{self.final_grade} ({self.remarks or 'N/A'})"
 
 
+class TorStudentSummary(models.Model):
+    """
+    One row per student and school of an account, summarizing its TOR
+    entries.
+    
+    Kept up to date by ``TorService.refresh_student_summaries`` whenever
+    entries are saved or deleted, so the distinct-student listing reads
+    this table instead of scanning every TOR entry.
+    """
+    account_id = models.CharField(
+        max_length=100,
+        help_text='Student account identifier'
+    )
+    student_name = models.CharField(max_length=100)
+    school_name = models.CharField(max_length=255)
+    entry_count = models.PositiveIntegerField(default=0)
+    last_upload_at = models.DateTimeField(
+        help_text='Latest save of any of the entries'
+    )
+    
+    class Meta:
+        db_table = 'tor_student_summary'
+        verbose_name = 'TOR Student Summary'
+        verbose_name_plural = 'TOR Student Summaries'
+        ordering = ['student_name', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account_id', 'student_name', 'school_name'],
+                name='unique_tor_student_summary'
+            ),
+        ]
+        indexes = [
+            # Serves keyset pages in (student_name, id) order
+            models.Index(fields=['student_name', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_name} - {self.school_name} ({self.account_id})"
+
+
 class TorDocument(models.Model):
     """
     Uploaded TOR Document.
@@ -144,9 +303,9 @@ class TorDocument(models.Model):
         db_index=True,
         help_text='Student account identifier'
     )
-    file = models.ImageField(
+    file = models.FileField(
         upload_to='tor_documents/%Y/%m/',
-        help_text='Uploaded TOR image'
+        help_text='Uploaded TOR image or PDF'
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
@@ -162,3 +321,166 @@ class TorDocument(models.Model):
         
     def __str__(self):
         return f"TOR - {self.account_id} - {self.uploaded_at}"
+
+
+class TorDocumentPage(models.Model):
+    """
+    Raw OCR output of one page of an uploaded TOR document.
+    
+    The boxes are stored packed by ``torchecker.ocr.boxes`` so the
+    ``reparse_tor_documents`` command can re-run line grouping and field
+    extraction without running the OCR models again.
+    """
+    document = models.ForeignKey(
+        TorDocument,
+        on_delete=models.CASCADE,
+        related_name='pages'
+    )
+    page_number = models.PositiveIntegerField(
+        default=1,
+        help_text='Page within the document (1 for images)'
+    )
+    boxes = models.BinaryField(
+        help_text='Packed readtext output (gzip\'d JSON)'
+    )
+    box_count = models.PositiveIntegerField(default=0)
+    parser_version = models.CharField(
+        max_length=20,
+        help_text='Parser version that produced the saved entries'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'tor_document_page'
+        verbose_name = 'TOR Document Page'
+        verbose_name_plural = 'TOR Document Pages'
+        ordering = ['document', 'page_number']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['document', 'page_number'],
+                name='unique_tor_document_page'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['parser_version']),
+        ]
+    
+    def __str__(self):
+        return f"Page {self.page_number} of {self.document_id}"
+
+
+class OcrJob(models.Model):
+    """
+    Queued OCR run for a multi-page TOR upload.
+    
+    Jobs are picked up by the ``run_ocr_worker`` management command, which
+    uses this table as its queue.
+    """
+    
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account_id = models.CharField(
+        max_length=100,
+        validators=[validate_account_id],
+        db_index=True,
+        help_text='Student account identifier'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        help_text='Current job status'
+    )
+    total_pages = models.PositiveIntegerField(default=0)
+    processed_pages = models.PositiveIntegerField(default=0)
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        help_text='Final OCR payload (ocr_results, school_tor, ...)'
+    )
+    error = models.TextField(blank=True, default='')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Last sign of life from the worker running the job'
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'ocr_job'
+        verbose_name = 'OCR Job'
+        verbose_name_plural = 'OCR Jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
+    
+    def __str__(self):
+        return f"OCR Job {self.id} - {self.account_id} ({self.status})"
+
+
+class OcrJobPage(models.Model):
+    """
+    A single uploaded page of an OCR job.
+    """
+    
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+    
+    job = models.ForeignKey(
+        OcrJob,
+        on_delete=models.CASCADE,
+        related_name='pages'
+    )
+    document = models.ForeignKey(
+        TorDocument,
+        on_delete=models.CASCADE,
+        related_name='ocr_pages',
+        help_text='Stored page image or PDF'
+    )
+    page_number = models.PositiveIntegerField()
+    source_page = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Page within the stored PDF (empty for images)'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    entry_count = models.PositiveIntegerField(default=0)
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        help_text='Names and saved entries of the page, for rebuilding the job result'
+    )
+    error = models.TextField(blank=True, default='')
+    
+    class Meta:
+        db_table = 'ocr_job_page'
+        verbose_name = 'OCR Job Page'
+        verbose_name_plural = 'OCR Job Pages'
+        ordering = ['job', 'page_number']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['job', 'page_number'],
+                name='unique_ocr_job_page'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Page {self.page_number} of {self.job_id} ({self.status})"
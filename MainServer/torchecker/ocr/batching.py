@@ -0,0 +1,245 @@
+"""
+Batched text recognition across the pages of an upload.
+
+``Reader.readtext`` on CPU recognizes every detected box on its own: one
+crop, one DataLoader and one forward pass per word. For a multi-page TOR
+that is hundreds of tiny forward passes. Here detection still runs once per
+page, but the text crops of all pages are pooled and pushed through the
+recognizer in large batches.
+
+Crops are grouped by the padded width ``readtext`` would give them, so each
+crop is recognized at the same input size as on the per-page path. With
+fp32 weights the output matches it exactly; EasyOCR's default dynamic int8
+quantization scales activations per batch, so confidences can differ
+slightly.
+
+EasyOCR's internals are imported on first use, like the rest of the ML
+stack (see ``reader_pool``).
+"""
+import logging
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .instrumentation import StageTimings
+from .regions import TableRegionFilter
+
+if TYPE_CHECKING:
+    from .refine import ConfidenceRefiner
+
+logger = logging.getLogger(__name__)
+
+# Recognizer input height used by the bundled EasyOCR models
+DEFAULT_MODEL_HEIGHT = 64
+
+# Reader.readtext defaults for the recognition pass
+CONTRAST_THS = 0.1
+ADJUST_CONTRAST = 0.5
+FILTER_THS = 0.003
+
+
+def model_height() -> int:
+    """Return the recognizer input height EasyOCR was configured with"""
+    from easyocr import easyocr as easyocr_module
+
+    return getattr(easyocr_module, 'imgH', DEFAULT_MODEL_HEIGHT)
+
+
+def detect_regions(reader, image: np.ndarray) -> Tuple[np.ndarray, List, List]:
+    """
+    Run text detection on one page.
+
+    Args:
+        reader: easyocr.Reader
+        image: Page as a grayscale or RGB array
+
+    Returns:
+        Tuple of (grayscale page, horizontal boxes, free-form boxes)
+    """
+    from easyocr.utils import reformat_input
+
+    img, img_cv_grey = reformat_input(image)
+    horizontal_list, free_list = reader.detect(img, reformat=False)
+    return img_cv_grey, horizontal_list[0], free_list[0]
+
+
+def crop_regions(
+    img_cv_grey: np.ndarray,
+    horizontal_list: List,
+    free_list: List,
+    height: int
+) -> List[Tuple[List, np.ndarray, int]]:
+    """
+    Cut detected boxes into recognizer-ready crops.
+
+    Boxes are cropped one at a time, exactly as ``Reader.recognize`` does on
+    CPU, so every crop keeps the padded width the per-page path uses.
+
+    Returns:
+        (box, crop, padded width) tuples in ``readtext`` output order
+    """
+    from easyocr.utils import get_image_list
+
+    crops = []
+
+    for h_list, f_list in (
+        *(([box], []) for box in horizontal_list),
+        *(([], [box]) for box in free_list),
+    ):
+        image_list, max_width = get_image_list(
+            h_list, f_list, img_cv_grey, model_height=height
+        )
+        crops.extend((box, crop, int(max_width)) for box, crop in image_list)
+
+    return crops
+
+
+def recognize_crops(
+    reader,
+    crops: List[Tuple[List, np.ndarray, int]],
+    batch_size: int,
+    height: int
+) -> List[Tuple]:
+    """
+    Recognize crops in batches of up to ``batch_size``.
+
+    Crops are grouped by padded width; each group is split into batches.
+
+    Returns:
+        (box, text, confidence) tuples in the order of ``crops``
+    """
+    from easyocr.recognition import get_text
+
+    ignore_char = ''.join(set(reader.character) - set(reader.lang_char))
+    batch_size = max(1, batch_size)
+
+    by_width = defaultdict(list)
+    for index, (_, _, width) in enumerate(crops):
+        by_width[width].append(index)
+
+    results = [None] * len(crops)
+
+    for width, indices in sorted(by_width.items()):
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            recognized = get_text(
+                reader.character, height, width,
+                reader.recognizer, reader.converter,
+                [crops[i][:2] for i in batch],
+                ignore_char=ignore_char,
+                decoder='greedy',
+                beamWidth=5,
+                batch_size=len(batch),
+                contrast_ths=CONTRAST_THS,
+                adjust_contrast=ADJUST_CONTRAST,
+                filter_ths=FILTER_THS,
+                workers=0,
+                device=reader.device,
+            )
+            for i, result in zip(batch, recognized):
+                results[i] = result
+
+    return results
+
+
+def recognize_pages(
+    reader,
+    images: List[np.ndarray],
+    batch_size: int,
+    timings: Optional[List[StageTimings]] = None,
+    region_filter: Optional[TableRegionFilter] = None,
+    refiner: Optional['ConfidenceRefiner'] = None,
+    sources: Optional[List[Tuple[Optional[np.ndarray], Optional[Dict]]]] = None
+) -> List[List[Tuple]]:
+    """
+    OCR several pages, detecting per page and recognizing in shared batches.
+
+    Args:
+        reader: easyocr.Reader
+        images: Page arrays in upload order
+        batch_size: Maximum crops per recognizer forward pass
+        timings: Per-page stage timings to record into. The shared
+            recognition time is split across pages by crop count.
+        region_filter: Table region pre-pass applied to each page's boxes
+            before cropping
+        refiner: Second pass over low-confidence boxes; the boxes of all
+            pages are recognized again in shared batches
+        sources: Per page (decoded page, preprocessing report) the refiner
+            may re-cut boxes from
+
+    Returns:
+        One ``readtext``-style result list per page
+    """
+    height = model_height()
+    timings = timings or [StageTimings() for _ in images]
+
+    page_crops = []
+    pages = []
+    for image, page_timings in zip(images, timings):
+        with page_timings.stage('detection'):
+            img_cv_grey, horizontal_list, free_list = detect_regions(reader, image)
+        if region_filter:
+            with page_timings.stage('table_region'):
+                horizontal_list, free_list = region_filter.apply(
+                    horizontal_list, free_list, img_cv_grey.shape[0]
+                )
+        page_crops.append(crop_regions(img_cv_grey, horizontal_list, free_list, height))
+        if refiner:
+            pages.append(img_cv_grey)
+
+    flat = [crop for crops in page_crops for crop in crops]
+    logger.info(f"Recognizing {len(flat)} text crops from {len(images)} pages")
+    start = time.perf_counter()
+    recognized = recognize_crops(reader, flat, batch_size, height)
+    elapsed = time.perf_counter() - start
+
+    results = []
+    offset = 0
+    for crops, page_timings in zip(page_crops, timings):
+        results.append(recognized[offset:offset + len(crops)])
+        offset += len(crops)
+        page_timings.add('recognition', elapsed * len(crops) / max(1, len(flat)))
+
+    if refiner:
+        results = _refine_pages(
+            reader, refiner, pages, results, batch_size, height, timings,
+            sources or [(None, None)] * len(pages)
+        )
+
+    return results
+
+
+def _refine_pages(
+    reader,
+    refiner: 'ConfidenceRefiner',
+    pages: List[np.ndarray],
+    results: List[List[Tuple]],
+    batch_size: int,
+    height: int,
+    timings: List[StageTimings],
+    sources: List[Tuple[Optional[np.ndarray], Optional[Dict]]]
+) -> List[List[Tuple]]:
+    """Recognize the low-confidence boxes of all pages again in shared batches"""
+    start = time.perf_counter()
+    page_picks = [
+        refiner.collect(page, page_results, height, source, preprocessing)
+        for page, page_results, (source, preprocessing) in zip(pages, results, sources)
+    ]
+
+    flat = [crop for picks in page_picks for _, crop in picks]
+    recognized = recognize_crops(reader, flat, batch_size, height) if flat else []
+    elapsed = time.perf_counter() - start
+
+    refined = []
+    offset = 0
+    for page_results, picks, page_timings in zip(results, page_picks, timings):
+        merged, _ = refiner.merge(
+            page_results, picks, recognized[offset:offset + len(picks)]
+        )
+        refined.append(merged)
+        offset += len(picks)
+        page_timings.add('refine', elapsed / len(pages))
+
+    return refined
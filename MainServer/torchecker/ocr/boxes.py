@@ -0,0 +1,118 @@
+"""
+Compact storage of raw OCR boxes.
+
+The ``readtext`` output of every page is persisted so an improved parser can
+be re-run over old uploads without running the models again. Boxes are
+stored column-wise (texts, confidences and a flat list of corner
+coordinates) as gzip'd JSON. Coordinates are kept exactly, so re-parsing a
+stored page gives the same lines as parsing the original output. A typical
+TOR page packs to a few kilobytes.
+"""
+import gzip
+import json
+from typing import Dict, List, Sequence, Tuple
+
+from .layout import group_lines
+from . import parser
+
+FORMAT_VERSION = 1
+
+# Corner points per box and coordinates per point
+POINTS_PER_BOX = 4
+
+
+def _compact(value: float):
+    """Write integral coordinates without a trailing ``.0``"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def pack_boxes(results: Sequence) -> bytes:
+    """
+    Serialize raw OCR results for storage.
+
+    Args:
+        results: (bbox, text, confidence) tuples as returned by ``readtext``
+            or ``normalize_boxes``
+
+    Returns:
+        Gzip'd JSON bytes
+    """
+    payload = {
+        'v': FORMAT_VERSION,
+        'text': [str(text) for _, text, _ in results],
+        'conf': [float(conf) for _, _, conf in results],
+        'points': [
+            _compact(coordinate)
+            for bbox, _, _ in results
+            for point in bbox
+            for coordinate in point[:2]
+        ],
+    }
+    return gzip.compress(
+        json.dumps(payload, separators=(',', ':')).encode('utf-8'),
+        mtime=0
+    )
+
+
+def unpack_boxes(data: bytes) -> List:
+    """
+    Restore OCR results stored by :func:`pack_boxes`.
+
+    Returns:
+        [bbox, text, confidence] lists, bbox being four [x, y] points
+
+    Raises:
+        ValueError: If the data is not a supported box payload
+    """
+    try:
+        payload = json.loads(gzip.decompress(bytes(data)).decode('utf-8'))
+    except (OSError, EOFError, UnicodeDecodeError) as e:
+        raise ValueError(f"Unreadable OCR box payload: {e}")
+
+    if payload.get('v') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported OCR box format: {payload.get('v')}")
+
+    points = payload['points']
+    step = POINTS_PER_BOX * 2
+
+    return [
+        [
+            [
+                [float(points[offset + i]), float(points[offset + i + 1])]
+                for i in range(0, step, 2)
+            ],
+            text,
+            conf,
+        ]
+        for offset, text, conf in zip(
+            range(0, len(points), step), payload['text'], payload['conf']
+        )
+    ]
+
+
+def parse_boxes(results: List) -> Dict[str, any]:
+    """Group stored boxes into lines and extract the TOR fields"""
+    return parser.extract_fields(group_lines(results))
+
+
+def reparse_packed(items: List[Tuple[int, bytes]]) -> List[Tuple[int, Dict]]:
+    """
+    Re-parse a batch of stored pages.
+
+    Runs in pool processes, so it needs neither Django nor the OCR models.
+
+    Args:
+        items: (page id, packed boxes) pairs
+
+    Returns:
+        (page id, extracted fields) pairs; the fields are None for pages
+        whose boxes could not be read
+    """
+    parsed = []
+    for page_id, data in items:
+        try:
+            parsed.append((page_id, parse_boxes(unpack_boxes(data))))
+        except (ValueError, KeyError, TypeError):
+            parsed.append((page_id, None))
+    return parsed
@@ -0,0 +1,221 @@
+"""
+Content-addressed cache for OCR results.
+
+Entries are keyed by the SHA-256 of the uploaded page bytes plus the parser
+version, and hold both the raw ``readtext`` boxes and the structured
+output. They are stored as small gzip'd JSON files in a shared directory so
+every gunicorn worker, pool process and OCR job worker on the node shares
+them. The directory is kept under a byte budget by evicting the least
+recently used entries.
+
+Scanning the directory costs a stat per entry, so writes do not scan:
+each process keeps a running estimate of the directory size, adds every
+entry it writes and only scans (and evicts) once the estimate crosses the
+budget. Eviction goes down to EVICT_TARGET of the budget so the next scan
+is a good number of writes away. Other processes' writes are not in the
+estimate, so it is also refreshed by a scan every ``rescan_interval``
+seconds.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = '.json.gz'
+
+# Fraction of max_bytes that eviction shrinks the directory to
+EVICT_TARGET = 0.9
+
+
+def hash_chunks(chunks: Iterable[bytes]) -> str:
+    """Return the SHA-256 hex digest of a stream of byte chunks"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_boxes(results: List) -> List:
+    """
+    Convert EasyOCR ``readtext`` output to plain JSON types.
+
+    EasyOCR may return NumPy scalars for coordinates and confidences.
+    """
+    return [
+        [
+            [[float(x), float(y)] for x, y in bbox],
+            str(text),
+            float(conf),
+        ]
+        for bbox, text, conf in results
+    ]
+
+
+class OCRResultCache:
+    """
+    Size-bounded on-disk LRU cache of OCR results.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, rescan_interval: float = 300):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Estimated directory size; None until the first scan
+        self._size: Optional[int] = None
+        self._scanned_at = 0.0
+
+    @staticmethod
+    def make_key(content_hash: str, parser_version: str) -> str:
+        """Build the cache key for a page hash and parser version"""
+        return f"{content_hash}-v{parser_version}"
+
+    def _path(self, key: str) -> Path:
+        # Fan out on the first hash byte to keep directories small
+        return self.directory / key[:2] / f"{key}{CACHE_SUFFIX}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached result.
+
+        Returns:
+            Dictionary with ``boxes`` and ``structured`` or None on a miss
+        """
+        path = self._path(key)
+
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as fh:
+                value = json.load(fh)
+            # Refresh recency for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        """Store a result, then evict old entries if over budget"""
+        path = self._path(key)
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {key}: {e}")
+            return
+
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as fh:
+                json.dump(value, fh, separators=(',', ':'))
+            size = os.path.getsize(tmp_path)
+            # An overwritten entry only changes the size by the difference
+            try:
+                size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            scan = (
+                self._size is None
+                or self._size > self.max_bytes
+                or time.monotonic() - self._scanned_at >= self.rescan_interval
+            )
+
+        if scan:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Scan the directory and, when over max_bytes, delete least recently
+        used entries until under EVICT_TARGET of it.
+
+        Also resets the running size estimate to the scanned size.
+
+        Returns:
+            Number of entries removed
+        """
+        entries = []
+        total = 0
+
+        for path in self.directory.glob(f"*/*{CACHE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TARGET
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+            logger.info(f"Evicted {removed} OCR cache entries")
+
+        with self._lock:
+            self._size = total
+            self._scanned_at = time.monotonic()
+
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for this process"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+_cache: Optional[OCRResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[OCRResultCache]:
+    """Return the OCR result cache, or None when disabled in settings"""
+    global _cache
+
+    if not getattr(settings, 'OCR_CACHE_ENABLED', True):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRResultCache(
+                    directory=getattr(
+                        settings, 'OCR_CACHE_DIR', Path(tempfile.gettempdir()) / 'ocr_cache'
+                    ),
+                    max_bytes=getattr(settings, 'OCR_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+                    rescan_interval=getattr(settings, 'OCR_CACHE_RESCAN_INTERVAL', 300),
+                )
+
+    return _cache
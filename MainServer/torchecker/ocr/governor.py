@@ -0,0 +1,275 @@
+"""
+Node-level CPU governor for OCR inference.
+
+Gunicorn runs many sync workers per node, and torch gives every inference
+a thread per core, so concurrent uploads oversubscribe the CPU and all of
+them slow down. The governor is a cross-process semaphore made of slot
+files under OCR_GOVERNOR_DIR: an inference holds an exclusive lock on one
+slot for its duration, so at most OCR_MAX_CONCURRENT_INFERENCES run at once
+on the node. Locks are released by the kernel when a process dies, so a
+crashed worker never leaks a slot.
+
+On Linux the locks are open file description locks (``F_OFD_SETLK``),
+which can be tested with ``F_OFD_GETLK`` without taking them, so counting
+busy slots (for thread shares and pool stats) never makes a free slot look
+taken to a concurrent inference. Elsewhere ``flock`` is used and only the
+slots held by this process are counted.
+
+Each inference's torch thread count is its share of OCR_CPU_BUDGET among
+the slots currently held. The share is set when a slot is acquired and
+recomputed between model stages, so a lone inference uses the whole budget
+and makes room as others start.
+
+Time spent waiting for a slot is observed into ``ocr_governor_wait_seconds``.
+"""
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+from rest_framework import status
+
+from core.exceptions import ServiceException
+from core.metrics import registry
+
+from .instrumentation import StageTimings
+from .reader_pool import configure_torch_threads
+
+logger = logging.getLogger(__name__)
+
+WAIT_SECONDS = registry.histogram(
+    'ocr_governor_wait_seconds',
+    'Time OCR inferences waited for a CPU slot',
+)
+
+# Open file description locks can be tested without acquiring them
+OFD_LOCKS = hasattr(fcntl, 'F_OFD_SETLK')
+
+# struct flock: l_type, l_whence, l_start, l_len (0 = whole file), l_pid
+FLOCK = struct.Struct('hhqqi4x')
+
+# Polling interval while every slot is taken (seconds)
+MIN_POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.2
+
+
+class GovernorSlot:
+    """
+    A held inference slot.
+    """
+
+    def __init__(self, governor: 'CpuGovernor', index: int):
+        self.governor = governor
+        self.index = index
+        self.threads = 0
+
+    def rebalance(self) -> int:
+        """
+        Set torch's thread count to this slot's current share of the budget.
+
+        Returns:
+            The thread count now in effect
+        """
+        self.threads = self.governor.threads_for(self.governor.active_slots(self.index))
+        configure_torch_threads(self.threads)
+        return self.threads
+
+
+class CpuGovernor:
+    """
+    Cross-process semaphore capping concurrent OCR inferences on a node.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_concurrent: int,
+        cpu_budget: int,
+        max_threads: int = 0,
+        timeout: float = 60
+    ):
+        """
+        Args:
+            directory: Directory holding the slot files; must be shared by
+                every process on the node
+            max_concurrent: Inferences allowed at once
+            cpu_budget: Cores shared by concurrent inferences
+            max_threads: Upper bound on one inference's threads (0 = none)
+            timeout: Seconds to wait for a slot before giving up
+        """
+        self.directory = Path(directory)
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.cpu_budget = max(1, int(cpu_budget))
+        self.max_threads = max_threads
+        self.timeout = timeout
+
+        self._fds: List[int] = []
+        self._fds_pid = None
+        self._thread_locks = [threading.Lock() for _ in range(self.max_concurrent)]
+        self._open_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> Optional['CpuGovernor']:
+        """Build the governor from settings, or None when disabled"""
+        if not getattr(settings, 'OCR_GOVERNOR_ENABLED', True):
+            return None
+
+        cpu_budget = getattr(settings, 'OCR_CPU_BUDGET', 0) or os.cpu_count() or 1
+        max_concurrent = (
+            getattr(settings, 'OCR_MAX_CONCURRENT_INFERENCES', 0)
+            or max(1, cpu_budget // 2)
+        )
+
+        return cls(
+            directory=getattr(settings, 'OCR_GOVERNOR_DIR'),
+            max_concurrent=max_concurrent,
+            cpu_budget=cpu_budget,
+            max_threads=getattr(settings, 'OCR_TORCH_THREADS', 0),
+            timeout=getattr(settings, 'OCR_GOVERNOR_TIMEOUT', 60),
+        )
+
+    def _slot_fds(self) -> List[int]:
+        """Open the slot files, once per process"""
+        # Descriptors inherited across fork share their locks with the
+        # parent, so a forked worker opens its own
+        if self._fds_pid != os.getpid():
+            with self._open_lock:
+                if self._fds_pid != os.getpid():
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    self._fds = [
+                        os.open(self.directory / f"slot-{index}.lock", os.O_RDWR | os.O_CREAT, 0o666)
+                        for index in range(self.max_concurrent)
+                    ]
+                    self._fds_pid = os.getpid()
+        return self._fds
+
+    def _try_lock(self, index: int) -> bool:
+        """Take slot ``index`` if no thread or process holds it"""
+        if not self._thread_locks[index].acquire(blocking=False):
+            return False
+
+        fd = self._slot_fds()[index]
+        try:
+            if OFD_LOCKS:
+                fcntl.fcntl(fd, fcntl.F_OFD_SETLK, FLOCK.pack(fcntl.F_WRLCK, os.SEEK_SET, 0, 0, 0))
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except (BlockingIOError, PermissionError):
+            self._thread_locks[index].release()
+            return False
+
+    def _unlock(self, index: int) -> None:
+        fd = self._slot_fds()[index]
+        if OFD_LOCKS:
+            fcntl.fcntl(fd, fcntl.F_OFD_SETLK, FLOCK.pack(fcntl.F_UNLCK, os.SEEK_SET, 0, 0, 0))
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._thread_locks[index].release()
+
+    def _held_elsewhere(self, index: int) -> bool:
+        """Whether another process holds slot ``index``, tested without locking"""
+        if not OFD_LOCKS:
+            return False
+
+        probe = fcntl.fcntl(
+            self._slot_fds()[index],
+            fcntl.F_OFD_GETLK,
+            FLOCK.pack(fcntl.F_WRLCK, os.SEEK_SET, 0, 0, 0)
+        )
+        return FLOCK.unpack(probe)[0] != fcntl.F_UNLCK
+
+    def _try_acquire(self) -> Optional[int]:
+        """Take any free slot, starting at a per-process offset"""
+        start = os.getpid() % self.max_concurrent
+        for offset in range(self.max_concurrent):
+            index = (start + offset) % self.max_concurrent
+            if self._try_lock(index):
+                return index
+        return None
+
+    def active_slots(self, own: Optional[int] = None) -> int:
+        """
+        Count slots currently held on the node.
+
+        No slot is locked while counting, so a concurrent inference never
+        finds a free slot taken by the probe.
+
+        Args:
+            own: Slot held by the caller, counted without probing
+        """
+        return sum(
+            1 for index in range(self.max_concurrent)
+            if index == own
+            or self._thread_locks[index].locked()
+            or self._held_elsewhere(index)
+        )
+
+    def threads_for(self, active: int) -> int:
+        """Torch threads for one of ``active`` concurrent inferences"""
+        threads = max(1, self.cpu_budget // max(1, active))
+        if self.max_threads > 0:
+            threads = min(threads, self.max_threads)
+        return threads
+
+    @contextmanager
+    def inference(self, timings: Optional[StageTimings] = None) -> Iterator[GovernorSlot]:
+        """
+        Hold a CPU slot for the duration of a ``with`` block.
+
+        The wait is recorded as the ``cpu_wait`` stage of ``timings``.
+
+        Raises:
+            ServiceException: If no slot frees up within the timeout
+        """
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        interval = MIN_POLL_INTERVAL
+
+        index = self._try_acquire()
+        while index is None:
+            if time.perf_counter() >= deadline:
+                WAIT_SECONDS.observe(time.perf_counter() - start)
+                raise ServiceException(
+                    "OCR service is busy. Please try again shortly.",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    error_code='OCR_BUSY'
+                )
+            time.sleep(interval)
+            interval = min(MAX_POLL_INTERVAL, interval * 2)
+            index = self._try_acquire()
+
+        waited = time.perf_counter() - start
+        WAIT_SECONDS.observe(waited)
+        if timings is not None:
+            timings.add('cpu_wait', waited)
+
+        try:
+            slot = GovernorSlot(self, index)
+            slot.rebalance()
+            logger.debug(f"Acquired OCR slot {index} with {slot.threads} threads after {waited:.3f}s")
+            yield slot
+        finally:
+            self._unlock(index)
+
+
+_governor: Optional[CpuGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> Optional[CpuGovernor]:
+    """Return the process-wide governor, or None when disabled"""
+    global _governor
+
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = CpuGovernor.from_settings()
+
+    return _governor
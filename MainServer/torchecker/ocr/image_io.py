@@ -0,0 +1,115 @@
+"""
+Decoding of uploaded page images for OCR.
+
+Uploads are decoded straight into NumPy arrays: from memory for small
+uploads, or from the temporary file Django already spilled large uploads
+to. Nothing is copied to an intermediate file, and size limits are checked
+before any pixel data is decoded.
+"""
+import hashlib
+import io
+import logging
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.conf import settings
+from django.core.files import File
+
+from core.exceptions import ValidationException
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def check_upload_size(image_file: File) -> None:
+    """
+    Reject uploads larger than OCR_MAX_UPLOAD_BYTES.
+
+    Raises:
+        ValidationException: If the upload is too large
+    """
+    max_bytes = getattr(settings, 'OCR_MAX_UPLOAD_BYTES', 20 * 1024 * 1024)
+    size = image_file.size
+
+    if size is not None and size > max_bytes:
+        raise ValidationException(
+            f"{image_file.name} is {size / (1024 * 1024):.1f} MB; "
+            f"the limit is {max_bytes / (1024 * 1024):.0f} MB",
+            field='images'
+        )
+
+
+def _check_pixel_count(image: Image.Image, name: str) -> None:
+    """Reject images whose header declares too many pixels"""
+    max_pixels = getattr(settings, 'OCR_MAX_IMAGE_PIXELS', 40_000_000)
+    width, height = image.size
+
+    if width * height > max_pixels:
+        raise ValidationException(
+            f"{name} is {width}x{height} pixels; "
+            f"the limit is {max_pixels / 1_000_000:.0f} megapixels",
+            field='images'
+        )
+
+
+def open_upload(image_file: File) -> Tuple[object, str]:
+    """
+    Prepare an upload for decoding and hash its bytes.
+
+    Uploads Django already wrote to disk are read from that file; everything
+    else is read into memory once.
+
+    Args:
+        image_file: Uploaded file, stored FieldFile or any Django File
+
+    Returns:
+        Tuple of (path or buffer to pass to :func:`decode_image`,
+        SHA-256 hex digest of the upload)
+
+    Raises:
+        ValidationException: If the upload is too large
+    """
+    check_upload_size(image_file)
+
+    if hasattr(image_file, 'temporary_file_path'):
+        path = image_file.temporary_file_path()
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return path, digest.hexdigest()
+
+    data = b''.join(image_file.chunks())
+    return io.BytesIO(data), hashlib.sha256(data).hexdigest()
+
+
+def decode_image(source, name: str) -> np.ndarray:
+    """
+    Decode a page into an RGB array.
+
+    Args:
+        source: Path or buffer returned by :func:`open_upload`
+        name: File name used in error messages
+
+    Returns:
+        H x W x 3 uint8 array
+
+    Raises:
+        ValidationException: If the image is too large or not an image
+    """
+    try:
+        with Image.open(source) as image:
+            # Only the header has been read at this point
+            _check_pixel_count(image, name)
+
+            # Phone photos carry their rotation in EXIF
+            image = ImageOps.exif_transpose(image)
+            return np.asarray(image.convert('RGB'))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValidationException(
+            f"{name} is not a readable image: {str(e)}",
+            field='images'
+        )
+
@@ -0,0 +1,102 @@
+"""
+Per-stage timing of the OCR pipeline.
+
+Each stage is observed into the ``ocr_stage_seconds`` histogram and kept on
+a :class:`StageTimings` object so it can be attached to the response in
+debug mode. Stages, in pipeline order:
+
+    spooling     parsing the multipart upload (once per request)
+    read         reading and hashing a page's bytes
+    decode       decoding the image
+    preprocess   downscaling, deskew and margin cropping
+    reader_wait  waiting for a free reader
+    cpu_wait     waiting for a node-wide CPU slot (see ``governor``)
+    detection    EasyOCR text detection
+    table_region dropping boxes outside the grades table (when enabled)
+    recognition  EasyOCR text recognition
+    sorting      grouping boxes into lines
+    extraction   extracting TOR fields from lines
+    db_save      saving extracted entries
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from core.metrics import registry
+
+STAGE_SECONDS = registry.histogram(
+    'ocr_stage_seconds',
+    'Time spent in each OCR pipeline stage',
+    labelnames=('stage',),
+)
+
+PAGES_TOTAL_SECONDS = registry.histogram(
+    'ocr_page_seconds',
+    'Total OCR time per page, by outcome',
+    labelnames=('outcome',),
+)
+
+
+class StageTimings:
+    """
+    Stage durations of one page (or one request).
+    """
+
+    def __init__(self, record: bool = True):
+        """
+        Args:
+            record: Also observe durations into the process histograms
+        """
+        self.record = record
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        """Record a duration measured elsewhere"""
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        if self.record:
+            STAGE_SECONDS.observe(seconds, stage=name)
+
+    def total(self) -> float:
+        """Sum of all recorded stages in seconds"""
+        return sum(self.seconds.values())
+
+    def as_ms(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, rounded for responses"""
+        return {
+            name: round(seconds * 1000, 2)
+            for name, seconds in self.seconds.items()
+        }
+
+
+def observe_page(timings: StageTimings, outcome: str) -> None:
+    """Record a finished page's total time"""
+    if timings.record:
+        PAGES_TOTAL_SECONDS.observe(timings.total(), outcome=outcome)
+
+
+def record_remote_timings(result: Dict) -> None:
+    """
+    Observe the stage timings of a page result from another process.
+
+    Pages OCR'd in the page process pool or the OCR sidecar are timed
+    there; their ``timings_ms`` come back with the result and are recorded
+    here so they show up on this process's metrics endpoint, under the
+    same outcome (``cached`` or ``ocr``) as a page handled in-process.
+    """
+    timings_ms = result.get('timings_ms')
+    if not timings_ms:
+        return
+
+    timings = StageTimings()
+    for name, ms in timings_ms.items():
+        timings.add(name, ms / 1000)
+    observe_page(timings, 'cached' if result.get('cached') else 'ocr')
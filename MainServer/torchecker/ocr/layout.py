@@ -0,0 +1,85 @@
+"""
+Array-backed layout engine for grouping OCR boxes into text lines.
+
+Box centers and heights are computed as NumPy arrays, boxes are ordered
+with a stable argsort and lines are split wherever the vertical gap between
+consecutive centers reaches the line threshold. The arithmetic mirrors the
+original per-box implementation step for step, so the output is identical.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+# Boxes at or below this confidence are dropped
+MIN_CONFIDENCE = 0.3
+
+# Consecutive boxes closer than this fraction of the average text height
+# belong to the same line
+LINE_GAP_RATIO = 0.6
+
+
+def group_lines(
+    results: List,
+    min_confidence: float = MIN_CONFIDENCE,
+    line_gap_ratio: float = LINE_GAP_RATIO
+) -> List[List[Dict]]:
+    """
+    Group raw ``readtext`` results into lines sorted top-to-bottom and
+    left-to-right.
+
+    Args:
+        results: (bbox, text, confidence) tuples, bbox being 4 (x, y) points
+        min_confidence: Confidence a box must exceed to be kept
+        line_gap_ratio: Line split threshold as a fraction of text height
+
+    Returns:
+        List of lines, each a list of {"bbox", "text", "conf", "center"}
+        dictionaries
+    """
+    kept = [r for r in results if r[2] > min_confidence]
+    if not kept:
+        return []
+
+    bboxes = [r[0] for r in kept]
+
+    if isinstance(bboxes[0], np.ndarray):
+        boxes = np.asarray(bboxes, dtype=np.float64)
+        sums_x = boxes[:, 0, 0] + boxes[:, 1, 0] + boxes[:, 2, 0] + boxes[:, 3, 0]
+        sums_y = boxes[:, 0, 1] + boxes[:, 1, 1] + boxes[:, 2, 1] + boxes[:, 3, 1]
+        heights = np.abs(boxes[:, 0, 1] - boxes[:, 2, 1])
+    else:
+        # Converting nested point lists to a 3-D array costs more than the
+        # grouping itself, so reduce each box to flat columns first
+        sums_x = np.array([p0[0] + p1[0] + p2[0] + p3[0] for p0, p1, p2, p3 in bboxes])
+        sums_y = np.array([p0[1] + p1[1] + p2[1] + p3[1] for p0, p1, p2, p3 in bboxes])
+        heights = np.abs(np.array([p0[1] - p2[1] for p0, p1, p2, p3 in bboxes]))
+
+    # Same summation order as sum(coords) / 4 over the four corners
+    xs = sums_x / 4
+    ys = sums_y / 4
+
+    # Python's left-to-right sum keeps the threshold bit-identical
+    threshold = (sum(heights.tolist()) / len(kept)) * line_gap_ratio
+
+    by_y = np.argsort(ys, kind='stable')
+    line_ids = np.concatenate(([0], np.cumsum(np.diff(ys[by_y]) >= threshold)))
+
+    # Order by line, then x. lexsort is stable, so boxes with equal x keep
+    # their vertical order as in the original per-line sort.
+    by_line = np.lexsort((xs[by_y], line_ids))
+    order = by_y[by_line]
+    breaks = (np.flatnonzero(np.diff(line_ids[by_line])) + 1).tolist()
+
+    words = [
+        {"bbox": r[0], "text": r[1], "conf": r[2], "center": (x, y)}
+        for r, x, y in zip(
+            map(kept.__getitem__, order.tolist()),
+            xs[order].tolist(),
+            ys[order].tolist(),
+        )
+    ]
+
+    return [
+        words[begin:end]
+        for begin, end in zip([0] + breaks, breaks + [len(words)])
+    ]
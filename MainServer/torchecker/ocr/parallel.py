@@ -0,0 +1,184 @@
+"""
+Process pool for OCR'ing the pages of an upload in parallel.
+
+Each pool process sets Django up once, keeps its own warm reader pool and
+receives pages as raw bytes, so page results come back as plain dicts.
+
+Pool processes are spawned, so unlike gunicorn workers they do not share
+the readers preloaded in the master: every one of them loads its own
+detector and recognizer (a few hundred MB resident with torch). A pool is
+started lazily in each process that OCRs a multi-page upload, so if every
+one of W web workers got OCR_PAGE_WORKERS processes, a node with the
+default 2 * cores + 1 workers on 8 cores and OCR_PAGE_WORKERS=4 would run
+68 extra interpreters and model copies. OCR_PAGE_WORKERS is therefore the
+node-wide budget of page processes, and :func:`page_workers` splits it
+between the OCR_WEB_WORKERS web workers. A worker whose share is below two
+processes OCRs pages sequentially, so parallel mode needs either a single
+web worker or OCR_PAGE_WORKERS of at least 2 * OCR_WEB_WORKERS.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Tuple
+
+from django.conf import settings
+
+from .instrumentation import record_remote_timings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+_warned_disabled = False
+
+
+def page_workers() -> int:
+    """
+    Page pool processes this process may use.
+
+    This web worker's share of the node-wide OCR_PAGE_WORKERS budget. A
+    share below two processes is not worth a pool: pages are OCR'd
+    sequentially (1) and, if a budget was configured, a warning is logged
+    once.
+    """
+    global _warned_disabled
+
+    budget = max(1, getattr(settings, 'OCR_PAGE_WORKERS', 1))
+    web_workers = max(1, getattr(settings, 'OCR_WEB_WORKERS', 1))
+    share = budget // web_workers
+
+    if share < 2:
+        if budget > 1 and not _warned_disabled:
+            logger.warning(
+                f"OCR_PAGE_WORKERS={budget} split between {web_workers} web workers "
+                f"leaves each fewer than 2 page processes; OCR'ing pages sequentially "
+                f"(set it to at least {2 * web_workers} or run one web worker)"
+            )
+            _warned_disabled = True
+        return 1
+
+    return share
+
+
+def _init_worker(torch_threads: int) -> None:
+    """Prepare a freshly spawned pool process"""
+    import django
+    django.setup()
+
+    # One page per process: keep torch from spawning a thread per core in
+    # every pool process at once.
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+
+def _ocr_page(file_name: str, data: bytes) -> Dict:
+    """Run the regular single-page pipeline inside a pool process"""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from ..services.ocr_service import OCRService
+
+    return OCRService(in_process=True).process_image(SimpleUploadedFile(file_name, data))
+
+
+def get_page_executor(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Return the shared page executor, creating it on first use.
+
+    The pool uses the ``spawn`` start method so the children never inherit
+    torch state or open DB connections from the web worker.
+    """
+    global _executor, _executor_workers
+
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+
+            torch_threads = max(1, (os.cpu_count() or 1) // max_workers)
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(torch_threads,),
+            )
+            _executor_workers = max_workers
+
+        return _executor
+
+
+def _reset_executor() -> None:
+    """Drop a broken executor so the next upload starts a fresh one"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def iter_pages_parallel(
+    pages: List[Tuple[str, bytes]],
+    max_workers: int
+) -> Iterator[Dict]:
+    """
+    OCR pages concurrently, yielding each result in page order as soon as
+    it and every page before it are done.
+
+    A page that fails yields a result with an ``error`` message and no
+    entries instead of failing the whole upload.
+
+    Args:
+        pages: (file_name, image bytes) pairs in upload order
+        max_workers: Number of pool processes
+
+    Yields:
+        Page result dictionaries, one per input page
+    """
+    executor = get_page_executor(max_workers)
+    futures = [executor.submit(_ocr_page, name, data) for name, data in pages]
+
+    broken = False
+
+    try:
+        for (name, _), future in zip(pages, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    broken = True
+                message = getattr(e, 'message', None) or str(e)
+                logger.error(f"OCR failed for page {name}: {message}")
+                result = {
+                    'file_name': name,
+                    'page_number': None,
+                    'student_name': None,
+                    'school_name': None,
+                    'entries': [],
+                    'error': message,
+                }
+            record_remote_timings(result)
+            yield result
+    finally:
+        # The consumer may stop early (e.g. a client disconnecting)
+        for future in futures:
+            future.cancel()
+        if broken:
+            _reset_executor()
+
+
+def process_pages_parallel(
+    pages: List[Tuple[str, bytes]],
+    max_workers: int
+) -> List[Dict]:
+    """
+    OCR pages concurrently, returning results in page order.
+
+    See :func:`iter_pages_parallel`.
+    """
+    return list(iter_pages_parallel(pages, max_workers))
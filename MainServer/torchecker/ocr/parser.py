@@ -0,0 +1,180 @@
+"""
+Single-pass extraction of TOR fields from sorted OCR lines.
+
+Every token is classified once by :func:`classify_token` into a kind
+(subject code, number, school year, remark or plain text) plus the semester
+keyword it contains, if any. Classification is one match against a
+combined, precompiled pattern, one set lookup and one keyword search, and is
+memoized because transcripts repeat the same grades, units and remarks on
+every row. Entries are then assembled from the classified tokens with the
+same rules as the original per-pattern implementation, so the output is
+identical.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+SUBJECT_CODE_PATTERN = re.compile(r'^[A-Za-z]{1,}[ \-]*\d{1,4}[A-Za-z]?$')
+NUMBER_PATTERN = re.compile(r'^\d+(\.\d+)?$')
+YEAR_PATTERN = re.compile(r'^\d{4}-\d{4}$')
+
+REMARKS_KEYWORDS = (
+    'passed', 'failed', 'inc', 'incomplete',
+    'dropped', 'withdrawn', 'drp', 'pas'
+)
+
+# In priority order: a token containing several takes the first
+SEMESTER_KEYWORDS = ('first', 'second', 'summer')
+
+SCHOOL_KEYWORDS = ('school', 'university', 'college')
+
+# Token kinds
+CODE = 'code'
+NUMBER = 'number'
+YEAR = 'year'
+REMARK = 'remark'
+TEXT = 'text'
+
+# The three token patterns as one alternation. Numbers and years start with
+# a digit and codes with a letter, so at most one branch can match.
+TOKEN_PATTERN = re.compile(
+    r'^(?:(?P<number>\d+(?:\.\d+)?)'
+    r'|(?P<year>\d{4}-\d{4})'
+    r'|(?P<code>[A-Za-z]{1,}[ \-]*\d{1,4}[A-Za-z]?))$'
+)
+
+_REMARKS = frozenset(REMARKS_KEYWORDS)
+
+# The keywords cannot overlap each other, so findall sees every occurrence
+_SEMESTER_PATTERN = re.compile('|'.join(SEMESTER_KEYWORDS))
+_SEMESTER_PRIORITY = {keyword: index for index, keyword in enumerate(SEMESTER_KEYWORDS)}
+
+_SCHOOL_PATTERN = re.compile('|'.join(SCHOOL_KEYWORDS))
+
+TOKEN_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def classify_token(text: str) -> Tuple[str, Optional[str]]:
+    """
+    Classify one OCR token.
+
+    Args:
+        text: Token text as recognized
+
+    Returns:
+        Tuple of (kind, semester keyword contained in the token or None)
+    """
+    match = TOKEN_PATTERN.match(text)
+    lower = text.lower()
+
+    if match:
+        kind = match.lastgroup
+    elif lower in _REMARKS:
+        kind = REMARK
+    else:
+        kind = TEXT
+
+    semesters = _SEMESTER_PATTERN.findall(lower)
+    if not semesters:
+        return kind, None
+    if len(semesters) == 1:
+        return kind, semesters[0]
+    return kind, min(semesters, key=_SEMESTER_PRIORITY.__getitem__)
+
+
+def extract_fields(lines: List[List[Dict]]) -> Dict[str, any]:
+    """
+    Extract student info and TOR entries from sorted OCR lines.
+
+    The first line mentioning a name gives the student name and the first
+    line mentioning a school, university or college the school name. Any
+    other line with a subject code followed by a description becomes an
+    entry: numbers after the code are the units and grade, remark keywords
+    the remarks, and the rest the description. The semester and school year
+    are taken from anywhere on the line.
+
+    Args:
+        lines: Output of ``group_lines``
+
+    Returns:
+        Dictionary with student_name, school_name and entries
+    """
+    entries = []
+    student_name = None
+    school_name = None
+
+    for line in lines:
+        texts = [word['text'] for word in line]
+
+        if not student_name or not school_name:
+            joined_line = ' '.join(texts)
+            joined_lower = joined_line.lower()
+
+            if not student_name and 'name' in joined_lower:
+                student_name = joined_line.split(':')[-1].strip()
+                continue
+
+            if not school_name and _SCHOOL_PATTERN.search(joined_lower):
+                school_name = joined_line
+                continue
+
+        subject_code = None
+        semester = ''
+        school_year = ''
+        remarks = ''
+        desc_parts = []
+        numeric_parts = []
+
+        # One pass over the line. The last semester keyword, school year
+        # and remark win; tokens after the code that are not numbers or
+        # remarks form the description.
+        for text in texts:
+            kind, keyword = classify_token(text)
+
+            if keyword:
+                semester = keyword
+            if kind == YEAR:
+                school_year = text
+
+            if subject_code is None:
+                if kind == CODE:
+                    subject_code = text
+            elif kind == NUMBER:
+                numeric_parts.append(text)
+            elif kind == REMARK:
+                remarks = text.capitalize()
+            else:
+                desc_parts.append(text)
+
+        description = ' '.join(desc_parts)
+        if subject_code is None or not description:
+            continue
+
+        # Assign units and grade
+        units = 0.0
+        grade = 0.0
+        if len(numeric_parts) >= 2:
+            units = float(numeric_parts[0])
+            grade = float(numeric_parts[1])
+        elif numeric_parts:
+            grade = float(numeric_parts[0])
+
+        entries.append({
+            'subject_code': subject_code,
+            'subject_description': description,
+            'student_year': '',
+            'semester': semester,
+            'school_year_offered': school_year,
+            'total_academic_units': units,
+            'final_grade': grade,
+            'remarks': remarks,
+            'pre_requisite': '',
+            'co_requisite': '',
+        })
+
+    return {
+        'student_name': student_name,
+        'school_name': school_name,
+        'entries': entries
+    }
@@ -0,0 +1,176 @@
+"""
+Lazy rasterization of PDF transcripts.
+
+Pages are rendered one at a time, on demand, at OCR_PDF_DPI, so only one
+decoded page of a long PDF is ever held in memory and pages already in the
+OCR result cache are never rendered. Rendering uses PDFium through
+pypdfium2.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.files import File
+
+from core.exceptions import ValidationException
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pypdfium2 as pdfium
+    PDF_AVAILABLE = True
+except ImportError:
+    pdfium = None
+    PDF_AVAILABLE = False
+    logger.warning("pypdfium2 not available. PDF uploads will be rejected.")
+
+PDF_MAGIC = b'%PDF-'
+
+# PDF user space units per inch
+POINTS_PER_INCH = 72
+
+
+def is_pdf(upload: File) -> bool:
+    """Whether an upload is a PDF, by content type, extension or magic bytes"""
+    if getattr(upload, 'content_type', None) == 'application/pdf':
+        return True
+    if (upload.name or '').lower().endswith('.pdf'):
+        return True
+
+    try:
+        position = upload.tell()
+        upload.seek(0)
+        header = upload.read(len(PDF_MAGIC))
+        upload.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return False
+
+    return header == PDF_MAGIC
+
+
+class PdfRasterizer:
+    """
+    Renders pages of an open PDF on demand.
+
+    Use as a context manager; the document is closed on exit.
+    """
+
+    def __init__(self, source, name: str, dpi: Optional[int] = None):
+        """
+        Args:
+            source: Path or buffer returned by ``open_upload``
+            name: File name used in error messages
+            dpi: Render resolution (default: OCR_PDF_DPI)
+
+        Raises:
+            ValidationException: If the file is not a readable PDF or has
+                too many pages
+        """
+        if not PDF_AVAILABLE:
+            raise ValidationException(
+                "PDF uploads are not supported. Please install pypdfium2.",
+                field='images'
+            )
+
+        self.name = name
+        self.dpi = dpi or getattr(settings, 'OCR_PDF_DPI', 200)
+
+        try:
+            self.document = pdfium.PdfDocument(source)
+        except pdfium.PdfiumError as e:
+            raise ValidationException(
+                f"{name} is not a readable PDF: {str(e)}",
+                field='images'
+            )
+
+        self.page_count = len(self.document)
+
+        max_pages = getattr(settings, 'OCR_PDF_MAX_PAGES', 50)
+        if self.page_count > max_pages:
+            self.close()
+            raise ValidationException(
+                f"{name} has {self.page_count} pages; the limit is {max_pages}",
+                field='images'
+            )
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    def __enter__(self) -> 'PdfRasterizer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the PDFium document"""
+        if self.document is not None:
+            self.document.close()
+            self.document = None
+
+    def render(self, page_number: int) -> np.ndarray:
+        """
+        Render one page.
+
+        Args:
+            page_number: 1-based page number
+
+        Returns:
+            H x W x 3 RGB array
+
+        Raises:
+            ValidationException: If the page does not exist or fails to render
+        """
+        if not 1 <= page_number <= len(self):
+            raise ValidationException(
+                f"{self.name} has no page {page_number}",
+                field='images'
+            )
+
+        try:
+            page = self.document[page_number - 1]
+            try:
+                width_pt, height_pt = page.get_size()
+                bitmap = page.render(scale=render_scale(width_pt, height_pt, self.dpi))
+                try:
+                    # Copy out of PDFium's buffer so it is freed right away
+                    return np.array(bitmap.to_pil().convert('RGB'))
+                finally:
+                    bitmap.close()
+            finally:
+                page.close()
+        except pdfium.PdfiumError as e:
+            raise ValidationException(
+                f"Page {page_number} of {self.name} could not be rendered: {str(e)}",
+                field='images'
+            )
+
+
+def count_pages(source, name: str) -> int:
+    """
+    Count the pages of a PDF without rendering any.
+
+    Raises:
+        ValidationException: If the file is not a readable PDF or has too
+            many pages
+    """
+    with PdfRasterizer(source, name) as rasterizer:
+        return len(rasterizer)
+
+
+def render_scale(width_pt: float, height_pt: float, dpi: int) -> float:
+    """
+    Scale factor for rendering a page at ``dpi``.
+
+    The scale is lowered for oversized pages so the rendered bitmap stays
+    within OCR_MAX_IMAGE_PIXELS.
+    """
+    scale = dpi / POINTS_PER_INCH
+    max_pixels = getattr(settings, 'OCR_MAX_IMAGE_PIXELS', 40_000_000)
+    pixels = width_pt * height_pt * scale * scale
+
+    if pixels > max_pixels:
+        scale *= (max_pixels / pixels) ** 0.5
+
+    return scale
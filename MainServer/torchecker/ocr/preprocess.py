@@ -0,0 +1,230 @@
+"""
+Image preprocessing in front of OCR.
+
+EasyOCR's detector cost grows with pixel count, and phone photos of TORs
+are far larger than the detector needs. The preprocessor estimates the
+text height on the page and downscales so text lands at a target height,
+converts to grayscale, and can optionally deskew and crop blank margins.
+Every stage is timed so the trade-off can be tuned per deployment.
+
+OpenCV is imported inside the methods that use it, so web workers that
+send pages to the OCR sidecar never load it.
+"""
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Text height is estimated on a copy no wider than this
+ESTIMATE_MAX_WIDTH = 1200
+
+# Never shrink a page by more than this factor
+MIN_SCALE = 0.25
+
+# Skew corrections outside this range (degrees) are treated as noise
+MIN_SKEW_ANGLE = 0.3
+MAX_SKEW_ANGLE = 15.0
+
+
+class ImagePreprocessor:
+    """
+    Configurable preprocessing pipeline for page images.
+    """
+
+    def __init__(
+        self,
+        target_text_height: int = 20,
+        grayscale: bool = True,
+        deskew: bool = False,
+        crop_margins: bool = False,
+        margin_padding: int = 10
+    ):
+        self.target_text_height = target_text_height
+        self.grayscale = grayscale
+        self.deskew = deskew
+        self.crop_margins = crop_margins
+        self.margin_padding = margin_padding
+
+    @classmethod
+    def from_settings(cls) -> Optional['ImagePreprocessor']:
+        """Build the preprocessor from settings, or None when disabled"""
+        if not getattr(settings, 'OCR_PREPROCESS_ENABLED', True):
+            return None
+
+        return cls(
+            target_text_height=getattr(settings, 'OCR_TARGET_TEXT_HEIGHT', 20),
+            grayscale=getattr(settings, 'OCR_PREPROCESS_GRAYSCALE', True),
+            deskew=getattr(settings, 'OCR_PREPROCESS_DESKEW', False),
+            crop_margins=getattr(settings, 'OCR_PREPROCESS_CROP_MARGINS', False),
+        )
+
+    def config_key(self) -> str:
+        """Short string identifying this configuration (for cache keys)"""
+        flags = ''.join(
+            flag for flag, enabled in (
+                ('g', self.grayscale),
+                ('d', self.deskew),
+                ('c', self.crop_margins),
+            ) if enabled
+        )
+        return f"t{self.target_text_height}{flags}"
+
+    @staticmethod
+    def _binarize(gray: np.ndarray) -> np.ndarray:
+        """Return a mask with ink pixels set (dark text on light paper)"""
+        import cv2
+
+        _, mask = cv2.threshold(
+            gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU
+        )
+        return mask
+
+    def estimate_text_height(self, gray: np.ndarray) -> Optional[float]:
+        """
+        Estimate the typical character height in pixels.
+
+        Uses the median height of connected ink components on a reduced
+        copy of the page, the image-side analogue of
+        ``OCRService.average_text_height`` over detected boxes.
+
+        Returns:
+            Estimated height in full-resolution pixels, or None if the page
+            has no usable text components
+        """
+        import cv2
+
+        height, width = gray.shape[:2]
+        factor = min(1.0, ESTIMATE_MAX_WIDTH / float(width))
+        small = gray
+        if factor < 1.0:
+            small = cv2.resize(
+                gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA
+            )
+
+        mask = self._binarize(small)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if count <= 1:
+            return None
+
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+
+        # Drop specks, ruled lines and large blobs (logos, photos)
+        max_height = small.shape[0] * 0.1
+        usable = heights[
+            (heights >= 3) & (heights <= max_height) & (widths <= small.shape[1] * 0.5)
+        ]
+        if usable.size < 10:
+            return None
+
+        return float(np.median(usable)) / factor
+
+    def _deskew(self, gray: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Rotate the page so text lines are horizontal"""
+        import cv2
+
+        coords = cv2.findNonZero(self._binarize(gray))
+        if coords is None:
+            return gray, 0.0
+
+        angle = cv2.minAreaRect(coords)[-1]
+        if angle > 45:
+            angle -= 90
+        elif angle < -45:
+            angle += 90
+
+        if not MIN_SKEW_ANGLE <= abs(angle) <= MAX_SKEW_ANGLE:
+            return gray, 0.0
+
+        height, width = gray.shape[:2]
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        rotated = cv2.warpAffine(
+            gray, matrix, (width, height),
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=255
+        )
+        return rotated, float(angle)
+
+    def _crop_margins(self, gray: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """Crop blank paper around the ink, returning the (x, y) offset"""
+        import cv2
+
+        coords = cv2.findNonZero(self._binarize(gray))
+        if coords is None:
+            return gray, (0, 0)
+
+        x, y, w, h = cv2.boundingRect(coords)
+        pad = self.margin_padding
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1 = min(gray.shape[1], x + w + pad)
+        y1 = min(gray.shape[0], y + h + pad)
+        return gray[y0:y1, x0:x1], (x0, y0)
+
+    def run(self, image: np.ndarray) -> Tuple[np.ndarray, Dict[str, any]]:
+        """
+        Preprocess a decoded RGB page.
+
+        Args:
+            image: H x W x 3 RGB array
+
+        Returns:
+            Tuple of (processed image, report with the applied scale,
+            estimated text height, skew angle, crop offset and per-stage
+            timings in milliseconds)
+        """
+        import cv2
+
+        timings = {}
+        report = {
+            'original_size': [int(image.shape[1]), int(image.shape[0])],
+            'scale': 1.0,
+            'text_height': None,
+            'angle': 0.0,
+            'crop_offset': [0, 0],
+        }
+
+        start = time.perf_counter()
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        timings['grayscale'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        text_height = self.estimate_text_height(gray)
+        report['text_height'] = round(text_height, 1) if text_height else None
+        scale = 1.0
+        if text_height:
+            scale = max(MIN_SCALE, min(1.0, self.target_text_height / text_height))
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if not self.grayscale:
+                image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        report['scale'] = round(scale, 4)
+        timings['downscale'] = (time.perf_counter() - start) * 1000
+
+        if self.deskew:
+            start = time.perf_counter()
+            gray, report['angle'] = self._deskew(gray)
+            timings['deskew'] = (time.perf_counter() - start) * 1000
+
+        if self.crop_margins:
+            start = time.perf_counter()
+            gray, offset = self._crop_margins(gray)
+            report['crop_offset'] = list(offset)
+            timings['crop_margins'] = (time.perf_counter() - start) * 1000
+
+        # Colour output is only kept when no geometric stage changed the page
+        if self.grayscale or self.deskew or self.crop_margins:
+            processed = gray
+        else:
+            processed = image
+
+        report['size'] = [int(processed.shape[1]), int(processed.shape[0])]
+        report['timings_ms'] = {
+            stage: round(ms, 2) for stage, ms in timings.items()
+        }
+
+        return processed, report
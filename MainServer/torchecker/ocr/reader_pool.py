@@ -0,0 +1,316 @@
+"""
+Process-wide pool of warm EasyOCR readers.
+
+Building an ``easyocr.Reader`` loads the detector and recognizer weights
+from disk, so readers are created once per process and leased to requests
+instead of being rebuilt for every upload.
+
+Readers run in one of two inference modes on CPU:
+
+    int8  dynamic int8 quantization of the recognizer's LSTM and linear
+          layers (EasyOCR's own CPU default)
+    fp32  the unquantized weights
+
+Dynamic quantization only covers LSTM and linear layers, so the
+convolutional CRAFT detector runs in fp32 in both modes. On GPU both modes
+run the unquantized models.
+
+EasyOCR and torch take seconds to import, so they are only imported when
+the first reader is built, or up front by :func:`load_ml_stack`. Importing
+this module (and so every ``manage.py`` command, test run and worker boot)
+only checks that they are installed.
+"""
+import importlib.util
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import status
+
+from core.exceptions import ServiceException
+
+logger = logging.getLogger(__name__)
+
+# Checked without importing them
+EASYOCR_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None for name in ('easyocr', 'torch')
+)
+if not EASYOCR_AVAILABLE:
+    logger.warning("EasyOCR not available. OCR functionality will be limited.")
+
+INFERENCE_MODES = ('int8', 'fp32')
+
+# The easyocr package once load_ml_stack() has imported it
+easyocr = None
+_ml_stack_lock = threading.Lock()
+
+
+def configure_torch_threads(threads: int) -> None:
+    """
+    Pin torch's intra-op thread pool for this process.
+
+    Args:
+        threads: Threads per operator; 0 keeps torch's default of one per core
+    """
+    if threads <= 0 or not EASYOCR_AVAILABLE:
+        return
+
+    import torch
+
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+        logger.info(f"Pinned torch to {threads} intra-op threads")
+
+
+def default_torch_threads() -> int:
+    """
+    Intra-op threads per process from settings.
+
+    OCR_TORCH_THREADS wins when set. Otherwise, when pages are OCR'd in
+    several processes, the cores are split between them so the processes
+    do not oversubscribe the CPU; a single process keeps torch's default.
+    """
+    threads = getattr(settings, 'OCR_TORCH_THREADS', 0)
+    if threads > 0:
+        return threads
+
+    from .parallel import page_workers
+
+    workers = page_workers()
+    if workers > 1:
+        return max(1, (os.cpu_count() or 1) // workers)
+
+    return 0
+
+
+class ReaderPool:
+    """
+    Bounded pool of EasyOCR readers.
+
+    Readers are created lazily up to ``max_size`` and handed out through
+    :meth:`lease`. A lease either reuses an idle (warm) reader or builds a
+    new (cold) one while the pool still has room; otherwise it waits for a
+    reader to be returned.
+    """
+
+    def __init__(
+        self,
+        languages: Optional[List[str]] = None,
+        max_size: int = 1,
+        lease_timeout: float = 60,
+        inference_mode: str = 'int8',
+        threads: int = 0
+    ):
+        if inference_mode not in INFERENCE_MODES:
+            raise ImproperlyConfigured(
+                f"Unknown OCR inference mode {inference_mode!r}; "
+                f"expected one of {', '.join(INFERENCE_MODES)}"
+            )
+
+        self.languages = list(languages or ['en'])
+        self.max_size = max(1, int(max_size))
+        self.lease_timeout = lease_timeout
+        self.inference_mode = inference_mode
+        self.threads = threads
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._load_seconds = 0.0
+        self._warm_leases = 0
+        self._cold_leases = 0
+        self._timeouts = 0
+
+    def _build_reader(self):
+        """Load a new reader and record how long the weights took to load"""
+        load_ml_stack()
+        configure_torch_threads(self.threads)
+
+        start_time = time.monotonic()
+        reader = easyocr.Reader(
+            self.languages,
+            quantize=self.inference_mode == 'int8'
+        )
+        elapsed = time.monotonic() - start_time
+
+        with self._lock:
+            self._load_seconds += elapsed
+
+        logger.info(
+            f"EasyOCR reader initialized in {elapsed:.2f}s ({self.inference_mode})"
+        )
+        return reader
+
+    def _reserve_slot(self) -> bool:
+        """Reserve room for one more reader if the pool is not full"""
+        with self._lock:
+            if self._created >= self.max_size:
+                return False
+            self._created += 1
+            return True
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._created -= 1
+
+    def _acquire(self):
+        """Take an idle reader, build one, or wait for one to be returned"""
+        try:
+            reader = self._idle.get_nowait()
+        except queue.Empty:
+            reader = None
+
+        if reader is None and self._reserve_slot():
+            try:
+                reader = self._build_reader()
+            except Exception:
+                self._release_slot()
+                raise
+
+            with self._lock:
+                self._cold_leases += 1
+            return reader
+
+        if reader is None:
+            try:
+                reader = self._idle.get(timeout=self.lease_timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._timeouts += 1
+                raise ServiceException(
+                    "OCR service is busy. Please try again shortly.",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    error_code='OCR_BUSY'
+                )
+
+        with self._lock:
+            self._warm_leases += 1
+        return reader
+
+    @contextmanager
+    def lease(self) -> Iterator:
+        """
+        Lease a reader for the duration of a ``with`` block.
+
+        Raises:
+            ServiceException: If no reader becomes free within lease_timeout
+        """
+        reader = self._acquire()
+        try:
+            yield reader
+        finally:
+            self._idle.put(reader)
+
+    def warm(self, count: Optional[int] = None) -> int:
+        """
+        Eagerly build readers so the first requests do not pay the load cost.
+
+        Args:
+            count: Number of readers to have loaded (default: 1)
+
+        Returns:
+            Number of readers built by this call
+        """
+        target = min(self.max_size, count or 1)
+        built = 0
+
+        while self._created < target and self._reserve_slot():
+            try:
+                reader = self._build_reader()
+            except Exception:
+                self._release_slot()
+                raise
+            self._idle.put(reader)
+            built += 1
+
+        return built
+
+    def stats(self) -> Dict[str, any]:
+        """Return pool size and warm/cold lease counters"""
+        with self._lock:
+            return {
+                'languages': self.languages,
+                'inference_mode': self.inference_mode,
+                'threads': self.threads,
+                'max_size': self.max_size,
+                'loaded': self._created,
+                'idle': self._idle.qsize(),
+                'warm_leases': self._warm_leases,
+                'cold_leases': self._cold_leases,
+                'timeouts': self._timeouts,
+                'load_seconds': round(self._load_seconds, 3),
+            }
+
+
+_pool: Optional[ReaderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_reader_pool() -> ReaderPool:
+    """Return the process-wide reader pool, creating it from settings"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReaderPool(
+                    languages=getattr(settings, 'OCR_LANGUAGES', ['en']),
+                    max_size=getattr(settings, 'OCR_READER_POOL_SIZE', 1),
+                    lease_timeout=getattr(settings, 'OCR_READER_LEASE_TIMEOUT', 60),
+                    inference_mode=getattr(settings, 'OCR_INFERENCE_MODE', 'int8'),
+                    threads=default_torch_threads(),
+                )
+
+    return _pool
+
+
+def load_ml_stack() -> float:
+    """
+    Import EasyOCR and torch if they are not imported yet.
+
+    Called before the first reader is built, and from warm-up hooks that
+    want the import cost paid before requests arrive.
+
+    Returns:
+        Seconds spent importing (0 when already imported)
+    """
+    global easyocr
+
+    if easyocr is not None:
+        return 0.0
+
+    with _ml_stack_lock:
+        if easyocr is not None:
+            return 0.0
+
+        start_time = time.monotonic()
+        import easyocr as easyocr_package
+        easyocr = easyocr_package
+        elapsed = time.monotonic() - start_time
+
+    logger.info(f"Imported EasyOCR and torch in {elapsed:.2f}s")
+    return elapsed
+
+
+def warm_reader_pool() -> int:
+    """
+    Load readers up front.
+
+    Called from the gunicorn master when ``preload_app`` is enabled so the
+    model weights are loaded before workers fork and their memory pages are
+    shared copy-on-write. The ML stack is imported even when no readers are
+    preloaded. Nothing is loaded when OCR runs in the sidecar.
+    """
+    if not EASYOCR_AVAILABLE or getattr(settings, 'OCR_SIDECAR_SOCKET', ''):
+        return 0
+
+    load_ml_stack()
+
+    pool = get_reader_pool()
+    return pool.warm(getattr(settings, 'OCR_PRELOAD_READERS', 1))
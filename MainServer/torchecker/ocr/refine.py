@@ -0,0 +1,253 @@
+"""
+Second recognition pass over low-confidence crops.
+
+Layout grouping drops boxes at or below ``MIN_CONFIDENCE`` and a misread
+grade in a kept box silently parses to the wrong number. Re-running a whole
+page at a higher resolution costs as much as the first pass, so only the
+least confident boxes of a page are recognized again, capped at a fixed
+number per page. Each of those is re-cut with some padding from the
+highest-resolution copy of the page available (the decoded upload before
+the preprocessor downscaled it, when the page was only scaled and
+cropped), upscaled to the recognizer's input height with bicubic
+interpolation and recognized in one batch. The reading with the higher
+confidence is kept.
+
+OpenCV is imported where it is used, as in :mod:`.preprocess`.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .batching import recognize_crops
+
+logger = logging.getLogger(__name__)
+
+
+class ConfidenceRefiner:
+    """
+    Re-recognizes a page's low-confidence boxes from upscaled crops.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        max_crops: int = 16,
+        padding: float = 0.15
+    ):
+        """
+        Args:
+            threshold: Boxes below this confidence are recognized again
+            max_crops: Upper bound on boxes recognized again per page
+            padding: Context added around each box, as a fraction of its
+                height
+        """
+        self.threshold = threshold
+        self.max_crops = max_crops
+        self.padding = padding
+
+    @classmethod
+    def from_settings(cls) -> Optional['ConfidenceRefiner']:
+        """Build the refiner from settings, or None when disabled"""
+        if not getattr(settings, 'OCR_REFINE_ENABLED', False):
+            return None
+
+        return cls(
+            threshold=getattr(settings, 'OCR_REFINE_THRESHOLD', 0.5),
+            max_crops=getattr(settings, 'OCR_REFINE_MAX_CROPS', 16),
+        )
+
+    def config_key(self) -> str:
+        """Short string identifying this configuration (for cache keys)"""
+        return (
+            f"c{round(self.threshold * 100)}n{self.max_crops}"
+            f"p{round(self.padding * 100)}"
+        )
+
+    def select(self, results: List) -> List[int]:
+        """
+        Pick the boxes to recognize again.
+
+        Returns:
+            Indices into ``results`` of the least confident boxes below the
+            threshold, at most ``max_crops`` of them
+        """
+        low = [
+            index for index, (_, _, confidence) in enumerate(results)
+            if confidence < self.threshold
+        ]
+        low.sort(key=lambda index: results[index][2])
+        return low[:self.max_crops]
+
+    @staticmethod
+    def source_mapping(
+        page: np.ndarray,
+        source: Optional[np.ndarray],
+        preprocessing: Optional[Dict]
+    ) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+        """
+        Choose the image crops are re-cut from.
+
+        Args:
+            page: Grayscale page the boxes were detected on
+            source: Decoded page before preprocessing, if kept
+            preprocessing: Preprocessor report of the page
+
+        Returns:
+            Tuple of (grayscale image, factor, (x offset, y offset)) such
+            that a point p on ``page`` is at (p + offset) * factor on the
+            image
+        """
+        import cv2
+
+        if (
+            source is None
+            or not preprocessing
+            or preprocessing.get('angle')
+            or preprocessing.get('scale', 1.0) >= 1.0
+        ):
+            return page, 1.0, (0.0, 0.0)
+
+        if source.ndim == 3:
+            source = cv2.cvtColor(source, cv2.COLOR_RGB2GRAY)
+
+        offset_x, offset_y = preprocessing.get('crop_offset') or (0, 0)
+        return source, 1.0 / preprocessing['scale'], (float(offset_x), float(offset_y))
+
+    def cut(
+        self,
+        image: np.ndarray,
+        box: List,
+        factor: float,
+        offset: Tuple[float, float],
+        height: int
+    ) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Cut one box out of ``image`` and resize it for the recognizer.
+
+        Returns:
+            Tuple of (crop at the recognizer height, padded width), or None
+            if the box is empty
+        """
+        import cv2
+        from easyocr.utils import get_image_list
+
+        points = (np.asarray(box, dtype=np.float64) + offset) * factor
+        xs, ys = points[:, 0], points[:, 1]
+        axis_aligned = (
+            xs[0] == xs[3] and xs[1] == xs[2] and ys[0] == ys[1] and ys[2] == ys[3]
+        )
+
+        if not axis_aligned:
+            # Rotated boxes are rectified the same way as on the first pass
+            image_list, width = get_image_list(
+                [], [points.astype(np.float32)], image, model_height=height
+            )
+            return (image_list[0][1], int(width)) if image_list else None
+
+        pad = (ys.max() - ys.min()) * self.padding
+        x_min = max(0, int(xs.min() - pad))
+        x_max = min(image.shape[1], int(np.ceil(xs.max() + pad)))
+        y_min = max(0, int(ys.min() - pad))
+        y_max = min(image.shape[0], int(np.ceil(ys.max() + pad)))
+        if x_max <= x_min or y_max <= y_min:
+            return None
+
+        crop = image[y_min:y_max, x_min:x_max]
+        if crop.shape[0] < height:
+            scale = height / crop.shape[0]
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+        image_list, width = get_image_list(
+            [[0, crop.shape[1], 0, crop.shape[0]]], [], crop, model_height=height
+        )
+        return (image_list[0][1], int(width)) if image_list else None
+
+    def collect(
+        self,
+        page: np.ndarray,
+        results: List,
+        height: int,
+        source: Optional[np.ndarray] = None,
+        preprocessing: Optional[Dict] = None
+    ) -> List[Tuple[int, Tuple]]:
+        """
+        Build the crops to recognize again for one page.
+
+        Returns:
+            (index into ``results``, (box, crop, width)) pairs ready for
+            ``recognize_crops``
+        """
+        picks = self.select(results)
+        if not picks:
+            return []
+
+        image, factor, offset = self.source_mapping(page, source, preprocessing)
+
+        crops = []
+        for index in picks:
+            box = results[index][0]
+            cut = self.cut(image, box, factor, offset, height)
+            if cut is not None:
+                crops.append((index, (box, cut[0], cut[1])))
+        return crops
+
+    @staticmethod
+    def merge(
+        results: List,
+        crops: List[Tuple[int, Tuple]],
+        recognized: List[Tuple]
+    ) -> Tuple[List, int]:
+        """
+        Keep the second reading of a box wherever it is more confident.
+
+        Returns:
+            Tuple of (merged results, number of boxes replaced)
+        """
+        merged = list(results)
+        improved = 0
+
+        for (index, _), (_, text, confidence) in zip(crops, recognized):
+            box, _, previous = merged[index]
+            if confidence > previous:
+                merged[index] = (box, text, confidence)
+                improved += 1
+
+        return merged, improved
+
+    def refine(
+        self,
+        reader,
+        page: np.ndarray,
+        results: List,
+        batch_size: int,
+        height: int,
+        source: Optional[np.ndarray] = None,
+        preprocessing: Optional[Dict] = None
+    ) -> List:
+        """
+        Recognize a page's low-confidence boxes again.
+
+        Args:
+            reader: easyocr.Reader
+            page: Grayscale page the boxes were detected on
+            results: First-pass (box, text, confidence) results
+            batch_size: Maximum crops per recognizer forward pass
+            height: Recognizer input height
+            source: Decoded page before preprocessing, if kept
+            preprocessing: Preprocessor report of the page
+
+        Returns:
+            The results with improved readings substituted
+        """
+        crops = self.collect(page, results, height, source, preprocessing)
+        if not crops:
+            return results
+
+        recognized = recognize_crops(reader, [crop for _, crop in crops], batch_size, height)
+        merged, improved = self.merge(results, crops, recognized)
+
+        logger.debug(f"Re-recognized {len(crops)} low-confidence boxes, kept {improved}")
+
+        return merged
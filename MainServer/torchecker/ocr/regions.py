@@ -0,0 +1,160 @@
+"""
+Table region detection between text detection and recognition.
+
+Most of a TOR page is letterhead, signatures and legends, and the parser
+only needs the grades table plus the name and school near the top. The
+detector's boxes are grouped into rows; rows with several boxes side by
+side are table rows, and the table spans from the first to the last of
+them. Only boxes inside that span (padded by a few text lines) or inside a
+header band at the top of the page are passed on to the recognizer, so the
+expensive per-box recognition skips the rest of the page.
+
+The pre-pass works on the detector output that recognition needs anyway,
+so it costs a few array operations per page. Pages without a recognizable
+table are recognized in full.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .layout import LINE_GAP_RATIO
+
+logger = logging.getLogger(__name__)
+
+
+class TableRegionFilter:
+    """
+    Drops detected boxes outside the grades table and the header band.
+    """
+
+    def __init__(
+        self,
+        min_columns: int = 3,
+        min_rows: int = 3,
+        header_band: float = 0.25,
+        margin_lines: float = 1.5
+    ):
+        """
+        Args:
+            min_columns: Boxes a row needs to count as a table row
+            min_rows: Table rows a page needs before anything is dropped
+            header_band: Top fraction of the page that is always kept
+            margin_lines: Padding above and below the table, in text heights
+        """
+        self.min_columns = min_columns
+        self.min_rows = min_rows
+        self.header_band = header_band
+        self.margin_lines = margin_lines
+
+    @classmethod
+    def from_settings(cls) -> Optional['TableRegionFilter']:
+        """Build the filter from settings, or None when disabled"""
+        if not getattr(settings, 'OCR_TABLE_REGION_ENABLED', False):
+            return None
+
+        return cls(
+            min_columns=getattr(settings, 'OCR_TABLE_MIN_COLUMNS', 3),
+            min_rows=getattr(settings, 'OCR_TABLE_MIN_ROWS', 3),
+            header_band=getattr(settings, 'OCR_TABLE_HEADER_BAND', 0.25),
+        )
+
+    def config_key(self) -> str:
+        """Short string identifying this configuration (for cache keys)"""
+        return (
+            f"r{self.min_columns}x{self.min_rows}"
+            f"h{round(self.header_band * 100)}m{self.margin_lines:g}"
+        )
+
+    @staticmethod
+    def _vertical_extents(horizontal_list: List, free_list: List) -> Tuple[np.ndarray, np.ndarray]:
+        """Top and bottom y of every box, horizontal boxes first"""
+        tops = [box[2] for box in horizontal_list]
+        bottoms = [box[3] for box in horizontal_list]
+
+        for box in free_list:
+            ys = [point[1] for point in box]
+            tops.append(min(ys))
+            bottoms.append(max(ys))
+
+        return np.asarray(tops, dtype=np.float64), np.asarray(bottoms, dtype=np.float64)
+
+    def find_table(
+        self,
+        horizontal_list: List,
+        free_list: List
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Locate the table's vertical span.
+
+        Args:
+            horizontal_list: Detected [x_min, x_max, y_min, y_max] boxes
+            free_list: Detected four-point boxes
+
+        Returns:
+            (top, bottom) in page pixels including the margin, or None if
+            the page has fewer than ``min_rows`` table rows
+        """
+        tops, bottoms = self._vertical_extents(horizontal_list, free_list)
+        if tops.size < self.min_columns * self.min_rows:
+            return None
+
+        centers = (tops + bottoms) / 2
+        text_height = float(np.mean(bottoms - tops))
+
+        # Same row split as the layout engine uses for lines
+        order = np.argsort(centers, kind='stable')
+        breaks = np.diff(centers[order]) >= text_height * LINE_GAP_RATIO
+        row_of = np.empty(order.size, dtype=np.intp)
+        row_of[order] = np.concatenate(([0], np.cumsum(breaks)))
+
+        table_rows = np.flatnonzero(np.bincount(row_of) >= self.min_columns)
+        if table_rows.size < self.min_rows:
+            return None
+
+        first = row_of == table_rows[0]
+        last = row_of == table_rows[-1]
+        margin = text_height * self.margin_lines
+
+        return float(tops[first].min() - margin), float(bottoms[last].max() + margin)
+
+    def apply(
+        self,
+        horizontal_list: List,
+        free_list: List,
+        page_height: int
+    ) -> Tuple[List, List]:
+        """
+        Keep the boxes inside the table span or the header band.
+
+        Args:
+            horizontal_list: Detected [x_min, x_max, y_min, y_max] boxes
+            free_list: Detected four-point boxes
+            page_height: Height of the detected page in pixels
+
+        Returns:
+            Filtered (horizontal_list, free_list); unchanged when no table
+            is found
+        """
+        table = self.find_table(horizontal_list, free_list)
+        if table is None:
+            return horizontal_list, free_list
+
+        tops, bottoms = self._vertical_extents(horizontal_list, free_list)
+        centers = (tops + bottoms) / 2
+        keep = (
+            ((centers >= table[0]) & (centers <= table[1]))
+            | (centers <= page_height * self.header_band)
+        )
+
+        split = len(horizontal_list)
+        kept_horizontal = [box for box, kept in zip(horizontal_list, keep[:split]) if kept]
+        kept_free = [box for box, kept in zip(free_list, keep[split:]) if kept]
+
+        logger.debug(
+            f"Table rows span y={table[0]:.0f}-{table[1]:.0f}; recognizing "
+            f"{len(kept_horizontal) + len(kept_free)} of {keep.size} boxes"
+        )
+
+        return kept_horizontal, kept_free
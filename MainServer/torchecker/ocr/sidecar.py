@@ -0,0 +1,337 @@
+"""
+OCR sidecar: a long-running local process that owns the OCR models.
+
+Importing the ML stack and loading the models into every gunicorn worker
+costs each of them hundreds of megabytes, although most requests never run
+OCR. With OCR_SIDECAR_SOCKET set, ``OCRService`` sends pages to the
+``run_ocr_sidecar`` process over a Unix socket instead of OCR'ing them in
+the web worker, so OCR capacity (sidecar readers and CPU slots) is sized
+separately from API capacity. Without it, OCR runs in-process as before.
+
+Protocol: every message is a frame made of a 4-byte big-endian header
+length, a JSON header and, if the header has a ``size``, that many bytes of
+body. A request carries the uploaded file as its body:
+
+    {"op": "image", "name": ..., "size": ...}
+    {"op": "pdf_page", "name": ..., "size": ..., "page_number": ...}
+    {"op": "pdf", "name": ..., "size": ..., "pages": [...] or null}
+    {"op": "stats"}
+
+The sidecar answers with one ``{"result": {...}}`` frame per page, then
+``{"done": true}``, or with ``{"error": {...}}`` carrying the
+ServiceException to raise in the caller.
+"""
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+
+from core.exceptions import ServiceException, ValidationException
+
+from .image_io import check_upload_size
+from .instrumentation import record_remote_timings
+
+logger = logging.getLogger(__name__)
+
+HEADER_LENGTH = struct.Struct('>I')
+
+# Upper bound on a JSON header, so a corrupt length cannot allocate much
+MAX_HEADER_BYTES = 16 * 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ProtocolError(Exception):
+    """A peer sent a malformed frame or closed the connection mid-frame"""
+
+
+def _read_exact(stream, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ProtocolError(f"Connection closed after {len(data)} of {size} bytes")
+    return data
+
+
+def read_frame(stream) -> Optional[Dict]:
+    """
+    Read one frame header from a buffered stream.
+
+    The body, if any, is left on the stream for the caller to read.
+
+    Returns:
+        The decoded header, or None if the peer closed the connection
+        between frames
+    """
+    prefix = stream.read(HEADER_LENGTH.size)
+    if not prefix:
+        return None
+    if len(prefix) != HEADER_LENGTH.size:
+        raise ProtocolError("Connection closed inside a frame header")
+
+    (length,) = HEADER_LENGTH.unpack(prefix)
+    if length > MAX_HEADER_BYTES:
+        raise ProtocolError(f"Frame header of {length} bytes is too large")
+
+    try:
+        return json.loads(_read_exact(stream, length))
+    except ValueError as e:
+        raise ProtocolError(f"Malformed frame header: {e}")
+
+
+def write_frame(stream, header: Dict, body: Optional[File] = None) -> None:
+    """Write one frame, streaming ``body`` from the file in chunks"""
+    if body is not None:
+        header = dict(header, size=body.size)
+
+    data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    stream.write(HEADER_LENGTH.pack(len(data)) + data)
+
+    if body is not None:
+        for chunk in body.chunks(CHUNK_SIZE):
+            stream.write(chunk)
+    stream.flush()
+
+
+def _error_payload(error: ServiceException) -> Dict:
+    return {
+        'message': error.message,
+        'status_code': error.status_code,
+        'error_code': error.error_code,
+    }
+
+
+class SidecarClient:
+    """
+    Sends OCR requests to the sidecar, one connection per request.
+    """
+
+    def __init__(self, path: str, timeout: float = 120):
+        """
+        Args:
+            path: Unix socket the sidecar listens on
+            timeout: Seconds to wait for each response frame
+        """
+        self.path = str(path)
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls) -> Optional['SidecarClient']:
+        """Build the client from settings, or None to OCR in-process"""
+        path = getattr(settings, 'OCR_SIDECAR_SOCKET', '')
+        if not path:
+            return None
+
+        return cls(path, timeout=getattr(settings, 'OCR_SIDECAR_TIMEOUT', 120))
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            logger.error(f"OCR sidecar unreachable at {self.path}: {e}")
+            raise ServiceException(
+                "OCR service is unavailable. Please try again shortly.",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                error_code='OCR_UNAVAILABLE'
+            )
+        return sock
+
+    def _request(self, header: Dict, upload: Optional[File] = None) -> Iterator[Dict]:
+        """
+        Send a request and yield the results it returns.
+
+        Raises:
+            ServiceException: As raised by the sidecar, or if the sidecar
+                cannot be reached or times out
+        """
+        if upload is not None:
+            check_upload_size(upload)
+
+        sock = self._connect()
+        try:
+            with sock.makefile('rwb') as stream:
+                write_frame(stream, header, upload)
+
+                while True:
+                    frame = read_frame(stream)
+                    if frame is None:
+                        raise ProtocolError("Connection closed before the response ended")
+                    if frame.get('done'):
+                        return
+                    if 'error' in frame:
+                        raise ServiceException(**frame['error'])
+
+                    result = frame['result']
+                    record_remote_timings(result)
+                    yield result
+
+        except socket.timeout:
+            raise ServiceException(
+                "OCR timed out. Please try again.",
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                error_code='OCR_TIMEOUT'
+            )
+        except (OSError, ProtocolError) as e:
+            logger.error(f"OCR sidecar request failed: {e}")
+            raise ServiceException(
+                "OCR service is unavailable. Please try again shortly.",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                error_code='OCR_UNAVAILABLE'
+            )
+        finally:
+            sock.close()
+
+    def _request_one(self, header: Dict, upload: Optional[File] = None) -> Dict:
+        """Send a request answered with a single result"""
+        results = list(self._request(header, upload))
+        if len(results) != 1:
+            raise ServiceException(
+                "OCR service returned an unexpected response.",
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                error_code='OCR_UNAVAILABLE'
+            )
+        return results[0]
+
+    def process_image(self, image_file: File) -> Dict:
+        """OCR one page image in the sidecar"""
+        return self._request_one({'op': 'image', 'name': image_file.name}, image_file)
+
+    def process_pdf_page(self, pdf_file: File, page_number: int) -> Dict:
+        """OCR one page of a PDF in the sidecar"""
+        return self._request_one(
+            {'op': 'pdf_page', 'name': pdf_file.name, 'page_number': page_number},
+            pdf_file
+        )
+
+    def iter_process_pdf(
+        self,
+        pdf_file: File,
+        pages: Optional[List[int]] = None
+    ) -> Iterator[Dict]:
+        """OCR the pages of a PDF in the sidecar, yielding each as it is done"""
+        yield from self._request(
+            {'op': 'pdf', 'name': pdf_file.name, 'pages': pages},
+            pdf_file
+        )
+
+    def stats(self) -> Dict:
+        """Reader pool statistics of the sidecar"""
+        return self._request_one({'op': 'stats'})
+
+
+class SidecarRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Serves the requests of one client connection.
+    """
+
+    def handle(self) -> None:
+        while True:
+            try:
+                header = read_frame(self.rfile)
+                if header is None:
+                    return
+
+                body = None
+                if 'size' in header:
+                    body = self._read_body(header)
+                    if body is None:
+                        # The oversized body is still on the stream
+                        return
+
+                for result in self._dispatch(header, body):
+                    write_frame(self.wfile, {'result': result})
+                write_frame(self.wfile, {'done': True})
+
+            except ServiceException as e:
+                self._reply_error(e)
+
+            except (OSError, ProtocolError) as e:
+                logger.warning(f"OCR sidecar connection dropped: {e}")
+                return
+
+            except Exception as e:
+                logger.error(f"OCR sidecar request failed: {str(e)}", exc_info=True)
+                self._reply_error(ServiceException(
+                    "An unexpected error occurred during OCR",
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    error_code='OCR_ERROR'
+                ))
+
+    def _read_body(self, header: Dict) -> Optional[SimpleUploadedFile]:
+        """Read a request body, or reply with an error if it is too large"""
+        size = int(header['size'])
+        max_bytes = getattr(settings, 'OCR_MAX_UPLOAD_BYTES', 20 * 1024 * 1024)
+
+        if size > max_bytes:
+            self._reply_error(ValidationException(
+                f"{header.get('name')} is {size / (1024 * 1024):.1f} MB; "
+                f"the limit is {max_bytes / (1024 * 1024):.0f} MB",
+                field='images'
+            ))
+            return None
+
+        return SimpleUploadedFile(header.get('name') or 'page', _read_exact(self.rfile, size))
+
+    def _dispatch(self, header: Dict, body: Optional[File]) -> Iterator[Dict]:
+        service = self.server.ocr_service
+        op = header.get('op')
+
+        if op == 'image':
+            yield service.process_image(body)
+        elif op == 'pdf_page':
+            yield service.process_pdf_page(body, int(header['page_number']))
+        elif op == 'pdf':
+            yield from service.iter_process_pdf(body, header.get('pages'))
+        elif op == 'stats':
+            yield service.reader_pool.stats()
+        else:
+            raise ValidationException(f"Unknown OCR sidecar operation: {op}")
+
+    def _reply_error(self, error: ServiceException) -> None:
+        try:
+            write_frame(self.wfile, {'error': _error_payload(error)})
+        except OSError:
+            pass
+
+
+class SidecarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded Unix socket server running OCR for local clients.
+
+    Each connection gets a thread. Concurrent pages share the reader pool
+    and the CPU governor, which bound how many actually run at once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, ocr_service):
+        """
+        Args:
+            path: Socket path; a stale socket file there is replaced
+            ocr_service: In-process OCRService that runs the pages
+        """
+        self.ocr_service = ocr_service
+        self.path = str(path)
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        super().__init__(self.path, SidecarRequestHandler)
+        # Web workers may run as another user of the same group
+        os.chmod(self.path, 0o660)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,14 +1,67 @@
 """Serializers for torchecker API endpoints"""
+from typing import List, Optional
 from rest_framework import serializers
-from .models import TorTransferee
+from core.exceptions import ValidationException
+from .models import TorStudentSummary, TorTransferee
 
 
 class TorTransfereeSerializer(serializers.ModelSerializer):
-    """Serializer for TorTransferee model"""
+    """
+    Serializer for TorTransferee model.
+    
+    Pass ``fields`` to serialize only some of the fields.
+    """
     
     is_passing_grade = serializers.BooleanField(read_only=True)
     display_grade = serializers.CharField(read_only=True)
     
+    # Model columns the computed fields are read from
+    COMPUTED_FIELD_SOURCES = {
+        'is_passing_grade': ['final_grade'],
+        'display_grade': ['final_grade', 'remarks'],
+    }
+    
+    def __init__(self, *args, fields: Optional[List[str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    @classmethod
+    def parse_fields(cls, value: Optional[str]) -> Optional[List[str]]:
+        """
+        Parse a comma-separated ``fields`` query parameter.
+        
+        Returns:
+            The requested field names, or None for all fields
+            
+        Raises:
+            ValidationException: If a field is unknown
+        """
+        if not value:
+            return None
+        
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in cls.Meta.fields]
+        if unknown:
+            raise ValidationException(
+                f"Unknown fields: {', '.join(unknown)}",
+                field='fields'
+            )
+        
+        return fields
+    
+    @classmethod
+    def columns_for(cls, fields: List[str]) -> List[str]:
+        """Model columns needed to serialize ``fields``"""
+        columns = []
+        for name in fields:
+            for column in cls.COMPUTED_FIELD_SOURCES.get(name, [name]):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+    
     class Meta:
         model = TorTransferee
         fields = [
@@ -34,7 +87,17 @@ class TorTransfereeSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class UniqueStudentSerializer(serializers.Serializer):
-    """Serializer for unique student/school combinations"""
-    student_name = serializers.CharField()
-    school_name = serializers.CharField()
+class StudentSummarySerializer(serializers.ModelSerializer):
+    """Serializer for per-account student summaries"""
+    
+    class Meta:
+        model = TorStudentSummary
+        fields = [
+            'id',
+            'account_id',
+            'student_name',
+            'school_name',
+            'entry_count',
+            'last_upload_at'
+        ]
+        read_only_fields = fields
@@ -1,5 +1,6 @@
 """TorChecker services package"""
 from .ocr_service import OCRService
 from .tor_service import TorService
+from .ocr_job_service import OcrJobService
 
-__all__ = ['OCRService', 'TorService']
\ No newline at end of file
+__all__ = ['OCRService', 'TorService', 'OcrJobService']
\ No newline at end of file
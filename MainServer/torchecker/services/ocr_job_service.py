@@ -0,0 +1,370 @@
+"""
+Asynchronous OCR job pipeline.
+
+Uploads are stored as TorDocument pages and queued as OcrJob rows. The
+``run_ocr_worker`` management command claims queued jobs and runs the
+regular OCRService / TorService steps on them, so web workers only pay for
+storing the files.
+"""
+from datetime import timedelta
+from typing import List, Dict, Optional
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.core.files.uploadedfile import UploadedFile
+from core.exceptions import (
+    ValidationException,
+    ResourceNotFoundException,
+    ServiceException
+)
+from core.decorators import log_execution, atomic_transaction
+from ..models import OcrJob, OcrJobPage, TorDocument
+from ..ocr.pdf import count_pages, is_pdf
+from ..ocr.image_io import open_upload
+from .ocr_service import OCRService
+from .tor_service import TorService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OcrJobService:
+    """
+    Service for queueing and running OCR jobs.
+    """
+
+    @staticmethod
+    @atomic_transaction
+    @log_execution
+    def enqueue(account_id: str, files: List[UploadedFile]) -> OcrJob:
+        """
+        Store uploaded pages and queue them for OCR.
+
+        A PDF is stored once and queued as one job page per PDF page. If
+        queueing fails, the files already stored are deleted again, as the
+        transaction only rolls back the rows.
+
+        Args:
+            account_id: Student account ID
+            files: Uploaded page images or PDFs in page order
+
+        Returns:
+            Created OcrJob instance
+        """
+        if not account_id:
+            raise ValidationException("account_id is required")
+
+        if not files:
+            raise ValidationException("No images uploaded")
+
+        # Count PDF pages up front so an unreadable PDF is rejected before
+        # anything is stored
+        uploads = []
+        for upload in files:
+            if is_pdf(upload):
+                source, _ = open_upload(upload)
+                uploads.append((upload, range(1, count_pages(source, upload.name) + 1)))
+            else:
+                uploads.append((upload, [None]))
+
+        total_pages = sum(len(source_pages) for _, source_pages in uploads)
+        job = OcrJob.objects.create(
+            account_id=account_id,
+            total_pages=total_pages
+        )
+
+        page_number = 0
+        documents = []
+        try:
+            for upload, source_pages in uploads:
+                upload.seek(0)
+                document = TorDocument.objects.create(
+                    account_id=account_id,
+                    file=upload
+                )
+                documents.append(document)
+                for source_page in source_pages:
+                    page_number += 1
+                    OcrJobPage.objects.create(
+                        job=job,
+                        document=document,
+                        page_number=page_number,
+                        source_page=source_page
+                    )
+        except Exception:
+            for document in documents:
+                document.file.delete(save=False)
+            raise
+
+        logger.info(
+            f"Queued OCR job {job.id} with {total_pages} pages for account: {account_id}"
+        )
+
+        return job
+
+    @staticmethod
+    def claim_next_job() -> Optional[OcrJob]:
+        """
+        Claim the oldest queued job.
+
+        Uses SELECT ... FOR UPDATE SKIP LOCKED so several workers can poll
+        the same table without picking up the same job.
+
+        Returns:
+            Claimed OcrJob (now running) or None if the queue is empty
+        """
+        with transaction.atomic():
+            job = (
+                OcrJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=OcrJob.Status.QUEUED)
+                .order_by('created_at')
+                .first()
+            )
+
+            if job is None:
+                return None
+
+            job.status = OcrJob.Status.RUNNING
+            job.started_at = job.heartbeat_at = timezone.now()
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+
+        return job
+
+    @staticmethod
+    def requeue_stale_jobs(timeout_seconds: int) -> int:
+        """
+        Put running jobs whose worker died back on the queue.
+
+        A running job's worker bumps its heartbeat after every page, so a
+        job without a heartbeat for ``timeout_seconds`` has lost its worker.
+        Workers call this on every poll, so a job interrupted by a worker
+        crash is picked up again once the timeout passes, even when the
+        crashed worker is restarted straight away.
+
+        Args:
+            timeout_seconds: Seconds without a heartbeat before a job
+                counts as stale; well above the time to OCR one page
+
+        Returns:
+            Number of jobs requeued
+        """
+        cutoff = timezone.now() - timedelta(seconds=timeout_seconds)
+
+        with transaction.atomic():
+            stale = OcrJob.objects.filter(
+                Q(heartbeat_at__lt=cutoff)
+                | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+                status=OcrJob.Status.RUNNING
+            )
+            OcrJobPage.objects.filter(
+                job__in=stale,
+                status=OcrJobPage.Status.PROCESSING
+            ).update(status=OcrJobPage.Status.PENDING)
+            count = stale.update(status=OcrJob.Status.QUEUED)
+
+        if count:
+            logger.warning(f"Requeued {count} stale OCR jobs")
+
+        return count
+
+    @staticmethod
+    def _record_progress(job: OcrJob) -> None:
+        """Recount finished pages from page states and bump the heartbeat"""
+        processed = job.pages.filter(
+            status__in=[OcrJobPage.Status.DONE, OcrJobPage.Status.FAILED]
+        ).count()
+        OcrJob.objects.filter(pk=job.pk).update(
+            processed_pages=processed,
+            heartbeat_at=timezone.now()
+        )
+
+    @staticmethod
+    def _build_result(job: OcrJob) -> Dict[str, any]:
+        """
+        Build the job payload from the stored results of all its pages.
+
+        Pages finished by an earlier, interrupted run of the job count the
+        same as pages finished by this one.
+        """
+        student_name = None
+        school_name = None
+        all_entries = []
+        failed_pages = []
+
+        for page in job.pages.order_by('page_number'):
+            if page.status == OcrJobPage.Status.FAILED:
+                failed_pages.append({
+                    "page_number": page.page_number,
+                    "error": page.error,
+                })
+                continue
+
+            result = page.result or {}
+            student_name = student_name or result.get('student_name')
+            school_name = school_name or result.get('school_name')
+            all_entries.extend(result.get('entries', []))
+
+        return {
+            "student_name": student_name,
+            "school_name": school_name,
+            "ocr_results": all_entries,
+            "school_tor": TorService.get_school_tor_reference(),
+            "failed_pages": failed_pages,
+        }
+
+    @staticmethod
+    @log_execution
+    def run_job(job: OcrJob, ocr_service: Optional[OCRService] = None) -> OcrJob:
+        """
+        OCR every pending page of a job and persist the extracted entries.
+
+        Pages are processed in order and a failing page is recorded on its
+        OcrJobPage without stopping the rest of the job. Pages already done
+        by an earlier run of the job are skipped, and their stored results
+        still make up the job result.
+
+        Args:
+            job: Claimed OcrJob instance
+            ocr_service: OCR service to use (default: new OCRService)
+
+        Returns:
+            The finished OcrJob
+        """
+        ocr_service = ocr_service or OCRService()
+
+        try:
+            pages = list(job.pages.select_related('document').order_by('page_number'))
+
+            # Names found on pages done by an earlier run carry over
+            done = [
+                page.result or {} for page in pages
+                if page.status == OcrJobPage.Status.DONE
+            ]
+            student_name = next((r['student_name'] for r in done if r.get('student_name')), None)
+            school_name = next((r['school_name'] for r in done if r.get('school_name')), None)
+
+            for page in pages:
+                if page.status == OcrJobPage.Status.DONE:
+                    continue
+
+                page.status = OcrJobPage.Status.PROCESSING
+                page.save(update_fields=['status'])
+
+                try:
+                    document_file = page.document.file
+                    with document_file.open('rb'):
+                        if page.source_page:
+                            result = ocr_service.process_pdf_page(
+                                document_file, page.source_page
+                            )
+                        else:
+                            result = ocr_service.process_image(document_file)
+
+                    if not student_name and result.get('student_name'):
+                        student_name = result['student_name']
+                    if not school_name and result.get('school_name'):
+                        school_name = result['school_name']
+
+                    source_page = TorService.save_document_page(
+                        page.document,
+                        page.source_page,
+                        result.get('boxes'),
+                        OCRService.PARSER_VERSION
+                    )
+
+                    saved = []
+                    if result.get('entries'):
+                        saved = TorService.save_tor_entries(
+                            account_id=job.account_id,
+                            student_name=student_name or "Unknown",
+                            school_name=school_name or "Unknown",
+                            entries=result['entries'],
+                            source_page=source_page
+                        )
+
+                    page.status = OcrJobPage.Status.DONE
+                    page.entry_count = len(saved)
+                    page.error = ''
+                    page.result = {
+                        "student_name": result.get('student_name'),
+                        "school_name": result.get('school_name'),
+                        "entries": TorService.serialize_saved_entries(saved),
+                    }
+                    page.save(update_fields=['status', 'entry_count', 'error', 'result'])
+
+                except ServiceException as e:
+                    logger.error(f"OCR job {job.id} page {page.page_number} failed: {e.message}")
+                    OcrJobService._fail_page(page, e.message)
+
+                except Exception as e:
+                    logger.error(
+                        f"OCR job {job.id} page {page.page_number} failed: {str(e)}",
+                        exc_info=True
+                    )
+                    OcrJobService._fail_page(page, "An unexpected error occurred")
+
+                OcrJobService._record_progress(job)
+
+            job.result = OcrJobService._build_result(job)
+            job.status = OcrJob.Status.COMPLETED
+
+        except Exception as e:
+            logger.error(f"OCR job {job.id} failed: {str(e)}", exc_info=True)
+            job.status = OcrJob.Status.FAILED
+            job.error = str(e)
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+        job.refresh_from_db(fields=['processed_pages'])
+
+        return job
+
+    @staticmethod
+    def _fail_page(page: OcrJobPage, message: str) -> None:
+        """Record a page failure without touching the rest of the job"""
+        page.status = OcrJobPage.Status.FAILED
+        page.error = message
+        page.save(update_fields=['status', 'error'])
+
+    @staticmethod
+    def get_job_status(job_id: str) -> Dict[str, any]:
+        """
+        Get progress and result of an OCR job.
+
+        Args:
+            job_id: OcrJob identifier
+
+        Returns:
+            Dictionary with job status, per-page progress and final payload
+        """
+        try:
+            job = OcrJob.objects.get(pk=job_id)
+        except OcrJob.DoesNotExist:
+            raise ResourceNotFoundException("OCR job", str(job_id))
+
+        pages = [
+            {
+                "page_number": page.page_number,
+                "file_name": page.document.file.name,
+                "source_page": page.source_page,
+                "status": page.status,
+                "entry_count": page.entry_count,
+                "error": page.error,
+            }
+            for page in job.pages.select_related('document').order_by('page_number')
+        ]
+
+        return {
+            "job_id": str(job.id),
+            "account_id": job.account_id,
+            "status": job.status,
+            "total_pages": job.total_pages,
+            "processed_pages": job.processed_pages,
+            "pages": pages,
+            "result": job.result,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+        }
@@ -2,26 +2,37 @@
 OCR processing service for TOR documents.
 Handles image processing and text extraction.
 """
-import tempfile
-import os
-import re
-from typing import List, Dict, Optional
+import time
+from contextlib import nullcontext
+from typing import Iterator, List, Dict, Optional, Tuple
 from difflib import SequenceMatcher
+import numpy as np
+from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
-from core.exceptions import ValidationException, BusinessLogicException
+from core.exceptions import (
+    ValidationException,
+    BusinessLogicException,
+    ServiceException
+)
 from core.decorators import log_execution
+from ..ocr.batching import detect_regions, model_height, recognize_pages
+from ..ocr.cache import OCRResultCache, get_result_cache, normalize_boxes
+from ..ocr.governor import CpuGovernor, get_governor
+from ..ocr.image_io import check_upload_size, decode_image, open_upload
+from ..ocr.instrumentation import StageTimings, observe_page
+from ..ocr import parser
+from ..ocr.layout import group_lines
+from ..ocr.parallel import iter_pages_parallel, page_workers, process_pages_parallel
+from ..ocr.pdf import PdfRasterizer, count_pages, is_pdf
+from ..ocr.preprocess import ImagePreprocessor
+from ..ocr.reader_pool import EASYOCR_AVAILABLE, ReaderPool, get_reader_pool
+from ..ocr.refine import ConfidenceRefiner
+from ..ocr.regions import TableRegionFilter
+from ..ocr.sidecar import SidecarClient
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Import EasyOCR (will be installed)
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except ImportError:
-    EASYOCR_AVAILABLE = False
-    logger.warning("EasyOCR not available. OCR functionality will be limited.")
-
 
 class OCRService:
     """
@@ -29,25 +40,73 @@ class OCRService:
     """
     
     # Pattern matching for TOR extraction
-    SUBJECT_CODE_PATTERN = re.compile(r'^[A-Za-z]{1,}[ \-]*\d{1,4}[A-Za-z]?$')
-    NUMBER_PATTERN = re.compile(r'^\d+(\.\d+)?$')
-    YEAR_PATTERN = re.compile(r'^\d{4}-\d{4}$')
+    SUBJECT_CODE_PATTERN = parser.SUBJECT_CODE_PATTERN
+    NUMBER_PATTERN = parser.NUMBER_PATTERN
+    YEAR_PATTERN = parser.YEAR_PATTERN
     
     # Grading keywords
-    REMARKS_KEYWORDS = [
-        'passed', 'failed', 'inc', 'incomplete',
-        'dropped', 'withdrawn', 'drp', 'pas'
-    ]
+    REMARKS_KEYWORDS = parser.REMARKS_KEYWORDS
     
     # Semester keywords
-    SEMESTER_KEYWORDS = ['first', 'second', 'summer']
+    SEMESTER_KEYWORDS = parser.SEMESTER_KEYWORDS
     
-    def __init__(self):
-        """Initialize OCR service"""
-        self.reader = None
-        if EASYOCR_AVAILABLE:
-            self.reader = easyocr.Reader(['en'])
-            logger.info("EasyOCR reader initialized")
+    # Bump whenever sort_ocr_results/extract_fields_from_lines output changes
+    # so cached OCR results from the previous parser are not reused and
+    # reparse_tor_documents picks up pages saved with it
+    PARSER_VERSION = '1'
+    
+    def __init__(
+        self,
+        reader_pool: Optional[ReaderPool] = None,
+        preprocessor: Optional[ImagePreprocessor] = None,
+        region_filter: Optional[TableRegionFilter] = None,
+        governor: Optional[CpuGovernor] = None,
+        refiner: Optional[ConfidenceRefiner] = None,
+        sidecar: Optional[SidecarClient] = None,
+        in_process: bool = False
+    ):
+        """
+        Initialize OCR service.
+        
+        Args:
+            reader_pool: Pool to lease readers from (default: process-wide pool)
+            preprocessor: Image preprocessing stage (default: from settings)
+            region_filter: Table region pre-pass run before recognition
+                (default: from settings)
+            governor: Node-wide limit on concurrent inferences
+                (default: process-wide governor from settings)
+            refiner: Second recognition pass over low-confidence boxes
+                (default: from settings)
+            sidecar: OCR sidecar to send pages to instead of OCR'ing them
+                here (default: from OCR_SIDECAR_SOCKET)
+            in_process: OCR in this process even if a sidecar is
+                configured; set by the sidecar and page pool processes
+        """
+        self.sidecar = None if in_process else sidecar or SidecarClient.from_settings()
+        
+        # Web workers using the sidecar never load a reader
+        self.reader_pool = reader_pool
+        if self.reader_pool is None and EASYOCR_AVAILABLE and self.sidecar is None:
+            self.reader_pool = get_reader_pool()
+        
+        self.preprocessor = preprocessor or ImagePreprocessor.from_settings()
+        self.region_filter = region_filter or TableRegionFilter.from_settings()
+        self.governor = governor or get_governor()
+        self.refiner = refiner or ConfidenceRefiner.from_settings()
+    
+    @property
+    def cache_version(self) -> str:
+        """Version part of cache keys: parser, model, preprocessing, region and refine config"""
+        version = self.PARSER_VERSION
+        if self.reader_pool:
+            version = f"{version}-{self.reader_pool.inference_mode}"
+        if self.preprocessor:
+            version = f"{version}-{self.preprocessor.config_key()}"
+        if self.region_filter:
+            version = f"{version}-{self.region_filter.config_key()}"
+        if self.refiner:
+            version = f"{version}-{self.refiner.config_key()}"
+        return version
     
     @staticmethod
     def get_center(bbox: List[List[float]]) -> tuple:
@@ -69,54 +128,16 @@ class OCRService:
         """
         Sort OCR results into logical lines.
         
+        Grouping is done by the array-backed layout engine in
+        ``torchecker.ocr.layout``.
+        
         Args:
             results: Raw OCR results
             
         Returns:
             List of lines, where each line is a list of word dictionaries
         """
-        # Filter low confidence results
-        annotated = [
-            {
-                "bbox": r[0],
-                "text": r[1],
-                "conf": r[2],
-                "center": self.get_center(r[0])
-            }
-            for r in results if r[2] > 0.3
-        ]
-        
-        # Calculate threshold for line grouping
-        threshold = self.average_text_height(annotated) * 0.6
-        
-        # Sort by vertical position first
-        annotated.sort(key=lambda x: x["center"][1])
-        
-        # Group into lines
-        lines = []
-        current_line = []
-        
-        for item in annotated:
-            if not current_line:
-                current_line.append(item)
-                continue
-            
-            y_diff = abs(item["center"][1] - current_line[-1]["center"][1])
-            
-            if y_diff < threshold:
-                current_line.append(item)
-            else:
-                lines.append(current_line)
-                current_line = [item]
-        
-        if current_line:
-            lines.append(current_line)
-        
-        # Sort words within each line by horizontal position
-        for line in lines:
-            line.sort(key=lambda x: x["center"][0])
-        
-        return lines
+        return group_lines(results)
     
     def extract_fields_from_lines(
         self,
@@ -125,95 +146,117 @@ class OCRService:
         """
         Extract structured data from sorted OCR lines.
         
+        Tokens are classified in a single pass by the tokenizer in
+        ``torchecker.ocr.parser``.
+        
         Args:
             lines: Sorted OCR results
             
         Returns:
             Dictionary with student info and extracted entries
         """
-        extracted_entries = []
-        student_name = None
-        school_name = None
-        
-        for line in lines:
-            texts = [w["text"] for w in line]
-            lower_texts = [t.lower() for t in texts]
-            joined_line = " ".join(texts)
-            
-            # Detect student/school name
-            if not student_name and "name" in joined_line.lower():
-                student_name = joined_line.split(":")[-1].strip()
-                continue
-            
-            if not school_name and any(
-                k in joined_line.lower()
-                for k in ["school", "university", "college"]
-            ):
-                school_name = joined_line
-                continue
-            
-            # Initialize entry
-            entry = {
-                'subject_code': '',
-                'subject_description': '',
-                'student_year': '',
-                'semester': '',
-                'school_year_offered': '',
-                'total_academic_units': 0.0,
-                'final_grade': 0.0,
-                'remarks': '',
-                'pre_requisite': '',
-                'co_requisite': '',
-            }
-            
-            # Look for subject code
-            for i, word in enumerate(texts):
-                if self.SUBJECT_CODE_PATTERN.match(word):
-                    entry['subject_code'] = word
-                    
-                    # Extract description and numbers
-                    desc_parts = []
-                    numeric_parts = []
-                    
-                    for j in range(i + 1, len(texts)):
-                        if self.NUMBER_PATTERN.match(texts[j]):
-                            numeric_parts.append(texts[j])
-                        elif texts[j].lower() in self.REMARKS_KEYWORDS:
-                            entry['remarks'] = texts[j].capitalize()
-                        else:
-                            desc_parts.append(texts[j])
-                    
-                    entry['subject_description'] = " ".join(desc_parts)
-                    
-                    # Assign units and grade
-                    if len(numeric_parts) >= 2:
-                        entry['total_academic_units'] = float(numeric_parts[0])
-                        entry['final_grade'] = float(numeric_parts[1])
-                    elif len(numeric_parts) == 1:
-                        entry['final_grade'] = float(numeric_parts[0])
-                    
-                    break
-            
-            # Extract semester
-            for word in lower_texts:
-                for sem in self.SEMESTER_KEYWORDS:
-                    if sem in word:
-                        entry['semester'] = sem
-                        break
-            
-            # Extract school year
-            for word in texts:
-                if self.YEAR_PATTERN.match(word):
-                    entry['school_year_offered'] = word
-            
-            # Add entry if it has a subject code
-            if entry['subject_code'] and entry['subject_description']:
-                extracted_entries.append(entry)
+        return parser.extract_fields(lines)
+    
+    def ensure_available(self) -> None:
+        """Raise a ValidationException if EasyOCR is not available"""
+        if not self.reader_pool and not self.sidecar:
+            raise ValidationException(
+                "OCR service not available. Please ensure EasyOCR is installed."
+            )
+    
+    def _prepare_image(
+        self,
+        source,
+        name: str,
+        timings: StageTimings
+    ) -> Tuple[np.ndarray, Optional[Dict], Optional[np.ndarray]]:
+        """Decode and preprocess a page, as for :meth:`_preprocess`"""
+        with timings.stage('decode'):
+            image = decode_image(source, name)
+        
+        return self._preprocess(image, name, timings)
+    
+    def _preprocess(
+        self,
+        image: np.ndarray,
+        name: str,
+        timings: StageTimings
+    ) -> Tuple[np.ndarray, Optional[Dict], Optional[np.ndarray]]:
+        """
+        Run the preprocessor on a decoded page, if enabled.
+        
+        Returns:
+            Tuple of (image, preprocessing report, decoded page). The
+            decoded page is only kept when the refiner may re-cut
+            low-confidence boxes from it.
+        """
+        preprocessing = None
+        decoded = image if self.refiner else None
         
+        if self.preprocessor:
+            with timings.stage('preprocess'):
+                image, preprocessing = self.preprocessor.run(image)
+            logger.info(
+                f"Preprocessed {name}: scale={preprocessing['scale']} "
+                f"timings_ms={preprocessing['timings_ms']}"
+            )
+        
+        return image, preprocessing, decoded
+    
+    def _parse_results(
+        self,
+        results: List,
+        cache: Optional[OCRResultCache],
+        cache_key: str,
+        timings: StageTimings
+    ) -> Tuple[Dict[str, any], List]:
+        """
+        Sort and extract raw OCR results, storing them in the cache.
+        
+        Returns:
+            Tuple of (structured fields, boxes as plain JSON types)
+        """
+        with timings.stage('sorting'):
+            lines = self.sort_ocr_results(results)
+        with timings.stage('extraction'):
+            structured = self.extract_fields_from_lines(lines)
+        
+        boxes = normalize_boxes(results)
+        if cache:
+            cache.set(cache_key, {
+                'boxes': boxes,
+                'structured': structured,
+            })
+        
+        return structured, boxes
+    
+    @staticmethod
+    def _page_result(
+        file_name: str,
+        structured: Dict,
+        cached: bool,
+        preprocessing: Optional[Dict],
+        timings: StageTimings,
+        page_number: Optional[int] = None,
+        boxes: Optional[List] = None
+    ) -> Dict[str, any]:
+        """Build the per-page result returned to callers"""
+        observe_page(timings, 'cached' if cached else 'ocr')
+        logger.info(
+            f"Extracted {len(structured['entries'])} entries from {file_name}"
+            f"{f' page {page_number}' if page_number else ''} "
+            f"timings_ms={timings.as_ms()}"
+        )
         return {
-            'student_name': student_name,
-            'school_name': school_name,
-            'entries': extracted_entries
+            'file_name': file_name,
+            'page_number': page_number,
+            'student_name': structured.get('student_name'),
+            'school_name': structured.get('school_name'),
+            'entries': structured.get('entries', []),
+            'boxes': boxes,
+            'cached': cached,
+            'preprocessing': preprocessing,
+            'timings_ms': timings.as_ms()
         }
     
     @log_execution
@@ -225,75 +268,453 @@ class OCRService:
             image_file: Uploaded image file
             
         Returns:
-            Dictionary with extracted data
+            Dictionary with extracted data and per-stage ``timings_ms``
             
         Raises:
             ValidationException: If OCR is not available or processing fails
         """
-        if not self.reader:
-            raise ValidationException(
-                "OCR service not available. Please ensure EasyOCR is installed."
+        self.ensure_available()
+        if self.sidecar:
+            return self.sidecar.process_image(image_file)
+        
+        timings = StageTimings()
+        
+        # Read the upload without copying it to disk; size limits are
+        # enforced before anything is decoded
+        with timings.stage('read'):
+            source, content_hash = open_upload(image_file)
+        
+        return self._run_page(
+            image_file.name,
+            OCRResultCache.make_key(content_hash, self.cache_version),
+            lambda: self._prepare_image(source, image_file.name, timings),
+            timings
+        )
+    
+    def process_pdf_page(self, pdf_file: UploadedFile, page_number: int) -> Dict[str, any]:
+        """
+        Process one page of a PDF transcript.
+        
+        Args:
+            pdf_file: Uploaded or stored PDF file
+            page_number: 1-based page number
+            
+        Returns:
+            Dictionary with extracted data, as for :meth:`process_image`
+        """
+        self.ensure_available()
+        if self.sidecar:
+            return self.sidecar.process_pdf_page(pdf_file, page_number)
+        
+        timings = StageTimings()
+        
+        with timings.stage('read'):
+            source, content_hash = open_upload(pdf_file)
+        
+        with PdfRasterizer(source, pdf_file.name) as rasterizer:
+            return self._process_pdf_page(
+                rasterizer, pdf_file.name, content_hash, page_number, timings
             )
+    
+    def iter_process_pdf(
+        self,
+        pdf_file: UploadedFile,
+        pages: Optional[List[int]] = None
+    ) -> Iterator[Dict]:
+        """
+        Process the pages of a PDF transcript one at a time.
+        
+        Pages are rasterized lazily, so only one decoded page is in memory
+        at a time, and pages found in the result cache are not rendered at
+        all. A page that fails is yielded with an ``error`` message.
+        
+        Args:
+            pdf_file: Uploaded or stored PDF file
+            pages: 1-based page numbers to process (default: all)
+            
+        Yields:
+            Extracted data dictionaries, one per page, with ``page_number``
+            
+        Raises:
+            ValidationException: If the file is not a readable PDF
+        """
+        self.ensure_available()
+        if self.sidecar:
+            yield from self.sidecar.iter_process_pdf(pdf_file, pages)
+            return
+        
+        timings = StageTimings()
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            for chunk in image_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
+        with timings.stage('read'):
+            source, content_hash = open_upload(pdf_file)
         
+        with PdfRasterizer(source, pdf_file.name) as rasterizer:
+            logger.info(f"Processing {len(rasterizer)} pages of PDF: {pdf_file.name}")
+            
+            for page_number in pages or range(1, len(rasterizer) + 1):
+                try:
+                    yield self._process_pdf_page(
+                        rasterizer, pdf_file.name, content_hash, page_number, timings
+                    )
+                except ServiceException as e:
+                    logger.error(
+                        f"OCR failed for page {page_number} of {pdf_file.name}: {e.message}"
+                    )
+                    yield self._failed_page(pdf_file.name, e.message, page_number)
+                
+                # Reading the file is only charged to the first page
+                timings = StageTimings()
+    
+    def _process_pdf_page(
+        self,
+        rasterizer: PdfRasterizer,
+        name: str,
+        content_hash: str,
+        page_number: int,
+        timings: StageTimings
+    ) -> Dict[str, any]:
+        """OCR one page of an open PDF, rendering it only on a cache miss"""
+        def load_image():
+            with timings.stage('rasterize'):
+                image = rasterizer.render(page_number)
+            return self._preprocess(image, f"{name} page {page_number}", timings)
+        
+        cache_key = OCRResultCache.make_key(
+            f"{content_hash}-p{page_number}-d{rasterizer.dpi}", self.cache_version
+        )
+        return self._run_page(name, cache_key, load_image, timings, page_number)
+    
+    @staticmethod
+    def _failed_page(
+        file_name: str,
+        error: str,
+        page_number: Optional[int] = None
+    ) -> Dict[str, any]:
+        """Result for a page that could not be processed"""
+        return {
+            'file_name': file_name,
+            'page_number': page_number,
+            'student_name': None,
+            'school_name': None,
+            'entries': [],
+            'error': error,
+        }
+    
+    def _run_page(
+        self,
+        name: str,
+        cache_key: str,
+        load_image,
+        timings: StageTimings,
+        page_number: Optional[int] = None
+    ) -> Dict[str, any]:
+        """
+        Serve a page from the result cache or OCR it.
+        
+        Args:
+            name: File name for logs and the result
+            cache_key: Result cache key of the page
+            load_image: Callable returning (image, preprocessing report,
+                decoded page); only called on a cache miss
+            timings: Stage timings of the page
+            page_number: Page within a PDF, if any
+        """
         try:
+            cache = get_result_cache()
+            cached = cache.get(cache_key) if cache else None
+            
+            if cached:
+                logger.info(f"OCR cache hit for image: {name}")
+                return self._page_result(
+                    name, cached['structured'], True, None, timings, page_number,
+                    boxes=cached.get('boxes')
+                )
+            
             # Run OCR
-            logger.info(f"Processing image: {image_file.name}")
-            results = self.reader.readtext(tmp_path)
+            logger.info(f"Processing image: {name}")
+            image, preprocessing, decoded = load_image()
             
-            # Sort and extract
-            lines = self.sort_ocr_results(results)
-            structured = self.extract_fields_from_lines(lines)
+            wait_start = time.perf_counter()
+            with self.reader_pool.lease() as reader:
+                timings.add('reader_wait', time.perf_counter() - wait_start)
+                
+                with self._cpu_slot(timings) as slot:
+                    # readtext() split in two so model stages are timed apart
+                    with timings.stage('detection'):
+                        img_cv_grey, horizontal_list, free_list = detect_regions(
+                            reader, image
+                        )
+                    if self.region_filter:
+                        with timings.stage('table_region'):
+                            horizontal_list, free_list = self.region_filter.apply(
+                                horizontal_list, free_list, img_cv_grey.shape[0]
+                            )
+                    if slot:
+                        slot.rebalance()
+                    with timings.stage('recognition'):
+                        results = reader.recognize(
+                            img_cv_grey, horizontal_list, free_list, reformat=False
+                        )
+                    if self.refiner:
+                        with timings.stage('refine'):
+                            results = self.refiner.refine(
+                                reader, img_cv_grey, results,
+                                getattr(settings, 'OCR_RECOGNIZER_BATCH_SIZE', 32),
+                                model_height(), decoded, preprocessing
+                            )
             
-            logger.info(
-                f"Extracted {len(structured['entries'])} entries from {image_file.name}"
+            structured, boxes = self._parse_results(results, cache, cache_key, timings)
+            return self._page_result(
+                name, structured, False, preprocessing, timings, page_number,
+                boxes=boxes
             )
             
-            return {
-                'file_name': image_file.name,
-                'student_name': structured.get('student_name'),
-                'school_name': structured.get('school_name'),
-                'entries': structured.get('entries', [])
-            }
-            
+        except ServiceException:
+            observe_page(timings, 'error')
+            raise
+        
         except Exception as e:
+            observe_page(timings, 'error')
             logger.error(f"Error processing image: {str(e)}", exc_info=True)
             raise BusinessLogicException(f"Failed to process image: {str(e)}")
-        
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+    
+    def _cpu_slot(self, timings: StageTimings):
+        """Hold a node-wide CPU slot while models run (no-op when disabled)"""
+        if self.governor is None:
+            return nullcontext()
+        return self.governor.inference(timings)
+    
+    def count_pages(self, files: List[UploadedFile]) -> int:
+        """
+        Count the pages of an upload: every page of each PDF plus one per
+        image. PDFs are opened but not rendered.
+        """
+        total = 0
+        for upload in files:
+            if is_pdf(upload):
+                source, _ = open_upload(upload)
+                total += count_pages(source, upload.name)
+            else:
+                total += 1
+        return total
     
     @log_execution
     def process_images(
         self,
         images: List[UploadedFile],
-        account_id: Optional[str] = None
+        account_id: Optional[str] = None,
+        parallel: Optional[bool] = None,
+        batched: Optional[bool] = None
     ) -> List[Dict]:
         """
         Process multiple images in order.
         
+        In parallel mode pages are OCR'd concurrently in a process pool of
+        this worker's share of OCR_PAGE_WORKERS (:func:`page_workers`).
+        Results keep upload order, and a page that fails comes back with an
+        ``error`` message and no entries instead of failing the whole upload.
+        
+        In batched mode detection runs per page, then the text crops of all
+        pages go through the recognizer together in batches of
+        OCR_RECOGNIZER_BATCH_SIZE. Batched mode takes precedence over
+        parallel mode.
+        
+        With an OCR sidecar the pages are sent to it one at a time; how
+        they are OCR'd is then up to the sidecar process.
+        
+        The CPU and wall time of the request are logged per mode. CPU time
+        is that of this process, so it excludes parallel pool workers.
+        
         Args:
             images: List of uploaded image files
             account_id: Optional account ID to associate with data
+            parallel: Force parallel (True) or sequential (False) mode
+                (default: parallel when page_workers() > 1)
+            batched: Force batched recognition on or off
+                (default: OCR_BATCHED_RECOGNITION)
             
         Returns:
             List of extracted data dictionaries
         """
-        all_results = []
+        workers = page_workers()
+        if parallel is None:
+            parallel = workers > 1
+        if batched is None:
+            batched = getattr(settings, 'OCR_BATCHED_RECOGNITION', False)
+        
+        mode = 'sequential'
+        if self.sidecar:
+            mode = 'sidecar'
+        elif any(is_pdf(image) for image in images):
+            # PDF pages are rasterized one at a time as they are OCR'd
+            mode = 'pdf'
+        elif len(images) > 1:
+            if batched:
+                mode = 'batched'
+            elif parallel:
+                mode = 'parallel'
+        
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        
+        if mode == 'batched':
+            all_results = self._process_images_batched(images)
+        elif mode == 'parallel':
+            all_results = self._process_images_parallel(images, workers)
+        elif mode in ('pdf', 'sidecar'):
+            all_results = list(self.iter_process_images(images, parallel=False))
+        else:
+            all_results = [self.process_image(image) for image in images]
+        
+        logger.info(
+            f"OCR'd {len(all_results)} pages ({mode}): "
+            f"cpu={(time.process_time() - cpu_start) * 1000:.0f}ms "
+            f"wall={(time.perf_counter() - wall_start) * 1000:.0f}ms"
+        )
+        
+        if account_id:
+            for result in all_results:
+                result['account_id'] = account_id
+        
+        return all_results
+    
+    def iter_process_images(
+        self,
+        images: List[UploadedFile],
+        parallel: Optional[bool] = None
+    ) -> Iterator[Dict]:
+        """
+        Process images one page at a time, yielding each page's result as
+        soon as it is ready.
+        
+        Pages are OCR'd in the page process pool when page_workers() > 1
+        and in this process otherwise. Results keep upload order, and a page
+        that fails is yielded with an ``error`` message and no entries.
+        Batched recognition is not used: it only finishes once every page
+        has been detected.
+        
+        PDFs are expanded into their pages, which are OCR'd in this process
+        as they are rasterized. With an OCR sidecar every page is OCR'd
+        there instead.
+        
+        Args:
+            images: List of uploaded image or PDF files
+            parallel: Force the page process pool on or off
+                (default: on when page_workers() > 1)
+            
+        Yields:
+            Extracted data dictionaries, one per page
+        """
+        self.ensure_available()
+        
+        workers = page_workers()
+        if parallel is None:
+            parallel = workers > 1
+        has_pdf = any(is_pdf(image) for image in images)
+        
+        if parallel and not has_pdf and len(images) > 1 and not self.sidecar:
+            for image in images:
+                check_upload_size(image)
+            pages = ((image.name, b''.join(image.chunks())) for image in images)
+            yield from iter_pages_parallel(
+                list(pages), max(1, min(workers, len(images)))
+            )
+            return
         
         for image in images:
-            result = self.process_image(image)
+            try:
+                if has_pdf and is_pdf(image):
+                    yield from self.iter_process_pdf(image)
+                else:
+                    yield self.process_image(image)
+            except ServiceException as e:
+                logger.error(f"OCR failed for page {image.name}: {e.message}")
+                yield self._failed_page(image.name, e.message)
+    
+    def _process_images_batched(self, images: List[UploadedFile]) -> List[Dict]:
+        """Detect per page, then recognize the crops of all pages together"""
+        self.ensure_available()
+        
+        cache = get_result_cache()
+        all_results = [None] * len(images)
+        pending = []
+        
+        for index, image_file in enumerate(images):
+            timings = StageTimings()
+            with timings.stage('read'):
+                source, content_hash = open_upload(image_file)
+            cache_key = OCRResultCache.make_key(content_hash, self.cache_version)
+            cached = cache.get(cache_key) if cache else None
             
-            if account_id:
-                result['account_id'] = account_id
+            if cached:
+                logger.info(f"OCR cache hit for image: {image_file.name}")
+                all_results[index] = self._page_result(
+                    image_file.name, cached['structured'], True, None, timings,
+                    boxes=cached.get('boxes')
+                )
+                continue
             
-            all_results.append(result)
+            image, preprocessing, decoded = self._prepare_image(
+                source, image_file.name, timings
+            )
+            pending.append(
+                (index, image_file.name, cache_key, image, preprocessing, timings, decoded)
+            )
+        
+        if not pending:
+            return all_results
+        
+        batch_size = getattr(settings, 'OCR_RECOGNIZER_BATCH_SIZE', 32)
+        
+        try:
+            wait_start = time.perf_counter()
+            with self.reader_pool.lease() as reader:
+                wait = time.perf_counter() - wait_start
+                for page in pending:
+                    page[5].add('reader_wait', wait / len(pending))
+                
+                with self._cpu_slot(pending[0][5]):
+                    page_results = recognize_pages(
+                        reader,
+                        [page[3] for page in pending],
+                        batch_size,
+                        timings=[page[5] for page in pending],
+                        region_filter=self.region_filter,
+                        refiner=self.refiner,
+                        sources=[(page[6], page[4]) for page in pending]
+                    )
+            
+            for (index, name, cache_key, _, preprocessing, timings, _), results in zip(
+                pending, page_results
+            ):
+                structured, boxes = self._parse_results(results, cache, cache_key, timings)
+                all_results[index] = self._page_result(
+                    name, structured, False, preprocessing, timings, boxes=boxes
+                )
+            
+        except ServiceException:
+            raise
+        
+        except Exception as e:
+            logger.error(f"Error processing images: {str(e)}", exc_info=True)
+            raise BusinessLogicException(f"Failed to process images: {str(e)}")
+        
+        return all_results
+    
+    def _process_images_parallel(
+        self,
+        images: List[UploadedFile],
+        workers: int
+    ) -> List[Dict]:
+        """Fan pages out to the page process pool"""
+        self.ensure_available()
+        
+        for image in images:
+            check_upload_size(image)
+        
+        pages = [
+            (image.name, b''.join(image.chunks()))
+            for image in images
+        ]
         
-        return all_results
\ No newline at end of file
+        return process_pages_parallel(pages, max(1, min(workers, len(pages))))
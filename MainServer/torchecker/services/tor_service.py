@@ -1,14 +1,22 @@
 """
 Business logic for TOR management operations.
 """
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
 from django.db import transaction
+from django.db.models import QuerySet
 from core.exceptions import (
     ValidationException,
     ResourceNotFoundException
 )
 from core.decorators import log_execution, atomic_transaction
-from ..models import TorTransferee
+from ..models import (
+    TorDocument,
+    TorDocumentPage,
+    TorStudentSummary,
+    TorTransferee,
+    dated_marker
+)
+from ..ocr.boxes import pack_boxes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,26 +27,80 @@ class TorService:
     Service for managing TOR transferee records.
     """
     
+    # Rows per INSERT statement when saving entries in bulk
+    BULK_BATCH_SIZE = 500
+    
+    # Entry fields stored as text, with the value used when an entry lacks one
+    TEXT_FIELDS = {
+        'subject_code': '',
+        'subject_description': '',
+        'student_year': '',
+        'pre_requisite': '',
+        'co_requisite': '',
+        'semester': 'first',
+        'school_year_offered': '',
+        'remarks': '',
+    }
+    
+    NUMERIC_FIELDS = ('total_academic_units', 'final_grade')
+    
+    # Identifies an entry; matches the unique_tor_transferee_subject constraint.
+    # ``dated`` is NULL for entries without a school year or semester, which
+    # therefore never conflict: retakes of an undated subject stay separate.
+    UPSERT_KEY = ('account_id', 'subject_code', 'school_year_offered', 'semester', 'dated')
+    
+    # Overwritten when an upload repeats an existing entry
+    UPSERT_UPDATE_FIELDS = (
+        'student_name',
+        'school_name',
+        'subject_description',
+        'student_year',
+        'pre_requisite',
+        'co_requisite',
+        'total_academic_units',
+        'final_grade',
+        'remarks',
+        'source_page',
+        'updated_at',
+    )
+    
     @staticmethod
-    @atomic_transaction
-    @log_execution
-    def save_tor_entries(
+    def _check_length(field: str, value: Optional[str], label: str) -> None:
+        """Reject a value longer than its column"""
+        max_length = TorTransferee._meta.get_field(field).max_length
+        if value is not None and len(value) > max_length:
+            raise ValidationException(
+                f"{label}: {field} is longer than {max_length} characters",
+                field=field
+            )
+    
+    @staticmethod
+    def build_tor_entries(
         account_id: str,
         student_name: str,
         school_name: str,
-        entries: List[Dict]
+        entries: List[Dict],
+        source_page: Optional[TorDocumentPage] = None
     ) -> List[TorTransferee]:
         """
-        Save multiple TOR entries for a student.
+        Validate entries and build unsaved TorTransferee instances.
+        
+        Every row is checked before anything is written, so an invalid row
+        fails the whole save instead of leaving part of it in the database.
         
         Args:
             account_id: Student account ID
             student_name: Student's full name
             school_name: Previous school name
             entries: List of subject entry dictionaries
+            source_page: OCR page the entries were extracted from
             
         Returns:
-            List of created TorTransferee instances
+            List of unsaved TorTransferee instances
+            
+        Raises:
+            ValidationException: If a row has a non-numeric units or grade
+                value or a text value too long for its column
         """
         if not account_id:
             raise ValidationException("account_id is required")
@@ -46,46 +108,268 @@ class TorService:
         if not entries:
             raise ValidationException("No entries provided")
         
-        saved_entries = []
+        student_name = student_name or "Unknown"
+        school_name = school_name or "Unknown"
+        TorService._check_length('account_id', account_id, "Entries")
+        TorService._check_length('student_name', student_name, "Entries")
+        TorService._check_length('school_name', school_name, "Entries")
+        
+        rows = []
         
-        for entry in entries:
-            tor_entry = TorTransferee.objects.create(
+        for number, entry in enumerate(entries, start=1):
+            label = f"Entry {number}"
+            if not isinstance(entry, dict):
+                raise ValidationException(f"{label} is not an object")
+            
+            values = {}
+            
+            for field, default in TorService.TEXT_FIELDS.items():
+                value = entry.get(field, default)
+                if value is not None:
+                    value = str(value)
+                elif not TorTransferee._meta.get_field(field).null:
+                    value = default
+                TorService._check_length(field, value, label)
+                values[field] = value
+            
+            for field in TorService.NUMERIC_FIELDS:
+                try:
+                    values[field] = float(entry.get(field) or 0.0)
+                except (TypeError, ValueError):
+                    raise ValidationException(
+                        f"{label}: {field} must be a number",
+                        field=field
+                    )
+            
+            rows.append(TorTransferee(
                 account_id=account_id,
-                student_name=student_name or "Unknown",
-                school_name=school_name or "Unknown",
-                subject_code=entry.get('subject_code', ''),
-                subject_description=entry.get('subject_description', ''),
-                student_year=entry.get('student_year', ''),
-                pre_requisite=entry.get('pre_requisite', ''),
-                co_requisite=entry.get('co_requisite', ''),
-                semester=entry.get('semester', 'first'),
-                school_year_offered=entry.get('school_year_offered', ''),
-                total_academic_units=entry.get('total_academic_units', 0.0),
-                final_grade=entry.get('final_grade', 0.0),
-                remarks=entry.get('remarks', '')
-            )
-            saved_entries.append(tor_entry)
+                student_name=student_name,
+                school_name=school_name,
+                source_page=source_page,
+                dated=dated_marker(values['school_year_offered'], values['semester']),
+                **values
+            ))
+        
+        return rows
+    
+    @staticmethod
+    @atomic_transaction
+    def bulk_save_tor_entries(rows: List[TorTransferee]) -> List[TorTransferee]:
+        """
+        Upsert built entries in batched multi-row INSERTs.
+        
+        Entries are keyed on ``UPSERT_KEY``; an entry that already exists is
+        updated in place (``INSERT ... ON CONFLICT DO UPDATE``), so uploading
+        a transcript again leaves the table the same size. Rows repeating a
+        key within ``rows`` are collapsed, the last one winning.
+        
+        Entries without a school year or semester do not identify a taking
+        (two of them may be a subject and its retake), so they are always
+        inserted as new rows.
+        
+        Args:
+            rows: Instances from :meth:`build_tor_entries`, possibly from
+                several pages of one upload
+            
+        Returns:
+            The saved instances, one per key, with their ids set
+        """
+        if not rows:
+            return []
+        
+        # A single statement may not update the same row twice
+        unique_rows = {
+            tuple(getattr(row, field) for field in TorService.UPSERT_KEY) if row.dated else id(row): row
+            for row in rows
+        }
+        
+        saved = TorTransferee.objects.bulk_create(
+            list(unique_rows.values()),
+            batch_size=TorService.BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=TorService.UPSERT_KEY,
+            update_fields=TorService.UPSERT_UPDATE_FIELDS
+        )
+        
+        TorService.refresh_student_summaries({row.account_id for row in saved})
         
         logger.info(
-            f"Saved {len(saved_entries)} TOR entries for account: {account_id}"
+            f"Saved {len(saved)} TOR entries for account: {saved[0].account_id}"
         )
         
-        return saved_entries
+        return saved
     
     @staticmethod
-    def get_tor_entries(
+    @log_execution
+    def save_tor_entries(
+        account_id: str,
+        student_name: str,
+        school_name: str,
+        entries: List[Dict],
+        source_page: Optional[TorDocumentPage] = None
+    ) -> List[TorTransferee]:
+        """
+        Save multiple TOR entries for a student.
+        
+        The entries are validated first and then upserted in bulk, one
+        statement per ``BULK_BATCH_SIZE`` rows (see
+        :meth:`bulk_save_tor_entries`).
+        
+        Args:
+            account_id: Student account ID
+            student_name: Student's full name
+            school_name: Previous school name
+            entries: List of subject entry dictionaries
+            source_page: OCR page the entries were extracted from
+            
+        Returns:
+            List of created TorTransferee instances
+        """
+        rows = TorService.build_tor_entries(
+            account_id, student_name, school_name, entries, source_page
+        )
+        
+        return TorService.bulk_save_tor_entries(rows)
+    
+    @staticmethod
+    @log_execution
+    def save_document_page(
+        document: TorDocument,
+        page_number: Optional[int],
+        boxes: Optional[List],
+        parser_version: str
+    ) -> Optional[TorDocumentPage]:
+        """
+        Store the raw OCR boxes of one page of a document.
+        
+        Saving a page again (e.g. a re-run job) replaces its boxes.
+        
+        Args:
+            document: Uploaded TorDocument
+            page_number: Page within the document (None for images)
+            boxes: Raw readtext output of the page
+            parser_version: Parser version its entries are extracted with
+            
+        Returns:
+            The TorDocumentPage, or None when the page has no boxes
+        """
+        if boxes is None:
+            return None
+        
+        page, _ = TorDocumentPage.objects.update_or_create(
+            document=document,
+            page_number=page_number or 1,
+            defaults={
+                'boxes': pack_boxes(boxes),
+                'box_count': len(boxes),
+                'parser_version': parser_version,
+            }
+        )
+        
+        return page
+    
+    @staticmethod
+    @atomic_transaction
+    def replace_page_entries(
+        page: TorDocumentPage,
+        entries: List[Dict],
+        student_name: Optional[str],
+        school_name: Optional[str],
+        parser_version: str
+    ) -> List[TorTransferee]:
+        """
+        Replace the entries extracted from a page with a re-parsed set.
+        
+        Names the new parse did not find fall back to those saved with the
+        page's previous entries.
+        
+        Args:
+            page: TorDocumentPage whose boxes were re-parsed
+            entries: Re-extracted subject entry dictionaries
+            student_name: Student name found by the new parse
+            school_name: School name found by the new parse
+            parser_version: Parser version the entries were extracted with
+            
+        Returns:
+            List of created TorTransferee instances
+        """
+        previous = page.entries.values('student_name', 'school_name').first() or {}
+        page.entries.all().delete()
+        
+        saved = []
+        if entries:
+            saved = TorService.save_tor_entries(
+                account_id=page.document.account_id,
+                student_name=student_name or previous.get('student_name'),
+                school_name=school_name or previous.get('school_name'),
+                entries=entries,
+                source_page=page
+            )
+        else:
+            # Saving entries refreshes the summary; removing them must too
+            TorService.refresh_student_summaries([page.document.account_id])
+        
+        page.parser_version = parser_version
+        page.save(update_fields=['parser_version', 'updated_at'])
+        
+        return saved
+    
+    @staticmethod
+    def serialize_saved_entries(entries: List[TorTransferee]) -> List[Dict]:
+        """
+        Convert saved TOR entries to the OCR response format.
+        
+        Args:
+            entries: Saved TorTransferee instances
+            
+        Returns:
+            List of entry dictionaries
+        """
+        return [
+            {
+                "id": entry.id,
+                "subject_code": entry.subject_code,
+                "subject_description": entry.subject_description,
+                "student_year": entry.student_year,
+                "semester": entry.semester,
+                "school_year_offered": entry.school_year_offered,
+                "total_academic_units": entry.total_academic_units,
+                "final_grade": entry.final_grade,
+                "remarks": entry.remarks,
+            }
+            for entry in entries
+        ]
+    
+    @staticmethod
+    def get_school_tor_reference() -> List[Dict]:
+        """
+        Get the active CIT curriculum used as reference for OCR results.
+        
+        Returns:
+            List of subject dictionaries
+        """
+        from curriculum.models import CitTorContent
+        
+        return list(
+            CitTorContent.objects.filter(is_active=True).values(
+                "subject_code", "prerequisite", "description", "units"
+            )
+        )
+    
+    @staticmethod
+    def filter_tor_entries(
         account_id: Optional[str] = None,
         student_name: Optional[str] = None
-    ) -> List[TorTransferee]:
+    ) -> QuerySet:
         """
-        Get TOR entries with optional filtering.
+        Build a queryset of TOR entries with optional filtering.
         
         Args:
             account_id: Filter by account ID
             student_name: Filter by student name
             
         Returns:
-            List of TorTransferee instances
+            Unevaluated TorTransferee queryset, for callers that paginate
         """
         queryset = TorTransferee.objects.all()
         
@@ -95,22 +379,88 @@ class TorService:
         if student_name:
             queryset = queryset.filter(student_name__icontains=student_name)
         
-        return list(queryset)
+        return queryset
     
     @staticmethod
-    def get_unique_students() -> List[Dict[str, str]]:
+    def get_tor_entries(
+        account_id: Optional[str] = None,
+        student_name: Optional[str] = None
+    ) -> List[TorTransferee]:
         """
-        Get unique student/school combinations.
+        Get TOR entries with optional filtering.
         
+        Args:
+            account_id: Filter by account ID
+            student_name: Filter by student name
+            
         Returns:
-            List of dictionaries with student_name and school_name
+            List of TorTransferee instances
         """
-        unique = TorTransferee.objects.values(
-            'student_name',
-            'school_name'
-        ).distinct()
+        return list(TorService.filter_tor_entries(account_id, student_name))
+    
+    @staticmethod
+    def filter_student_summaries(search: Optional[str] = None) -> QuerySet:
+        """
+        Build a queryset of per-account student summaries.
         
-        return list(unique)
+        Args:
+            search: Matches part of the student or school name, or a whole
+                account ID
+            
+        Returns:
+            Unevaluated TorStudentSummary queryset, for callers that paginate
+        """
+        from django.db.models import Q
+        
+        queryset = TorStudentSummary.objects.all()
+        
+        if search:
+            queryset = queryset.filter(
+                Q(student_name__icontains=search)
+                | Q(school_name__icontains=search)
+                | Q(account_id=search)
+            )
+        
+        return queryset
+    
+    @staticmethod
+    @atomic_transaction
+    def refresh_student_summaries(account_ids: Iterable[str]) -> None:
+        """
+        Recompute the student summaries of accounts whose entries changed.
+        
+        Only the given accounts' entries are aggregated, so the cost follows
+        the size of those accounts rather than of the whole table. Existing
+        summary rows are updated in place (keeping their ids stable for
+        paginating clients) and rows of names no longer present are removed.
+        
+        Args:
+            account_ids: Accounts to refresh
+        """
+        from django.db.models import Count, Max
+        
+        account_ids = sorted({a for a in account_ids if a})
+        if not account_ids:
+            return
+        
+        groups = (
+            TorTransferee.objects
+            .filter(account_id__in=account_ids)
+            .values('account_id', 'student_name', 'school_name')
+            .annotate(entry_count=Count('id'), last_upload_at=Max('updated_at'))
+            .order_by()
+        )
+        
+        summaries = TorStudentSummary.objects.bulk_create(
+            [TorStudentSummary(**group) for group in groups],
+            update_conflicts=True,
+            unique_fields=['account_id', 'student_name', 'school_name'],
+            update_fields=['entry_count', 'last_upload_at']
+        )
+        
+        TorStudentSummary.objects.filter(account_id__in=account_ids).exclude(
+            pk__in=[summary.pk for summary in summaries]
+        ).delete()
     
     @staticmethod
     @log_execution
@@ -127,47 +477,96 @@ class TorService:
         if not account_id:
             raise ValidationException("account_id is required")
         
-        count, _ = TorTransferee.objects.filter(
-            account_id=account_id
-        ).delete()
+        with transaction.atomic():
+            count, _ = TorTransferee.objects.filter(
+                account_id=account_id
+            ).delete()
+            TorService.refresh_student_summaries([account_id])
         
         logger.info(f"Deleted {count} TOR entries for account: {account_id}")
         
         return count
     
+    # Accounts per get_tor_statistics_bulk call
+    MAX_STATISTICS_ACCOUNTS = 500
+    
+    @staticmethod
+    def _statistics_aggregates() -> Dict[str, any]:
+        """Aggregates computing TOR statistics in a single pass"""
+        from django.db.models import Avg, Count, Q, Sum
+        
+        return {
+            'total_subjects': Count('id'),
+            'total_units': Sum('total_academic_units'),
+            'average_grade': Avg('final_grade'),
+            'passed': Count('id', filter=Q(remarks__iexact='PASSED')),
+            'failed': Count('id', filter=Q(remarks__iexact='FAILED')),
+        }
+    
+    @staticmethod
+    def _format_statistics(row: Dict[str, any]) -> Dict[str, any]:
+        """Fill in empty aggregates and round the average grade"""
+        return {
+            'total_subjects': row.get('total_subjects') or 0,
+            'total_units': row.get('total_units') or 0,
+            'average_grade': round(row.get('average_grade') or 0, 2),
+            'passed': row.get('passed') or 0,
+            'failed': row.get('failed') or 0,
+        }
+    
     @staticmethod
     def get_tor_statistics(account_id: str) -> Dict[str, any]:
         """
         Get statistics for TOR entries.
         
+        Computed in one query using conditional aggregation.
+        
         Args:
             account_id: Account identifier
             
         Returns:
             Dictionary with statistics
         """
-        from django.db.models import Count, Avg, Sum
+        row = TorTransferee.objects.filter(account_id=account_id).aggregate(
+            **TorService._statistics_aggregates()
+        )
         
-        entries = TorTransferee.objects.filter(account_id=account_id)
+        return TorService._format_statistics(row)
+    
+    @staticmethod
+    def get_tor_statistics_bulk(account_ids: List[str]) -> Dict[str, Dict[str, any]]:
+        """
+        Get statistics for TOR entries of many accounts in one query.
         
-        if not entries.exists():
-            return {
-                'total_subjects': 0,
-                'total_units': 0,
-                'average_grade': 0,
-                'passed': 0,
-                'failed': 0
-            }
+        Args:
+            account_ids: Account identifiers
+            
+        Returns:
+            Dictionary mapping each account ID to its statistics (zeros for
+            accounts without entries)
+            
+        Raises:
+            ValidationException: If more than MAX_STATISTICS_ACCOUNTS
+                accounts are requested
+        """
+        account_ids = list(dict.fromkeys(a for a in account_ids if a))
         
-        stats = {
-            'total_subjects': entries.count(),
-            'total_units': entries.aggregate(Sum('total_academic_units'))['total_academic_units__sum'] or 0,
-            'average_grade': entries.aggregate(Avg('final_grade'))['final_grade__avg'] or 0,
-            'passed': entries.filter(remarks__iexact='PASSED').count(),
-            'failed': entries.filter(remarks__iexact='FAILED').count(),
-        }
+        if len(account_ids) > TorService.MAX_STATISTICS_ACCOUNTS:
+            raise ValidationException(
+                f"At most {TorService.MAX_STATISTICS_ACCOUNTS} accounts per request",
+                field='account_ids'
+            )
         
-        # Round average grade
-        stats['average_grade'] = round(stats['average_grade'], 2)
+        rows = (
+            TorTransferee.objects
+            .filter(account_id__in=account_ids)
+            .values('account_id')
+            .annotate(**TorService._statistics_aggregates())
+            .order_by()
+        )
+        by_account = {row['account_id']: row for row in rows} if account_ids else {}
         
-        return stats
\ No newline at end of file
+        return {
+            account_id: TorService._format_statistics(by_account.get(account_id, {}))
+            for account_id in account_ids
+        }
@@ -0,0 +1,120 @@
+"""Tests for the OCR benchmark suite"""
+import io
+import json
+import pytest
+from django.core.management import CommandError, call_command
+from core.importtime import parse_importtime, summarize
+from torchecker.benchmarks.runner import OCRBenchmark, compare_reports
+from torchecker.benchmarks.synthetic import generate_pages
+from torchecker.services.ocr_service import OCRService
+
+
+class TestSyntheticPages:
+    """Test synthetic TOR page generation"""
+
+    def test_pages_are_reproducible(self):
+        """Test the same seed renders the same pages"""
+        first = generate_pages(2, rows=5, seed=3)
+        second = generate_pages(2, rows=5, seed=3)
+
+        assert [p['png'] for p in first] == [p['png'] for p in second]
+        assert len(first[0]['entries']) == 5
+
+    def test_rotation_moves_boxes_with_the_page(self):
+        """Test ground-truth boxes follow the page rotation"""
+        flat = generate_pages(1, rows=5, seed=1)[0]
+        rotated = generate_pages(1, rows=5, seed=1, rotation=5)[0]
+
+        assert rotated['rotation'] != 0
+        assert rotated['image'].shape == flat['image'].shape
+        assert rotated['boxes'][0][0] != flat['boxes'][0][0]
+        assert [b[1] for b in rotated['boxes']] == [b[1] for b in flat['boxes']]
+
+
+class TestOCRBenchmark:
+    """Test the benchmark runner and report comparison"""
+
+    def test_parser_stages_recover_ground_truth(self):
+        """Test the parser-only run reports stages and full accuracy"""
+        service = OCRService()
+        report = OCRBenchmark(service, run_ocr=False, repeat=2).run(
+            generate_pages(2, rows=8), {'pages': 2}
+        )
+
+        assert report['stages']['process_image'] == {'runs': 0}
+        assert report['stages']['sort_ocr_results']['runs'] == 4
+        assert report['stages']['extract_fields_from_lines']['p95_ms'] > 0
+        assert report['accuracy']['parser']['exact_recall'] == 1.0
+        assert 'ocr' not in report['accuracy']
+
+    def test_compare_flags_regressions(self):
+        """Test slower stages are flagged and faster ones are not"""
+        def report(p50, pages_per_sec):
+            return {'stages': {'sort_ocr_results': {
+                'p50_ms': p50, 'pages_per_sec': pages_per_sec,
+            }}}
+
+        rows = {
+            row['metric']: row
+            for row in compare_reports(report(1.0, 100.0), report(2.0, 120.0))
+        }
+
+        assert rows['p50_ms']['change_pct'] == 100.0
+        assert rows['p50_ms']['regression'] is True
+        assert rows['pages_per_sec']['regression'] is False
+
+    def test_command_writes_json_report(self, tmp_path):
+        """Test the management command stores a comparable report"""
+        output = tmp_path / 'report.json'
+
+        call_command(
+            'benchmark_ocr', '--skip-ocr', '--pages', '1', '--rows', '4',
+            '--output', str(output), stdout=io.StringIO()
+        )
+
+        report = json.loads(output.read_text())
+        assert report['meta']['config']['pages'] == 1
+        assert report['stages']['sort_ocr_results']['runs'] == 1
+
+
+class TestImportTimeReport:
+    """Test the startup import-time report"""
+
+    SAMPLE = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     numpy.core\n"
+        "import time:       300 |        420 |   numpy\n"
+        "import time:        50 |        470 | torchecker.ocr\n"
+        "Traceback lines are ignored\n"
+    )
+
+    def test_parse_and_summarize(self):
+        """Test importtime lines are parsed and aggregated per package"""
+        records = parse_importtime(self.SAMPLE)
+
+        assert [r.module for r in records] == ['numpy.core', 'numpy', 'torchecker.ocr']
+        assert [r.depth for r in records] == [2, 1, 0]
+
+        report = summarize(records, top=2, forbidden=['numpy', 'torch'])
+        assert report['modules'] == 3
+        assert report['slowest'][0]['module'] == 'torchecker.ocr'
+        assert report['packages'][0] == {'package': 'numpy', 'self_ms': 0.4}
+        assert report['forbidden_imported'] == ['numpy']
+
+    def test_startup_does_not_import_ml_stack(self, tmp_path):
+        """Test Django startup leaves torch, EasyOCR and OpenCV to the first OCR call"""
+        output = tmp_path / 'imports.json'
+
+        call_command(
+            'import_time_report', '--top', '3', '--forbid', 'torch', '--forbid', 'easyocr',
+            '--forbid', 'cv2', '--output', str(output), stdout=io.StringIO()
+        )
+
+        report = json.loads(output.read_text())
+        assert report['forbidden_imported'] == []
+        assert len(report['slowest']) == 3
+
+    def test_forbidden_import_fails(self):
+        """Test the command fails when a forbidden package is imported"""
+        with pytest.raises(CommandError, match='imported at startup: django'):
+            call_command('import_time_report', '--forbid', 'django', stdout=io.StringIO())
@@ -0,0 +1,1134 @@
+"""Tests for OCR processing components"""
+import io
+import json
+import os
+import numpy as np
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from core.exceptions import ServiceException, ValidationException
+from torchecker.ocr.cache import OCRResultCache
+from torchecker.ocr.image_io import decode_image, open_upload
+from torchecker.ocr.layout import group_lines
+from torchecker.ocr.preprocess import ImagePreprocessor
+from torchecker.ocr.reader_pool import ReaderPool
+
+
+def make_png(width=40, height=20):
+    """Render a blank PNG page"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'white').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_pdf(pages=2, width=144, height=72):
+    """Render a PDF of blank pages (1 inch = 72 px at PIL's default 72 dpi)"""
+    images = [Image.new('RGB', (width, height), 'white') for _ in range(pages)]
+    buffer = io.BytesIO()
+    images[0].save(buffer, format='PDF', save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+class FakeReader:
+    """Stand-in for easyocr.Reader"""
+
+    def detect(self, img, **kwargs):
+        return [[]], [[]]
+
+    def recognize(self, img_cv_grey, horizontal_list=None, free_list=None, **kwargs):
+        return []
+
+
+@pytest.fixture
+def reader_pool(monkeypatch):
+    """Provide a pool that builds fake readers"""
+    pool = ReaderPool(max_size=2, lease_timeout=0.01)
+    monkeypatch.setattr(pool, '_build_reader', lambda: FakeReader())
+    return pool
+
+
+class TestReaderPool:
+    """Test ReaderPool"""
+
+    def test_lease_reuses_reader(self, reader_pool):
+        """Test a returned reader is handed out again warm"""
+        with reader_pool.lease() as first:
+            pass
+        with reader_pool.lease() as second:
+            pass
+
+        stats = reader_pool.stats()
+        assert first is second
+        assert stats['cold_leases'] == 1
+        assert stats['warm_leases'] == 1
+        assert stats['loaded'] == 1
+
+    def test_pool_is_bounded(self, reader_pool):
+        """Test lease fails once every reader is busy"""
+        with reader_pool.lease(), reader_pool.lease():
+            with pytest.raises(ServiceException) as exc:
+                with reader_pool.lease():
+                    pass
+
+        assert exc.value.error_code == 'OCR_BUSY'
+        assert reader_pool.stats()['loaded'] == 2
+        assert reader_pool.stats()['timeouts'] == 1
+
+    def test_warm_preloads_readers(self, reader_pool):
+        """Test warm builds readers up front"""
+        assert reader_pool.warm(5) == 2
+        assert reader_pool.stats()['idle'] == 2
+
+        with reader_pool.lease():
+            pass
+
+        assert reader_pool.stats()['cold_leases'] == 0
+        assert reader_pool.stats()['warm_leases'] == 1
+
+
+class TestInferenceMode:
+    """Test the reader inference mode and thread settings"""
+
+    @pytest.mark.parametrize('mode, quantize', [('int8', True), ('fp32', False)])
+    def test_mode_selects_quantization(self, monkeypatch, mode, quantize):
+        """Test readers are built with quantization only in int8 mode"""
+        from torchecker.ocr import reader_pool as module
+
+        built = []
+        module.load_ml_stack()
+        monkeypatch.setattr(module, 'configure_torch_threads', lambda threads: None)
+        monkeypatch.setattr(
+            module.easyocr, 'Reader',
+            lambda languages, **kwargs: built.append(kwargs) or FakeReader()
+        )
+        pool = ReaderPool(inference_mode=mode)
+
+        with pool.lease():
+            pass
+
+        assert built == [{'quantize': quantize}]
+        assert pool.stats()['inference_mode'] == mode
+
+    def test_rejects_unknown_mode(self):
+        """Test a misspelled mode fails at startup"""
+        from django.core.exceptions import ImproperlyConfigured
+
+        with pytest.raises(ImproperlyConfigured):
+            ReaderPool(inference_mode='int4')
+
+    def test_threads_split_cores_between_page_workers(self, settings, monkeypatch):
+        """Test the default thread count avoids oversubscription"""
+        from torchecker.ocr import reader_pool as module
+
+        monkeypatch.setattr(module.os, 'cpu_count', lambda: 8)
+        settings.OCR_TORCH_THREADS = 0
+        settings.OCR_PAGE_WORKERS = 1
+        assert module.default_torch_threads() == 0
+
+        settings.OCR_PAGE_WORKERS = 3
+        assert module.default_torch_threads() == 2
+
+        settings.OCR_TORCH_THREADS = 4
+        assert module.default_torch_threads() == 4
+
+    def test_mode_is_part_of_cache_version(self):
+        """Test fp32 and int8 results are cached separately"""
+        from torchecker.services.ocr_service import OCRService
+
+        int8 = OCRService(reader_pool=ReaderPool(inference_mode='int8'))
+        fp32 = OCRService(reader_pool=ReaderPool(inference_mode='fp32'))
+
+        assert int8.cache_version != fp32.cache_version
+
+
+class TestCpuGovernor:
+    """Test the node-wide inference slots"""
+
+    def make_governor(self, tmp_path, **kwargs):
+        """Each instance opens its own lock files, like a separate process"""
+        from torchecker.ocr.governor import CpuGovernor
+
+        options = dict(max_concurrent=2, cpu_budget=8, timeout=0.05)
+        options.update(kwargs)
+        return CpuGovernor(tmp_path, **options)
+
+    def test_caps_concurrent_inferences(self, tmp_path):
+        """Test a third inference waits and times out while two run"""
+        first = self.make_governor(tmp_path)
+        second = self.make_governor(tmp_path)
+
+        with first.inference(), second.inference():
+            with pytest.raises(ServiceException) as exc:
+                with self.make_governor(tmp_path).inference():
+                    pass
+
+        assert exc.value.error_code == 'OCR_BUSY'
+        with first.inference() as slot:
+            assert slot.index in (0, 1)
+
+    def test_threads_follow_remaining_budget(self, tmp_path, monkeypatch):
+        """Test a lone inference gets the whole budget and shares it later"""
+        from torchecker.ocr import governor as module
+
+        applied = []
+        monkeypatch.setattr(module, 'configure_torch_threads', applied.append)
+        first = self.make_governor(tmp_path)
+
+        with first.inference() as slot:
+            assert slot.threads == 8
+            with self.make_governor(tmp_path).inference() as other:
+                assert other.threads == 4
+                assert slot.rebalance() == 4
+
+        assert applied == [8, 4, 4]
+        assert self.make_governor(tmp_path, max_threads=3).threads_for(1) == 3
+
+    def test_wait_is_recorded(self, tmp_path):
+        """Test slot wait time reaches the page timings and the histogram"""
+        from torchecker.ocr.governor import WAIT_SECONDS
+        from torchecker.ocr.instrumentation import StageTimings
+
+        before = WAIT_SECONDS.snapshot().get((), {}).get('count', 0)
+        timings = StageTimings()
+
+        with self.make_governor(tmp_path).inference(timings):
+            pass
+
+        assert 'cpu_wait' in timings.seconds
+        assert WAIT_SECONDS.snapshot()[()]['count'] == before + 1
+
+    def test_counting_slots_takes_no_lock(self, tmp_path, monkeypatch):
+        """Test the occupancy probe sees other holders without locking slots"""
+        holder = self.make_governor(tmp_path)
+        probe = self.make_governor(tmp_path)
+
+        def no_locking(index):
+            pytest.fail("active_slots must not take slot locks")
+
+        monkeypatch.setattr(probe, '_try_lock', no_locking)
+
+        assert probe.active_slots() == 0
+        with holder.inference():
+            assert probe.active_slots() == 1
+            # A third process still gets the remaining slot
+            with self.make_governor(tmp_path).inference():
+                assert probe.active_slots() == 2
+
+    def test_waits_end_before_request_timeout(self, settings):
+        """Test the system check rejects OCR waits outlasting gunicorn's timeout"""
+        from torchecker.checks import check_ocr_timeouts
+
+        assert settings.OCR_READER_LEASE_TIMEOUT + settings.OCR_GOVERNOR_TIMEOUT < settings.REQUEST_TIMEOUT
+        assert check_ocr_timeouts(None) == []
+
+        settings.OCR_GOVERNOR_TIMEOUT = 60
+        assert [error.id for error in check_ocr_timeouts(None)] == ['torchecker.E001']
+
+    def test_gunicorn_config_uses_request_timeout(self, settings, monkeypatch):
+        """Test gunicorn_config.py loads and kills workers after REQUEST_TIMEOUT"""
+        import runpy
+
+        monkeypatch.setenv('REQUEST_TIMEOUT', '20')
+        monkeypatch.setenv('GUNICORN_WORKERS', '3')
+
+        config = runpy.run_path(str(settings.BASE_DIR / 'gunicorn_config.py'))
+
+        assert config['timeout'] == 20
+        assert config['graceful_timeout'] == 30
+        assert config['workers'] == 3
+
+    def test_process_image_holds_a_slot(self, tmp_path, monkeypatch):
+        """Test OCR runs inside a governor slot"""
+        from torchecker.services import ocr_service
+
+        governor = self.make_governor(tmp_path, max_concurrent=1)
+        held = []
+
+        class SlotCheckingReader(FakeReader):
+            def recognize(self, *args, **kwargs):
+                held.append(governor.active_slots())
+                return []
+
+        pool = ReaderPool()
+        monkeypatch.setattr(pool, '_build_reader', lambda: SlotCheckingReader())
+        service = ocr_service.OCRService(reader_pool=pool, governor=governor)
+
+        result = service.process_image(SimpleUploadedFile('page.png', make_png()))
+
+        assert held == [1]
+        assert governor.active_slots() == 0
+        assert 'cpu_wait' in result['timings_ms']
+
+
+class TestParallelPages:
+    """Test parallel page processing"""
+
+    def test_failed_pages_are_isolated_and_ordered(self):
+        """Test every page gets a result in upload order even on failure"""
+        from torchecker.ocr.parallel import process_pages_parallel
+
+        pages = [('page1.jpg', b'not an image'), ('page2.jpg', b'')]
+        results = process_pages_parallel(pages, max_workers=2)
+
+        assert [r['file_name'] for r in results] == ['page1.jpg', 'page2.jpg']
+        assert all(r['entries'] == [] for r in results)
+        assert all(r['error'] for r in results)
+
+    def test_pool_budget_is_split_between_web_workers(self, settings):
+        """Test web workers sharing a node share one page process budget"""
+        from torchecker.ocr.parallel import page_workers
+
+        settings.OCR_PAGE_WORKERS = 4
+        settings.OCR_WEB_WORKERS = 1
+        assert page_workers() == 4
+
+        settings.OCR_WEB_WORKERS = 2
+        assert page_workers() == 2
+
+        settings.OCR_WEB_WORKERS = 9
+        assert page_workers() == 1
+
+        settings.OCR_PAGE_WORKERS = 27
+        assert page_workers() == 3
+
+    def test_uploads_are_sequential_under_several_web_workers(self, settings, monkeypatch):
+        """Test a multi-page upload never reaches the pool when it is disabled"""
+        from torchecker.ocr import parallel
+        from torchecker.services.ocr_service import OCRService
+
+        settings.OCR_PAGE_WORKERS = 4
+        settings.OCR_WEB_WORKERS = 9
+
+        def no_pool(max_workers):
+            raise AssertionError('page pool started')
+
+        monkeypatch.setattr(parallel, 'get_page_executor', no_pool)
+        service = OCRService(reader_pool=ReaderPool(), in_process=True)
+        monkeypatch.setattr(service, 'process_image', lambda image: {'file_name': image.name})
+
+        images = [SimpleUploadedFile(f'page{i}.jpg', b'') for i in range(3)]
+        results = service.process_images(images)
+
+        assert [r['file_name'] for r in results] == ['page0.jpg', 'page1.jpg', 'page2.jpg']
+
+
+class CountingReader(FakeReader):
+    """Fake reader returning one transcript line and counting calls"""
+
+    calls = 0
+
+    def recognize(self, img_cv_grey, horizontal_list=None, free_list=None, **kwargs):
+        CountingReader.calls += 1
+        return [
+            ([[0, 0], [40, 0], [40, 10], [0, 10]], 'CS101', 0.9),
+            ([[50, 0], [150, 0], [150, 10], [50, 10]], 'Programming', 0.9),
+            ([[160, 0], [180, 0], [180, 10], [160, 10]], '3.0', 0.9),
+            ([[190, 0], [210, 0], [210, 10], [190, 10]], '1.5', 0.9),
+        ]
+
+
+class TestOCRResultCache:
+    """Test OCRResultCache and its use in OCRService"""
+
+    def test_set_and_get(self, tmp_path):
+        """Test stored results are returned and counted as hits"""
+        cache = OCRResultCache(tmp_path, max_bytes=1024 * 1024)
+        key = OCRResultCache.make_key('ab' * 32, '1')
+
+        assert cache.get(key) is None
+        cache.set(key, {'boxes': [], 'structured': {'entries': []}})
+
+        assert cache.get(key) == {'boxes': [], 'structured': {'entries': []}}
+        assert cache.stats() == {'hits': 1, 'misses': 1}
+
+    def test_parser_version_in_key(self):
+        """Test a parser version bump changes the key"""
+        assert OCRResultCache.make_key('ab', '1') != OCRResultCache.make_key('ab', '2')
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test entries are evicted oldest first when over budget"""
+        cache = OCRResultCache(tmp_path, max_bytes=10 ** 9)
+        old_key = OCRResultCache.make_key('aa' * 32, '1')
+        new_key = OCRResultCache.make_key('bb' * 32, '1')
+        cache.set(old_key, {'text': 'x' * 1000})
+        os.utime(cache._path(old_key), (0, 0))
+        cache.set(new_key, {'text': 'y' * 1000})
+
+        # Room for one entry even after shrinking to EVICT_TARGET
+        cache.max_bytes = int(cache._path(new_key).stat().st_size * 1.5)
+        assert cache.evict() == 1
+
+        assert cache.get(old_key) is None
+        assert cache.get(new_key) is not None
+
+    def test_writes_only_scan_when_estimate_exceeds_budget(self, tmp_path, monkeypatch):
+        """Test set() keeps a running size and leaves the directory alone under budget"""
+        cache = OCRResultCache(tmp_path, max_bytes=10 ** 9)
+        scans = []
+        evict = cache.evict
+        monkeypatch.setattr(cache, 'evict', lambda: scans.append(1) or evict())
+
+        for i in range(5):
+            cache.set(OCRResultCache.make_key(f'{i:02d}' * 32, '1'), {'text': 'x' * 1000})
+
+        # Only the first write scans, to seed the estimate
+        assert len(scans) == 1
+        entry_size = cache._path(OCRResultCache.make_key('00' * 32, '1')).stat().st_size
+        assert cache._size == 5 * entry_size
+
+        cache.max_bytes = 5 * entry_size
+        cache.set(OCRResultCache.make_key('05' * 32, '1'), {'text': 'x' * 1000})
+
+        assert len(scans) == 2
+        assert cache._size <= cache.max_bytes * 0.9
+        assert len(list(tmp_path.glob('*/*.json.gz'))) == 4
+
+    def test_overwrites_do_not_grow_the_estimate(self, tmp_path):
+        """Test rewriting a key counts only the size difference"""
+        cache = OCRResultCache(tmp_path, max_bytes=10 ** 9)
+        key = OCRResultCache.make_key('aa' * 32, '1')
+
+        for _ in range(3):
+            cache.set(key, {'text': 'x' * 1000})
+
+        assert cache._size == cache._path(key).stat().st_size
+
+    def test_identical_page_skips_inference(self, tmp_path, monkeypatch):
+        """Test re-uploading the same page is served from the cache"""
+        from torchecker.services import ocr_service
+
+        cache = OCRResultCache(tmp_path, max_bytes=1024 * 1024)
+        monkeypatch.setattr(ocr_service, 'get_result_cache', lambda: cache)
+        pool = ReaderPool()
+        monkeypatch.setattr(pool, '_build_reader', lambda: CountingReader())
+        service = ocr_service.OCRService(reader_pool=pool)
+        CountingReader.calls = 0
+
+        page = make_png()
+        first = service.process_image(SimpleUploadedFile('page.png', page))
+        second = service.process_image(SimpleUploadedFile('page.png', page))
+
+        assert CountingReader.calls == 1
+        assert first['cached'] is False
+        assert second['cached'] is True
+        assert second['entries'] == first['entries']
+        assert second['entries'][0]['subject_code'] == 'CS101'
+
+
+class TestImageDecoding:
+    """Test in-memory decoding of uploads"""
+
+    def test_decodes_in_memory_upload(self):
+        """Test an in-memory upload decodes to an RGB array"""
+        source, content_hash = open_upload(SimpleUploadedFile('page.png', make_png()))
+        image = decode_image(source, 'page.png')
+
+        assert image.shape == (20, 40, 3)
+        assert len(content_hash) == 64
+
+    def test_decodes_spilled_upload_from_its_temp_file(self):
+        """Test an upload Django wrote to disk is read from that file"""
+        data = make_png()
+        upload = TemporaryUploadedFile('page.png', 'image/png', len(data), None)
+        upload.write(data)
+        upload.flush()
+
+        source, _ = open_upload(upload)
+
+        assert source == upload.temporary_file_path()
+        assert decode_image(source, 'page.png').shape == (20, 40, 3)
+        upload.close()
+
+    def test_rejects_large_upload(self, settings):
+        """Test the byte limit is enforced before reading"""
+        settings.OCR_MAX_UPLOAD_BYTES = 10
+
+        with pytest.raises(ValidationException):
+            open_upload(SimpleUploadedFile('page.png', make_png()))
+
+    def test_rejects_large_image_before_decode(self, settings):
+        """Test the pixel limit is enforced from the header"""
+        settings.OCR_MAX_IMAGE_PIXELS = 100
+        source, _ = open_upload(SimpleUploadedFile('page.png', make_png()))
+
+        with pytest.raises(ValidationException):
+            decode_image(source, 'page.png')
+
+    def test_rejects_non_image(self):
+        """Test garbage bytes raise a validation error"""
+        source, _ = open_upload(SimpleUploadedFile('page.png', b'not an image'))
+
+        with pytest.raises(ValidationException):
+            decode_image(source, 'page.png')
+
+
+
+class DetectingReader:
+    """Fake reader exposing the detect/recognize internals batching uses"""
+
+    character = 'abc'
+    lang_char = 'abc'
+    recognizer = converter = None
+    device = 'cpu'
+
+    def __init__(self, boxes_per_page):
+        self.boxes_per_page = list(boxes_per_page)
+
+    def detect(self, img, **kwargs):
+        return [self.boxes_per_page.pop(0)], [[]]
+
+
+class TestBatchedRecognition:
+    """Test cross-page batched recognition"""
+
+    def test_crops_are_batched_across_pages(self, monkeypatch):
+        """Test crops of all pages share batches and split back per page"""
+        recognition = pytest.importorskip('easyocr.recognition')
+        from torchecker.ocr import batching
+
+        batches = []
+
+        def fake_get_text(character, height, width, recognizer, converter,
+                          image_list, batch_size=1, **kwargs):
+            batches.append((width, batch_size))
+            return [(box, f'w{width}', 0.9) for box, _ in image_list]
+
+        monkeypatch.setattr(recognition, 'get_text', fake_get_text)
+        narrow = [[0, 30, 0, 30], [0, 30, 40, 70]]
+        wide = [[0, 400, 80, 110]]
+        reader = DetectingReader([narrow + wide, narrow])
+        pages = [np.full((200, 500), 255, np.uint8)] * 2
+
+        results = batching.recognize_pages(reader, pages, batch_size=3)
+
+        assert [len(page) for page in results] == [3, 2]
+        assert [text for _, text, _ in results[0]] == ['w64', 'w64', 'w896']
+        assert results[1][1][0] == [[0, 40], [30, 40], [30, 70], [0, 70]]
+        # Four narrow crops from both pages fill one batch of three and one
+        # of one; the wide crop is recognized at its own width
+        assert batches == [(64, 3), (64, 1), (896, 1)]
+
+    def test_batched_mode_matches_per_page_results(self, monkeypatch):
+        """Test batched mode returns the same pages as the per-page path"""
+        from torchecker.services import ocr_service
+
+        pool = ReaderPool()
+        monkeypatch.setattr(pool, '_build_reader', lambda: CountingReader())
+        monkeypatch.setattr(
+            ocr_service, 'recognize_pages',
+            lambda reader, images, batch_size, timings, **kwargs: [
+                reader.recognize(image) for image in images
+            ]
+        )
+        service = ocr_service.OCRService(reader_pool=pool)
+
+        def upload():
+            return [
+                SimpleUploadedFile(f'page{i}.png', make_png(40 + i))
+                for i in range(3)
+            ]
+
+        batched = service.process_images(upload(), batched=True)
+        sequential = service.process_images(upload(), batched=False)
+
+        for page in batched + sequential:
+            page['preprocessing'].pop('timings_ms')
+            page.pop('timings_ms')
+        assert batched == sequential
+        assert [page['file_name'] for page in batched] == [
+            'page0.png', 'page1.png', 'page2.png'
+        ]
+
+
+
+def transcript_boxes():
+    """Detected boxes of a page: letterhead, a 10-row table and a footer"""
+    def row(y, columns):
+        return [[x * 100, x * 100 + 80, y, y + 20] for x in range(columns)]
+
+    header = row(20, 1) + row(60, 2) + row(100, 1)
+    table = [box for index in range(10) for box in row(300 + index * 30, 5)]
+    footer = row(800, 2) + row(840, 1) + row(880, 2)
+    return header, table, footer
+
+
+class TestTableRegion:
+    """Test the table region pre-pass"""
+
+    def test_drops_boxes_outside_table_and_header_band(self):
+        """Test footer boxes are dropped and header and table boxes kept"""
+        from torchecker.ocr.regions import TableRegionFilter
+
+        header, table, footer = transcript_boxes()
+        region_filter = TableRegionFilter(header_band=0.2)
+
+        kept, free = region_filter.apply(header + table + footer, [], page_height=1000)
+
+        assert kept == header + table
+        assert free == []
+
+    def test_page_without_table_is_kept_whole(self):
+        """Test nothing is dropped when no table rows are found"""
+        from torchecker.ocr.regions import TableRegionFilter
+
+        header, _, footer = transcript_boxes()
+        boxes = header + footer
+
+        assert TableRegionFilter().apply(boxes, [], page_height=1000) == (boxes, [])
+
+    def test_free_form_boxes_are_filtered(self):
+        """Test rotated boxes are judged by their vertical extent"""
+        from torchecker.ocr.regions import TableRegionFilter
+
+        _, table, _ = transcript_boxes()
+        inside = [[0, 400], [80, 400], [80, 420], [0, 420]]
+        outside = [[0, 900], [80, 900], [80, 920], [0, 920]]
+
+        kept, free = TableRegionFilter(header_band=0).apply(
+            table, [inside, outside], page_height=1000
+        )
+
+        assert kept == table
+        assert free == [inside]
+
+    def test_recognizer_only_sees_table_region(self, monkeypatch):
+        """Test process_image recognizes the filtered boxes"""
+        from torchecker.ocr.regions import TableRegionFilter
+        from torchecker.services import ocr_service
+
+        header, table, footer = transcript_boxes()
+        recognized = []
+
+        class RecordingReader(DetectingReader):
+            def recognize(self, img_cv_grey, horizontal_list=None, free_list=None, **kwargs):
+                recognized.extend(horizontal_list)
+                return []
+
+        pool = ReaderPool()
+        monkeypatch.setattr(
+            pool, '_build_reader', lambda: RecordingReader([header + table + footer])
+        )
+        service = ocr_service.OCRService(
+            reader_pool=pool, region_filter=TableRegionFilter(header_band=0.2)
+        )
+
+        result = service.process_image(SimpleUploadedFile('page.png', make_png(500, 1000)))
+
+        assert recognized == header + table
+        assert 'table_region' in result['timings_ms']
+        assert service.cache_version.endswith(service.region_filter.config_key())
+
+
+class TestConfidenceRefiner:
+    """Test the second recognition pass over low-confidence boxes"""
+
+    def test_selects_least_confident_boxes_up_to_cap(self):
+        """Test only boxes below the threshold are picked, worst first"""
+        from torchecker.ocr.refine import ConfidenceRefiner
+
+        box = [[0, 0], [10, 0], [10, 10], [0, 10]]
+        results = [(box, 'a', 0.9), (box, 'b', 0.2), (box, 'c', 0.4), (box, 'd', 0.1)]
+
+        assert ConfidenceRefiner(threshold=0.5, max_crops=2).select(results) == [3, 1]
+
+    def test_crops_are_cut_from_the_decoded_page(self):
+        """Test boxes on a downscaled page are re-cut at full resolution"""
+        from torchecker.ocr.refine import ConfidenceRefiner
+
+        page = np.full((50, 100), 255, dtype=np.uint8)
+        source = np.full((100, 200, 3), 255, dtype=np.uint8)
+        source[40:60, 80:120] = 0
+        preprocessing = {'scale': 0.5, 'angle': 0.0, 'crop_offset': [0, 0]}
+
+        image, factor, offset = ConfidenceRefiner.source_mapping(page, source, preprocessing)
+        assert image.shape == (100, 200)
+        assert (factor, offset) == (2.0, (0.0, 0.0))
+
+        refiner = ConfidenceRefiner(padding=0)
+        crop, width = refiner.cut(image, [[40, 20], [60, 20], [60, 30], [40, 30]], factor, offset, 64)
+        assert crop.shape[0] == 64
+        assert width == 128
+        assert crop.mean() < 10
+
+        # A deskewed page no longer lines up with the upload
+        deskewed = dict(preprocessing, angle=2.0)
+        assert ConfidenceRefiner.source_mapping(page, source, deskewed)[0] is page
+
+    def test_merge_keeps_more_confident_reading(self):
+        """Test a second reading only replaces a less confident first one"""
+        from torchecker.ocr.refine import ConfidenceRefiner
+
+        box = [[0, 0], [10, 0], [10, 10], [0, 10]]
+        results = [(box, '1.S', 0.2), (box, 'CS1O1', 0.4)]
+        crops = [(0, (box, None, 64)), (1, (box, None, 64))]
+
+        merged, improved = ConfidenceRefiner.merge(
+            results, crops, [(box, '1.5', 0.8), (box, 'CSIOI', 0.3)]
+        )
+
+        assert merged == [(box, '1.5', 0.8), (box, 'CS1O1', 0.4)]
+        assert improved == 1
+
+    def test_process_image_uses_refined_readings(self, monkeypatch):
+        """Test a grade misread with low confidence is re-recognized"""
+        from torchecker.ocr import refine
+        from torchecker.services import ocr_service
+
+        class LowConfidenceReader(CountingReader):
+            def recognize(self, img_cv_grey, horizontal_list=None, free_list=None, **kwargs):
+                results = super().recognize(img_cv_grey, horizontal_list, free_list)
+                results[3] = (results[3][0], '1.S', 0.25)
+                return results
+
+        second_pass = []
+
+        def recognize_crops(reader, crops, batch_size, height):
+            second_pass.extend(crops)
+            return [(box, '1.5', 0.95) for box, _, _ in crops]
+
+        monkeypatch.setattr(refine, 'recognize_crops', recognize_crops)
+        pool = ReaderPool()
+        monkeypatch.setattr(pool, '_build_reader', lambda: LowConfidenceReader())
+        service = ocr_service.OCRService(
+            reader_pool=pool, refiner=refine.ConfidenceRefiner()
+        )
+
+        result = service.process_image(SimpleUploadedFile('page.png', make_png(300, 40)))
+
+        assert len(second_pass) == 1
+        assert result['entries'][0]['final_grade'] == 1.5
+        assert 'refine' in result['timings_ms']
+        assert service.cache_version.endswith(service.refiner.config_key())
+
+@pytest.fixture
+def sidecar(reader_pool, tmp_path):
+    """Run an OCR sidecar on a temporary socket with fake readers"""
+    import threading
+    from torchecker.ocr.sidecar import SidecarServer
+    from torchecker.services.ocr_service import OCRService
+
+    def start(ocr_service=None):
+        service = ocr_service or OCRService(reader_pool=reader_pool, in_process=True)
+        server = SidecarServer(tmp_path / 'ocr.sock', service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.path
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestOcrSidecar:
+    """Test OCR through the sidecar process protocol"""
+
+    def test_pages_are_ocrd_in_the_sidecar(self, sidecar, monkeypatch):
+        """Test a thin client service gets the sidecar's page results"""
+        from torchecker.ocr.sidecar import SidecarClient
+        from torchecker.services.ocr_service import OCRService
+
+        pool = ReaderPool()
+        monkeypatch.setattr(pool, '_build_reader', lambda: CountingReader())
+        path = sidecar(OCRService(reader_pool=pool, in_process=True))
+
+        client = OCRService(sidecar=SidecarClient(path, timeout=10))
+        results = client.process_images([
+            SimpleUploadedFile('page1.png', make_png()),
+            SimpleUploadedFile('page2.png', make_png(41)),
+        ])
+
+        assert client.reader_pool is None
+        assert [r['file_name'] for r in results] == ['page1.png', 'page2.png']
+        assert results[0]['entries'][0]['subject_code'] == 'CS101'
+        assert client.sidecar.stats()['loaded'] == 1
+
+    def test_pdf_pages_stream_back(self, sidecar):
+        """Test every page of a PDF comes back as its own result"""
+        from torchecker.ocr.sidecar import SidecarClient
+        from torchecker.services.ocr_service import OCRService
+
+        client = OCRService(sidecar=SidecarClient(sidecar(), timeout=10))
+        pages = list(client.iter_process_images([
+            SimpleUploadedFile('tor.pdf', make_pdf(3), content_type='application/pdf'),
+        ]))
+
+        assert [page['page_number'] for page in pages] == [1, 2, 3]
+
+    def test_errors_are_raised_in_the_client(self, sidecar):
+        """Test a sidecar ServiceException reaches the caller intact"""
+        from torchecker.ocr.sidecar import SidecarClient
+
+        client = SidecarClient(sidecar(), timeout=10)
+
+        with pytest.raises(ServiceException) as excinfo:
+            client.process_image(SimpleUploadedFile('page.png', b'not an image'))
+
+        assert excinfo.value.status_code == 400
+        assert 'not a readable image' in excinfo.value.message
+
+    def test_unreachable_sidecar(self, tmp_path):
+        """Test a missing sidecar is reported as unavailable"""
+        from torchecker.ocr.sidecar import SidecarClient
+
+        client = SidecarClient(tmp_path / 'missing.sock', timeout=1)
+
+        with pytest.raises(ServiceException) as excinfo:
+            client.process_image(SimpleUploadedFile('page.png', make_png()))
+
+        assert excinfo.value.error_code == 'OCR_UNAVAILABLE'
+        assert excinfo.value.status_code == 503
+
+class TestPageStreaming:
+    """Test page-by-page processing for streamed responses"""
+
+    def test_failed_page_is_yielded_in_order(self, reader_pool):
+        """Test a bad page yields an error result without stopping the rest"""
+        from torchecker.services.ocr_service import OCRService
+
+        service = OCRService(reader_pool=reader_pool)
+        pages = service.iter_process_images([
+            SimpleUploadedFile('page1.png', make_png()),
+            SimpleUploadedFile('page2.png', b'not an image'),
+            SimpleUploadedFile('page3.png', make_png()),
+        ])
+
+        results = list(pages)
+
+        assert [r['file_name'] for r in results] == ['page1.png', 'page2.png', 'page3.png']
+        assert 'error' not in results[0]
+        assert 'not a readable image' in results[1]['error']
+        assert results[2]['entries'] == []
+
+
+
+class TestPdfIngestion:
+    """Test lazy rasterization of PDF uploads"""
+
+    def test_detects_pdf_by_magic_bytes(self):
+        """Test PDFs are recognized without a .pdf name or content type"""
+        from torchecker.ocr.pdf import is_pdf
+
+        assert is_pdf(SimpleUploadedFile('upload', make_pdf(1)))
+        assert not is_pdf(SimpleUploadedFile('upload', make_png()))
+
+    def test_renders_pages_at_configured_dpi(self, settings):
+        """Test page size follows OCR_PDF_DPI"""
+        from torchecker.ocr.pdf import PdfRasterizer
+
+        settings.OCR_PDF_DPI = 144
+        with PdfRasterizer(io.BytesIO(make_pdf(2)), 'tor.pdf') as rasterizer:
+            assert len(rasterizer) == 2
+            assert rasterizer.render(2).shape == (144, 288, 3)
+            with pytest.raises(ValidationException):
+                rasterizer.render(3)
+
+    def test_rejects_unreadable_and_oversized_pdfs(self, settings):
+        """Test broken PDFs and PDFs with too many pages are rejected"""
+        from torchecker.ocr.pdf import PdfRasterizer
+
+        with pytest.raises(ValidationException):
+            PdfRasterizer(io.BytesIO(b'%PDF-1.4 truncated'), 'broken.pdf')
+
+        settings.OCR_PDF_MAX_PAGES = 2
+        with pytest.raises(ValidationException):
+            PdfRasterizer(io.BytesIO(make_pdf(3)), 'long.pdf')
+
+    def test_pages_are_rendered_lazily_and_cached(self, reader_pool, tmp_path, monkeypatch):
+        """Test each page is rendered once and cached pages are not rendered"""
+        from torchecker.ocr import pdf
+        from torchecker.services import ocr_service as module
+
+        cache = OCRResultCache(tmp_path, max_bytes=1024 * 1024)
+        monkeypatch.setattr(module, 'get_result_cache', lambda: cache)
+
+        rendered = []
+        original_render = pdf.PdfRasterizer.render
+
+        def render(self, page_number):
+            rendered.append(page_number)
+            return original_render(self, page_number)
+
+        monkeypatch.setattr(pdf.PdfRasterizer, 'render', render)
+        service = module.OCRService(reader_pool=reader_pool)
+
+        first = service.process_images([SimpleUploadedFile('tor.pdf', make_pdf(2))])
+        second = service.process_images([SimpleUploadedFile('tor.pdf', make_pdf(2))])
+
+        assert [page['page_number'] for page in first] == [1, 2]
+        assert [page['cached'] for page in second] == [True, True]
+        assert rendered == [1, 2]
+
+    def test_mixed_upload_keeps_page_order(self, reader_pool):
+        """Test images and PDF pages are yielded in upload order"""
+        from torchecker.services.ocr_service import OCRService
+
+        service = OCRService(reader_pool=reader_pool)
+        uploads = [
+            SimpleUploadedFile('cover.png', make_png()),
+            SimpleUploadedFile('tor.pdf', make_pdf(2)),
+        ]
+
+        results = list(service.iter_process_images(uploads))
+
+        assert service.count_pages(uploads) == 3
+        assert [(r['file_name'], r['page_number']) for r in results] == [
+            ('cover.png', None), ('tor.pdf', 1), ('tor.pdf', 2)
+        ]
+
+
+class TestInstrumentation:
+    """Test per-stage timings and histogram export"""
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test Prometheus text output of a labelled histogram"""
+        from core.metrics import Histogram
+
+        histogram = Histogram('test_seconds', 'Test', ('stage',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage='decode')
+        histogram.observe(0.5, stage='decode')
+        histogram.observe(5.0, stage='decode')
+
+        text = histogram.render()
+
+        assert 'test_seconds_bucket{stage="decode",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{stage="decode",le="1.0"} 2' in text
+        assert 'test_seconds_bucket{stage="decode",le="+Inf"} 3' in text
+        assert 'test_seconds_count{stage="decode"} 3' in text
+
+    def test_process_image_reports_stage_timings(self, reader_pool):
+        """Test every pipeline stage of a page is timed and exported"""
+        from torchecker.ocr.instrumentation import STAGE_SECONDS
+        from torchecker.services.ocr_service import OCRService
+
+        before = STAGE_SECONDS.snapshot().get(('recognition',), {}).get('count', 0)
+        result = OCRService(reader_pool=reader_pool).process_image(
+            SimpleUploadedFile('page.png', make_png())
+        )
+
+        assert set(result['timings_ms']) == {
+            'read', 'decode', 'preprocess', 'reader_wait',
+            'detection', 'recognition', 'sorting', 'extraction',
+        }
+        assert STAGE_SECONDS.snapshot()[('recognition',)]['count'] == before + 1
+
+    def test_remote_cache_hits_are_recorded_as_cached(self):
+        """Test pages served from a remote cache stay out of the ocr outcome"""
+        from torchecker.ocr.instrumentation import PAGES_TOTAL_SECONDS, record_remote_timings
+
+        def count(outcome):
+            return PAGES_TOTAL_SECONDS.snapshot().get((outcome,), {}).get('count', 0)
+
+        cached, ocr = count('cached'), count('ocr')
+
+        record_remote_timings({'cached': True, 'timings_ms': {'read': 1.5}})
+        record_remote_timings({'cached': False, 'timings_ms': {'recognition': 120.0}})
+
+        assert (count('cached'), count('ocr')) == (cached + 1, ocr + 1)
+
+
+def make_text_page(char_height=60, width=2000, height=1500, angle=0):
+    """Render a page of dark glyph-sized blocks in rows"""
+    from PIL import ImageDraw
+
+    page = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(page)
+    for top in range(200, height - 200, char_height * 2):
+        for left in range(200, width - 200, char_height):
+            draw.rectangle(
+                [left, top, left + char_height // 2, top + char_height],
+                fill='black'
+            )
+    if angle:
+        page = page.rotate(angle, fillcolor='white')
+    return np.asarray(page)
+
+
+class TestImagePreprocessor:
+    """Test ImagePreprocessor"""
+
+    def test_estimates_text_height(self):
+        """Test text height comes from the glyph components"""
+        gray = make_text_page(char_height=60)[:, :, 0]
+
+        estimate = ImagePreprocessor().estimate_text_height(gray)
+
+        assert 50 <= estimate <= 70
+
+    def test_downscales_to_target_height(self):
+        """Test large text is scaled down to the target height"""
+        processed, report = ImagePreprocessor(target_text_height=20).run(
+            make_text_page(char_height=60)
+        )
+
+        assert processed.ndim == 2
+        assert 0.25 <= report['scale'] < 0.5
+        assert processed.shape[1] == pytest.approx(2000 * report['scale'], abs=1)
+        assert set(report['timings_ms']) == {'grayscale', 'downscale'}
+
+    def test_never_upscales(self):
+        """Test small text is left at its original resolution"""
+        processed, report = ImagePreprocessor(target_text_height=40).run(
+            make_text_page(char_height=20)
+        )
+
+        assert report['scale'] == 1.0
+        assert processed.shape == (1500, 2000)
+
+    def test_optional_stages(self):
+        """Test deskew and margin cropping when enabled"""
+        preprocessor = ImagePreprocessor(
+            target_text_height=60, deskew=True, crop_margins=True
+        )
+
+        processed, report = preprocessor.run(make_text_page(angle=3))
+
+        assert 1.0 <= abs(report['angle']) <= 5.0
+        assert report['crop_offset'][0] > 0
+        assert processed.shape[1] < 2000
+        assert {'deskew', 'crop_margins'} <= set(report['timings_ms'])
+
+    def test_config_changes_cache_version(self):
+        """Test cached results are not shared across preprocessing configs"""
+        assert (
+            ImagePreprocessor(deskew=True).config_key()
+            != ImagePreprocessor().config_key()
+        )
+
+
+def reference_sort_ocr_results(results):
+    """Per-box line grouping as implemented before the layout engine"""
+    def get_center(bbox):
+        x_coords = [p[0] for p in bbox]
+        y_coords = [p[1] for p in bbox]
+        return (sum(x_coords) / 4, sum(y_coords) / 4)
+
+    annotated = [
+        {"bbox": r[0], "text": r[1], "conf": r[2], "center": get_center(r[0])}
+        for r in results if r[2] > 0.3
+    ]
+    heights = [abs(item['bbox'][0][1] - item['bbox'][2][1]) for item in annotated]
+    threshold = (sum(heights) / len(heights) if heights else 15) * 0.6
+
+    annotated.sort(key=lambda x: x["center"][1])
+    lines, current_line = [], []
+    for item in annotated:
+        if not current_line:
+            current_line.append(item)
+            continue
+        if abs(item["center"][1] - current_line[-1]["center"][1]) < threshold:
+            current_line.append(item)
+        else:
+            lines.append(current_line)
+            current_line = [item]
+    if current_line:
+        lines.append(current_line)
+    for line in lines:
+        line.sort(key=lambda x: x["center"][0])
+    return lines
+
+
+def random_ocr_results(rng, count, integer_coords):
+    """Generate readtext-style boxes laid out in noisy rows and columns"""
+    results = []
+    for index in range(count):
+        x = float(rng.integers(0, 20)) * 60 + rng.normal(0, 3)
+        y = float(rng.integers(0, count // 10 + 1)) * 25 + rng.normal(0, 4)
+        w, h = rng.uniform(20, 80), rng.uniform(10, 20)
+        corners = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        if integer_coords:
+            corners = [[int(px), int(py)] for px, py in corners]
+        results.append((corners, f"w{index}", float(rng.uniform(0, 1))))
+    return results
+
+
+class TestLayoutEngine:
+    """Test the array-backed line grouping"""
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_matches_reference_implementation(self, seed):
+        """Test output is identical to the per-box implementation"""
+        rng = np.random.default_rng(seed)
+        results = random_ocr_results(rng, int(rng.integers(1, 400)), seed % 2 == 0)
+
+        assert group_lines(results) == reference_sort_ocr_results(results)
+
+    def test_ties_keep_reference_order(self):
+        """Test boxes sharing a center keep the reference ordering"""
+        box = [[0, 0], [10, 0], [10, 10], [0, 10]]
+        results = [(box, 'a', 0.9), (box, 'b', 0.9), (box, 'c', 0.9)]
+
+        assert group_lines(results) == reference_sort_ocr_results(results)
+
+    def test_drops_low_confidence_boxes(self):
+        """Test nothing is returned when every box is below the cutoff"""
+        box = [[0, 0], [10, 0], [10, 10], [0, 10]]
+
+        assert group_lines([(box, 'a', 0.3), (box, 'b', 0.1)]) == []
+
+
+# Synthetic pages, OCR-style corruptions of them and edge cases, with the
+# output of the per-pattern parser that predates the tokenizer
+GOLDEN_CORPUS = os.path.join(os.path.dirname(__file__), 'fixtures', 'parser_golden.json')
+
+
+class TestFieldParser:
+    """Test the single-pass token classifier"""
+
+    def test_matches_golden_corpus(self):
+        """Test output is identical to the per-pattern implementation"""
+        from torchecker.ocr.parser import extract_fields
+
+        with open(GOLDEN_CORPUS, encoding='utf-8') as fh:
+            corpus = json.load(fh)
+
+        for page in corpus:
+            lines = [[{'text': text} for text in line] for line in page['lines']]
+            assert extract_fields(lines) == page['expected']
+
+    @pytest.mark.parametrize('text, expected', [
+        ('CS101', ('code', None)),
+        ('IT-102A', ('code', None)),
+        ('1.25', ('number', None)),
+        ('2019-2020', ('year', None)),
+        ('PASSED', ('remark', None)),
+        ('Firstsecond', ('text', 'first')),
+        ('secondfirst', ('text', 'first')),
+        ('Summer', ('text', 'summer')),
+        ('Calculus', ('text', None)),
+    ])
+    def test_classify_token(self, text, expected):
+        """Test each token gets one kind and its semester keyword"""
+        from torchecker.ocr.parser import classify_token
+
+        assert classify_token(text) == expected
+
+
+class TestBoxStorage:
+    """Test packing raw OCR boxes for re-parsing"""
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_round_trip_parses_identically(self, seed):
+        """Test stored boxes give the same lines and fields as the originals"""
+        from torchecker.ocr.boxes import pack_boxes, parse_boxes, unpack_boxes
+        from torchecker.ocr.cache import normalize_boxes
+        from torchecker.ocr.parser import extract_fields
+
+        rng = np.random.default_rng(seed)
+        results = random_ocr_results(rng, 200, seed % 2 == 0)
+
+        restored = unpack_boxes(pack_boxes(results))
+
+        assert restored == normalize_boxes(results)
+        assert group_lines(restored) == group_lines(normalize_boxes(results))
+        assert parse_boxes(restored) == extract_fields(group_lines(results))
+
+    def test_rejects_unreadable_payload(self):
+        """Test corrupt data is reported rather than parsed"""
+        from torchecker.ocr.boxes import reparse_packed, unpack_boxes
+
+        with pytest.raises(ValueError):
+            unpack_boxes(b'not gzip')
+
+        assert reparse_packed([(7, b'not gzip')]) == [(7, None)]
@@ -0,0 +1,661 @@
+"""Tests for torchecker services"""
+import io
+from datetime import timedelta
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core.exceptions import (
+    BusinessLogicException,
+    ResourceNotFoundException,
+    ValidationException
+)
+from torchecker.models import (
+    OcrJob,
+    OcrJobPage,
+    TorDocument,
+    TorDocumentPage,
+    TorStudentSummary,
+    TorTransferee
+)
+from torchecker.ocr.boxes import pack_boxes
+from torchecker.services.ocr_job_service import OcrJobService
+from torchecker.services.ocr_service import OCRService
+from torchecker.services.tor_service import TorService
+
+
+class FakeOCRService:
+    """OCR service returning canned page results"""
+    
+    def __init__(self, results):
+        self.results = list(results)
+    
+    def process_image(self, image_file):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def process_pdf_page(self, pdf_file, page_number):
+        return dict(self.process_image(pdf_file), page_number=page_number)
+
+
+def make_upload(name):
+    """Build an uploaded page image"""
+    return SimpleUploadedFile(name, b'fake image bytes', content_type='image/jpeg')
+
+
+def make_boxes(rows):
+    """Build readtext output with one line of boxes per row of texts"""
+    boxes = []
+    for row, texts in enumerate(rows):
+        y = 20 + row * 40
+        for column, text in enumerate(texts):
+            x = 10 + column * 120
+            boxes.append([
+                [[x, y], [x + 100, y], [x + 100, y + 20], [x, y + 20]],
+                text,
+                0.9,
+            ])
+    return boxes
+
+
+def make_pdf_upload(name, pages):
+    """Build an uploaded PDF with blank pages"""
+    images = [Image.new('RGB', (200, 100), 'white') for _ in range(pages)]
+    buffer = io.BytesIO()
+    images[0].save(buffer, format='PDF', save_all=True, append_images=images[1:])
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='application/pdf')
+
+
+def make_entries(count):
+    """Build extracted subject entries"""
+    return [
+        {
+            'subject_code': f'CS{number:03d}',
+            'subject_description': f'Subject {number}',
+            'semester': 'first',
+            'school_year_offered': '2023-2024',
+            'total_academic_units': 3.0,
+            'final_grade': 1.5,
+            'remarks': 'PASSED',
+        }
+        for number in range(count)
+    ]
+
+
+def count_inserts(queries, table='tor_transferee'):
+    """Count INSERT statements into ``table`` among captured queries"""
+    return sum(
+        1 for query in queries
+        if query['sql'].startswith(f'INSERT INTO "{table}"')
+    )
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Store uploaded files in a temporary directory"""
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.mark.django_db
+class TestTorServiceBulkSave:
+    """Test bulk persistence of TOR entries"""
+    
+    def test_entries_are_inserted_in_one_statement(self):
+        """Test a 70-subject transcript costs a single INSERT"""
+        with CaptureQueriesContext(connection) as queries:
+            saved = TorService.save_tor_entries(
+                "BULK001", "Juan Dela Cruz", "Previous University", make_entries(70)
+            )
+        
+        assert count_inserts(queries.captured_queries) == 1
+        assert len(saved) == 70
+        assert all(entry.pk for entry in saved)
+        assert TorTransferee.objects.filter(account_id="BULK001").count() == 70
+        assert saved[0].created_at is not None
+    
+    def test_large_imports_are_batched(self, monkeypatch):
+        """Test rows are split into BULK_BATCH_SIZE-row statements"""
+        monkeypatch.setattr(TorService, 'BULK_BATCH_SIZE', 50)
+        
+        with CaptureQueriesContext(connection) as queries:
+            saved = TorService.save_tor_entries(
+                "BULK002", None, None, make_entries(120)
+            )
+        
+        assert count_inserts(queries.captured_queries) == 3
+        assert [entry.subject_code for entry in saved[:2]] == ['CS000', 'CS001']
+        assert saved[0].student_name == "Unknown"
+    
+    def test_reupload_updates_in_place(self):
+        """Test saving a transcript again upserts instead of appending"""
+        first = TorService.save_tor_entries("BULK005", "Juan", "School", make_entries(10))
+        
+        entries = make_entries(10)
+        entries[0]['final_grade'] = 2.0
+        with CaptureQueriesContext(connection) as queries:
+            second = TorService.save_tor_entries("BULK005", "Juan D.", "School", entries)
+        
+        assert count_inserts(queries.captured_queries) == 1
+        assert [entry.pk for entry in second] == [entry.pk for entry in first]
+        assert TorTransferee.objects.filter(account_id="BULK005").count() == 10
+        
+        updated = TorTransferee.objects.get(pk=first[0].pk)
+        assert updated.final_grade == 2.0
+        assert updated.student_name == "Juan D."
+        assert updated.created_at == first[0].created_at
+    
+    def test_repeated_keys_in_one_upload_collapse(self):
+        """Test rows sharing a key within one save keep the last reading"""
+        entries = make_entries(2) + [dict(make_entries(1)[0], final_grade=3.0)]
+        
+        saved = TorService.save_tor_entries("BULK006", "Juan", "School", entries)
+        
+        assert len(saved) == 2
+        assert TorTransferee.objects.get(
+            account_id="BULK006", subject_code='CS000'
+        ).final_grade == 3.0
+    
+    def test_undated_retakes_are_kept_apart(self):
+        """Test entries without a year or semester never merge into one row"""
+        entries = [
+            dict(make_entries(1)[0], school_year_offered='', final_grade=5.0),
+            dict(make_entries(1)[0], school_year_offered='', final_grade=2.0),
+            dict(make_entries(1)[0], semester='Unknown', final_grade=1.75),
+        ]
+        
+        saved = TorService.save_tor_entries("BULK007", "Juan", "School", entries)
+        
+        assert [entry.final_grade for entry in saved] == [5.0, 2.0, 1.75]
+        assert TorTransferee.objects.filter(
+            account_id="BULK007", subject_code='CS000', dated__isnull=True
+        ).count() == 3
+        
+        # Without a year they cannot be matched, so a re-upload appends them
+        TorService.save_tor_entries("BULK007", "Juan", "School", entries[:1])
+        assert TorTransferee.objects.filter(account_id="BULK007").count() == 4
+    
+    def test_duplicate_takings_are_archived_by_migration(self):
+        """Test migration 0007 copies the rows it removes to an archive table"""
+        import importlib
+        from django.apps import apps
+        
+        migration = importlib.import_module(
+            'torchecker.migrations.0007_unique_tor_transferee_subject'
+        )
+        constraint = TorTransferee._meta.constraints[0]
+        with connection.schema_editor() as schema_editor:
+            schema_editor.remove_constraint(TorTransferee, constraint)
+        
+        older, newer = (
+            TorTransferee.objects.create(
+                account_id="BULK008", student_name="Juan", school_name="School",
+                subject_code='CS000', subject_description='Subject',
+                semester='first', school_year_offered='2023-2024',
+                total_academic_units=3.0, final_grade=grade
+            )
+            for grade in (3.0, 1.5)
+        )
+        undated = [
+            TorTransferee.objects.create(
+                account_id="BULK008", student_name="Juan", school_name="School",
+                subject_code='CS001', subject_description='Subject',
+                semester='first', school_year_offered='',
+                total_academic_units=3.0, final_grade=grade
+            )
+            for grade in (5.0, 2.0)
+        ]
+        
+        with connection.schema_editor() as schema_editor:
+            migration.archive_duplicate_entries(apps, schema_editor)
+        
+        remaining = set(TorTransferee.objects.filter(account_id="BULK008").values_list('id', flat=True))
+        assert remaining == {newer.id, undated[0].id, undated[1].id}
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id, final_grade FROM "{migration.ARCHIVE_TABLE}"')
+            assert cursor.fetchall() == [(older.id, 3.0)]
+    
+    def test_migration_backfill_matches_save(self):
+        """Test migration 0007 flags whitespace-only dates as undated, like save()"""
+        import importlib
+        from django.apps import apps
+        
+        migration = importlib.import_module(
+            'torchecker.migrations.0007_unique_tor_transferee_subject'
+        )
+        saved = TorService.save_tor_entries("BULK009", "Juan", "School", [
+            dict(make_entries(1)[0], school_year_offered=' '),
+            dict(make_entries(1)[0], semester=' Unknown '),
+            make_entries(2)[1],
+        ])
+        expected = {entry.pk: entry.dated for entry in saved}
+        TorTransferee._base_manager.filter(account_id="BULK009").update(dated=True)
+        
+        migration.mark_dated_entries(apps, None)
+        
+        assert dict(
+            TorTransferee.objects.filter(account_id="BULK009").values_list('pk', 'dated')
+        ) == expected == {saved[0].pk: None, saved[1].pk: None, saved[2].pk: True}
+    
+    def test_bulk_writes_keep_dated_in_sync(self):
+        """Test update() and bulk_update() recompute dated like save()"""
+        entries = [
+            dict(make_entries(1)[0], school_year_offered='2022-2023'),
+            dict(make_entries(1)[0], school_year_offered='2023-2024'),
+        ]
+        first, second = TorService.save_tor_entries("BULK010", "Juan", "School", entries)
+        
+        # Both become undated retakes instead of colliding on one key
+        TorTransferee.objects.filter(account_id="BULK010").update(school_year_offered='')
+        assert list(
+            TorTransferee.objects.filter(account_id="BULK010").values_list('dated', flat=True)
+        ) == [None, None]
+        
+        first.school_year_offered = '2022-2023'
+        TorTransferee.objects.bulk_update([first], ['school_year_offered'])
+        first.refresh_from_db()
+        assert first.dated is True
+    
+    def test_invalid_row_writes_nothing(self):
+        """Test all rows are validated before any is inserted"""
+        entries = make_entries(3)
+        entries[2]['final_grade'] = 'A+'
+        
+        with CaptureQueriesContext(connection) as queries:
+            with pytest.raises(ValidationException, match='Entry 3: final_grade'):
+                TorService.save_tor_entries("BULK003", "Juan", "School", entries)
+        
+        assert count_inserts(queries.captured_queries) == 0
+        assert not TorTransferee.objects.filter(account_id="BULK003").exists()
+    
+    def test_overlong_text_is_rejected(self):
+        """Test values longer than their column fail validation"""
+        entries = make_entries(1)
+        entries[0]['subject_code'] = 'X' * 51
+        
+        with pytest.raises(ValidationException) as error:
+            TorService.save_tor_entries("BULK004", "Juan", "School", entries)
+        
+        assert error.value.field == 'subject_code'
+
+
+@pytest.mark.django_db
+class TestStudentSummaries:
+    """Test the maintained per-account student summaries"""
+    
+    def summaries(self, account_id):
+        return list(
+            TorStudentSummary.objects.filter(account_id=account_id)
+            .order_by('student_name')
+            .values_list('student_name', 'school_name', 'entry_count')
+        )
+    
+    def test_saving_entries_updates_summary(self):
+        """Test summaries follow saves without touching other accounts"""
+        TorService.save_tor_entries("SUM001", "Juan", "School", make_entries(3))
+        TorService.save_tor_entries("SUM002", "Maria", "College", make_entries(2))
+        first = TorStudentSummary.objects.get(account_id="SUM001")
+        
+        entries = make_entries(4)
+        with CaptureQueriesContext(connection) as queries:
+            TorService.save_tor_entries("SUM001", "Juan", "School", entries)
+        
+        # One aggregate over the account, one upsert, one stale-row delete
+        summary_queries = [
+            query for query in queries.captured_queries
+            if 'tor_student_summary' in query['sql'] or 'GROUP BY' in query['sql']
+        ]
+        assert len(summary_queries) == 3
+        assert self.summaries("SUM001") == [("Juan", "School", 4)]
+        assert TorStudentSummary.objects.get(account_id="SUM001").pk == first.pk
+        assert self.summaries("SUM002") == [("Maria", "College", 2)]
+    
+    def test_renamed_and_deleted_entries_drop_stale_rows(self):
+        """Test names no longer present and deleted accounts disappear"""
+        TorService.save_tor_entries("SUM003", None, None, make_entries(2))
+        TorService.save_tor_entries("SUM003", "Juan Dela Cruz", "School", make_entries(2))
+        
+        assert self.summaries("SUM003") == [("Juan Dela Cruz", "School", 2)]
+        
+        TorService.delete_tor_entries("SUM003")
+        
+        assert self.summaries("SUM003") == []
+    
+    def test_reparse_keeps_summary_current(self):
+        """Test replacing a page's entries refreshes the summary"""
+        document = TorDocument.objects.create(account_id="SUM004", file=make_upload("p.jpg"))
+        page = TorService.save_document_page(document, 1, make_boxes([["x"]]), "0")
+        TorService.save_tor_entries("SUM004", "Juan", "School", make_entries(3), page)
+        
+        TorService.replace_page_entries(page, [], None, None, "1")
+        
+        assert self.summaries("SUM004") == []
+    
+    def test_filter_student_summaries_search(self):
+        """Test search matches names and whole account IDs"""
+        TorService.save_tor_entries("SUM005", "Juan Dela Cruz", "Previous University", make_entries(1))
+        TorService.save_tor_entries("SUM006", "Maria Clara", "Other College", make_entries(1))
+        
+        def search(term):
+            return sorted(
+                TorService.filter_student_summaries(term).values_list('account_id', flat=True)
+            )
+        
+        assert search("dela") == ["SUM005"]
+        assert search("college") == ["SUM006"]
+        assert search("SUM006") == ["SUM006"]
+
+
+@pytest.mark.django_db
+class TestTorStatistics:
+    """Test TOR statistics aggregation"""
+    
+    def make_account(self, account_id, remarks):
+        entries = make_entries(len(remarks))
+        for entry, remark, grade in zip(entries, remarks, (1.0, 2.0, 3.0, 5.0)):
+            entry.update(remarks=remark, final_grade=grade)
+        TorService.save_tor_entries(account_id, "Juan", "School", entries)
+    
+    def test_statistics_take_one_query(self, django_assert_num_queries):
+        """Test all statistics come from a single aggregate query"""
+        self.make_account("STATS001", ['PASSED', 'passed', 'Failed', None])
+        
+        with django_assert_num_queries(1):
+            stats = TorService.get_tor_statistics("STATS001")
+        
+        assert stats == {
+            'total_subjects': 4,
+            'total_units': 12.0,
+            'average_grade': 2.75,
+            'passed': 2,
+            'failed': 1,
+        }
+    
+    def test_statistics_of_account_without_entries(self):
+        """Test an unknown account gets zeroed statistics"""
+        assert TorService.get_tor_statistics("STATS000") == {
+            'total_subjects': 0,
+            'total_units': 0,
+            'average_grade': 0,
+            'passed': 0,
+            'failed': 0,
+        }
+    
+    def test_bulk_statistics_take_one_query(self, django_assert_num_queries):
+        """Test many accounts are aggregated together and match single calls"""
+        self.make_account("STATS002", ['PASSED', 'FAILED'])
+        self.make_account("STATS003", ['PASSED', 'PASSED', 'PASSED'])
+        
+        with django_assert_num_queries(1):
+            stats = TorService.get_tor_statistics_bulk(
+                ["STATS002", "STATS003", "STATS000"]
+            )
+        
+        assert list(stats) == ["STATS002", "STATS003", "STATS000"]
+        assert stats["STATS002"] == TorService.get_tor_statistics("STATS002")
+        assert stats["STATS003"]['passed'] == 3
+        assert stats["STATS000"]['total_subjects'] == 0
+    
+    def test_bulk_statistics_limit(self, monkeypatch):
+        """Test requesting too many accounts is rejected"""
+        monkeypatch.setattr(TorService, 'MAX_STATISTICS_ACCOUNTS', 2)
+        
+        with pytest.raises(ValidationException):
+            TorService.get_tor_statistics_bulk(["A", "B", "C"])
+
+
+@pytest.mark.django_db
+class TestOcrJobService:
+    """Test OcrJobService"""
+    
+    def test_enqueue_stores_pages(self):
+        """Test enqueue stores each page and queues the job"""
+        job = OcrJobService.enqueue(
+            "JOB001",
+            [make_upload("page1.jpg"), make_upload("page2.jpg")]
+        )
+        
+        assert job.status == OcrJob.Status.QUEUED
+        assert job.total_pages == 2
+        assert list(job.pages.values_list('page_number', flat=True)) == [1, 2]
+    
+    def test_failed_enqueue_removes_stored_files(self, settings, monkeypatch):
+        """Test files stored before a failure do not outlive the rolled-back rows"""
+        create = OcrJobPage.objects.create
+        calls = []
+        
+        def fail_second_page(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return create(**kwargs)
+        
+        monkeypatch.setattr(OcrJobPage.objects, 'create', fail_second_page)
+        
+        with pytest.raises(RuntimeError):
+            OcrJobService.enqueue(
+                "JOB010",
+                [make_upload("page1.jpg"), make_upload("page2.jpg")]
+            )
+        
+        assert not TorDocument.objects.filter(account_id="JOB010").exists()
+        assert [path for path in settings.MEDIA_ROOT.rglob('*') if path.is_file()] == []
+    
+    def test_claim_next_job(self):
+        """Test claiming marks the oldest queued job as running"""
+        job = OcrJobService.enqueue("JOB002", [make_upload("page1.jpg")])
+        
+        claimed = OcrJobService.claim_next_job()
+        
+        assert claimed.pk == job.pk
+        assert claimed.status == OcrJob.Status.RUNNING
+        assert OcrJobService.claim_next_job() is None
+    
+    def test_run_job_saves_entries_and_isolates_failures(self):
+        """Test a failed page does not stop the rest of the job"""
+        job = OcrJobService.enqueue(
+            "JOB003",
+            [make_upload("page1.jpg"), make_upload("page2.jpg")]
+        )
+        ocr_service = FakeOCRService([
+            BusinessLogicException("Failed to process image: blurry"),
+            {
+                'file_name': 'page2.jpg',
+                'student_name': 'Juan Dela Cruz',
+                'school_name': 'Previous University',
+                'entries': [{
+                    'subject_code': 'CS101',
+                    'subject_description': 'Intro to Computing',
+                    'semester': 'first',
+                    'total_academic_units': 3.0,
+                    'final_grade': 1.5,
+                }],
+            },
+        ])
+        
+        job = OcrJobService.run_job(OcrJobService.claim_next_job(), ocr_service)
+        
+        assert job.status == OcrJob.Status.COMPLETED
+        assert job.processed_pages == 2
+        assert job.result['student_name'] == 'Juan Dela Cruz'
+        assert len(job.result['ocr_results']) == 1
+        assert job.result['failed_pages'][0]['page_number'] == 1
+        assert TorTransferee.objects.filter(account_id="JOB003").count() == 1
+        
+        statuses = list(job.pages.values_list('status', flat=True))
+        assert statuses == [OcrJobPage.Status.FAILED, OcrJobPage.Status.DONE]
+    
+    def test_jobs_without_heartbeat_are_requeued(self):
+        """Test only jobs whose heartbeat expired go back on the queue"""
+        stale = OcrJobService.enqueue("JOB006", [make_upload("page1.jpg")])
+        OcrJobService.claim_next_job()
+        live = OcrJobService.enqueue("JOB007", [make_upload("page1.jpg")])
+        OcrJobService.claim_next_job()
+        
+        OcrJob.objects.filter(pk=stale.pk).update(
+            heartbeat_at=timezone.now() - timedelta(minutes=10)
+        )
+        OcrJobPage.objects.filter(job=stale).update(status=OcrJobPage.Status.PROCESSING)
+        
+        assert OcrJobService.requeue_stale_jobs(300) == 1
+        
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        assert stale.status == OcrJob.Status.QUEUED
+        assert stale.pages.get().status == OcrJobPage.Status.PENDING
+        assert live.status == OcrJob.Status.RUNNING
+    
+    def test_resumed_job_reports_all_pages(self):
+        """Test a re-run job includes pages done earlier and recounts pages"""
+        def page_result(name, code, student_name=None):
+            return {
+                'file_name': name,
+                'student_name': student_name,
+                'school_name': None,
+                'entries': [{
+                    'subject_code': code,
+                    'total_academic_units': 3.0,
+                    'final_grade': 1.5,
+                }],
+            }
+        
+        job = OcrJobService.enqueue(
+            "JOB008",
+            [make_upload("page1.jpg"), make_upload("page2.jpg")]
+        )
+        
+        # An unexpected error fails only its page
+        job = OcrJobService.run_job(OcrJobService.claim_next_job(), FakeOCRService([
+            page_result('page1.jpg', 'CS101', 'Juan Dela Cruz'),
+            RuntimeError("corrupt page"),
+        ]))
+        
+        assert job.status == OcrJob.Status.COMPLETED
+        assert job.processed_pages == 2
+        assert job.result['failed_pages'][0]['page_number'] == 2
+        
+        # Re-run the failed page as a requeued job would
+        job.pages.filter(page_number=2).update(status=OcrJobPage.Status.PENDING)
+        OcrJob.objects.filter(pk=job.pk).update(status=OcrJob.Status.QUEUED)
+        job = OcrJobService.run_job(OcrJobService.claim_next_job(), FakeOCRService([
+            page_result('page2.jpg', 'CS102'),
+        ]))
+        
+        assert job.processed_pages == 2
+        assert job.result['student_name'] == 'Juan Dela Cruz'
+        assert [e['subject_code'] for e in job.result['ocr_results']] == ['CS101', 'CS102']
+        assert job.result['failed_pages'] == []
+        assert TorTransferee.objects.get(
+            account_id="JOB008", subject_code='CS102'
+        ).student_name == 'Juan Dela Cruz'
+    
+    def test_pdf_is_stored_once_and_queued_per_page(self):
+        """Test a PDF upload becomes one job page per PDF page"""
+        job = OcrJobService.enqueue(
+            "JOB004",
+            [make_upload("cover.jpg"), make_pdf_upload("tor.pdf", 2)]
+        )
+        
+        pages = list(job.pages.order_by('page_number'))
+        assert job.total_pages == 3
+        assert [page.source_page for page in pages] == [None, 1, 2]
+        assert pages[1].document_id == pages[2].document_id
+        assert pages[0].document_id != pages[1].document_id
+        
+        ocr_service = FakeOCRService([
+            {'file_name': name, 'student_name': None, 'school_name': None, 'entries': []}
+            for name in ('cover.jpg', 'tor.pdf', 'tor.pdf')
+        ])
+        job = OcrJobService.run_job(OcrJobService.claim_next_job(), ocr_service)
+        
+        assert job.status == OcrJob.Status.COMPLETED
+        assert job.processed_pages == 3
+    
+    def test_get_job_status_not_found(self):
+        """Test unknown job id"""
+        with pytest.raises(ResourceNotFoundException):
+            OcrJobService.get_job_status("00000000-0000-0000-0000-000000000000")
+
+
+@pytest.mark.django_db
+class TestReparseTorDocuments:
+    """Test stored OCR boxes and the reparse_tor_documents command"""
+    
+    def make_page(self, account_id, rows, parser_version='0'):
+        """Store a document page whose entries came from an old parser"""
+        document = TorDocument.objects.create(
+            account_id=account_id,
+            file=make_upload("page1.jpg")
+        )
+        page = TorService.save_document_page(document, None, make_boxes(rows), parser_version)
+        TorService.save_tor_entries(
+            account_id=account_id,
+            student_name="Juan Dela Cruz",
+            school_name="Previous University",
+            entries=[{'subject_code': 'OLD1', 'subject_description': 'Misread'}],
+            source_page=page
+        )
+        return page
+    
+    def test_run_job_stores_boxes_and_links_entries(self):
+        """Test a job page keeps its raw boxes next to its entries"""
+        OcrJobService.enqueue("JOB005", [make_upload("page1.jpg")])
+        boxes = make_boxes([["CS101", "Intro to Computing", "3", "1.5"]])
+        ocr_service = FakeOCRService([{
+            'file_name': 'page1.jpg',
+            'student_name': None,
+            'school_name': None,
+            'entries': [{'subject_code': 'CS101', 'subject_description': 'Intro to Computing'}],
+            'boxes': boxes,
+        }])
+        
+        OcrJobService.run_job(OcrJobService.claim_next_job(), ocr_service)
+        
+        page = TorDocumentPage.objects.get(document__account_id="JOB005")
+        assert page.page_number == 1
+        assert page.box_count == 4
+        assert page.parser_version == OCRService.PARSER_VERSION
+        assert list(page.entries.values_list('subject_code', flat=True)) == ['CS101']
+    
+    def test_reparse_replaces_page_entries(self):
+        """Test stale pages are re-parsed and their entries replaced"""
+        page = self.make_page("REPARSE001", [
+            ["CS101", "Intro to Computing", "3", "1.5", "Passed"],
+            ["MATH1", "Algebra", "3", "2.0"],
+        ])
+        other = self.make_page("REPARSE002", [["ENG1", "Communication", "3", "1.0"]])
+        
+        call_command('reparse_tor_documents', account_id="REPARSE001", workers=1)
+        
+        page.refresh_from_db()
+        entries = list(page.entries.order_by('subject_code'))
+        assert [e.subject_code for e in entries] == ['CS101', 'MATH1']
+        assert entries[0].final_grade == 1.5
+        assert entries[0].remarks == 'Passed'
+        assert entries[0].student_name == "Juan Dela Cruz"
+        assert page.parser_version == OCRService.PARSER_VERSION
+        
+        # Other accounts are left alone
+        assert list(other.entries.values_list('subject_code', flat=True)) == ['OLD1']
+    
+    def test_reparse_skips_current_pages_unless_forced(self):
+        """Test pages parsed by the current parser are only redone with --force"""
+        page = self.make_page(
+            "REPARSE003", [["CS101", "Intro to Computing", "3", "1.5"]],
+            parser_version=OCRService.PARSER_VERSION
+        )
+        
+        out = io.StringIO()
+        call_command('reparse_tor_documents', workers=1, stdout=out)
+        assert 'No pages to re-parse' in out.getvalue()
+        assert page.entries.get().subject_code == 'OLD1'
+        
+        call_command('reparse_tor_documents', workers=1, force=True, dry_run=True, stdout=out)
+        assert page.entries.get().subject_code == 'OLD1'
+        
+        call_command('reparse_tor_documents', workers=1, force=True, stdout=io.StringIO())
+        assert page.entries.get().subject_code == 'CS101'
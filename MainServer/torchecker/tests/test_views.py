@@ -0,0 +1,399 @@
+"""Tests for torchecker API views"""
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from torchecker.models import OcrJob
+
+
+@pytest.fixture
+def api_client():
+    """Provide API client"""
+    return APIClient()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Store uploaded files in a temporary directory"""
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.mark.django_db
+class TestOcrJobAPI:
+    """Test asynchronous OCR job endpoints"""
+    
+    def test_async_upload_returns_job(self, api_client):
+        """Test async upload queues a job and returns its id"""
+        url = reverse('torchecker:ocr')
+        response = api_client.post(url, {
+            'account_id': 'ASYNC001',
+            'async': 'true',
+            'images': [SimpleUploadedFile('page1.jpg', b'fake image bytes')],
+        }, format='multipart')
+        
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job = OcrJob.objects.get(pk=response.data['data']['job_id'])
+        assert job.status == OcrJob.Status.QUEUED
+        assert job.total_pages == 1
+    
+    def test_job_status(self, api_client):
+        """Test polling job progress"""
+        job = OcrJob.objects.create(account_id='ASYNC002', total_pages=3)
+        
+        url = reverse('torchecker:ocr_job_status', args=[job.id])
+        response = api_client.get(url)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['data']['status'] == OcrJob.Status.QUEUED
+        assert response.data['data']['total_pages'] == 3
+        assert response.data['data']['result'] is None
+
+
+class StreamingOCRService:
+    """OCR service stand-in yielding one good and one failed page"""
+    
+    def ensure_available(self):
+        pass
+    
+    def count_pages(self, images):
+        return len(images)
+    
+    def iter_process_images(self, images):
+        yield {
+            'file_name': images[0].name,
+            'student_name': 'Juan Dela Cruz',
+            'school_name': 'Previous University',
+            'entries': [{
+                'subject_code': 'CS101',
+                'subject_description': 'Programming',
+                'total_academic_units': 3.0,
+                'final_grade': 1.5,
+                'remarks': 'Passed',
+            }],
+            'cached': False,
+        }
+        yield {
+            'file_name': images[1].name,
+            'student_name': None,
+            'school_name': None,
+            'entries': [],
+            'error': 'page2.jpg is not a readable image',
+        }
+
+
+class UploadOCRService:
+    """OCR service stand-in returning two pages with entries"""
+    
+    PARSER_VERSION = '1'
+    
+    def process_images(self, images, account_id=None):
+        return [
+            {
+                'file_name': image.name,
+                'student_name': 'Juan Dela Cruz',
+                'school_name': 'Previous University',
+                'entries': [
+                    {
+                        'subject_code': f'CS{page}{row}',
+                        'subject_description': 'Programming',
+                        'total_academic_units': 3.0,
+                        'final_grade': 1.5,
+                    }
+                    for row in range(3)
+                ],
+            }
+            for page, image in enumerate(images, start=1)
+        ]
+
+
+@pytest.mark.django_db
+class TestOcrUploadAPI:
+    """Test the synchronous OCR endpoint"""
+    
+    def test_upload_entries_are_inserted_together(self, api_client, monkeypatch):
+        """Test the entries of all pages are saved with one INSERT"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from torchecker import views
+        from torchecker.models import TorTransferee
+        
+        monkeypatch.setattr(views, 'OCRService', UploadOCRService)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(reverse('torchecker:ocr'), {
+                'account_id': 'UPLOAD001',
+                'images': [
+                    SimpleUploadedFile('page1.jpg', b'first'),
+                    SimpleUploadedFile('page2.jpg', b'second'),
+                ],
+            }, format='multipart')
+        
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['data']['ocr_results']
+        assert [entry['subject_code'] for entry in results] == [
+            'CS10', 'CS11', 'CS12', 'CS20', 'CS21', 'CS22'
+        ]
+        assert all(entry['id'] for entry in results)
+        
+        entry_inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "tor_transferee"')
+        ]
+        assert len(entry_inserts) == 1
+        assert TorTransferee.objects.filter(account_id='UPLOAD001').count() == 6
+    
+    def test_demo_returns_only_extracted_fields(self, api_client, monkeypatch):
+        """Test the demo payload leaves out boxes, preprocessing and timings"""
+        from torchecker import views
+        from torchecker.models import TorTransferee
+        
+        class DebugOCRService(UploadOCRService):
+            def process_images(self, images, account_id=None):
+                results = super().process_images(images, account_id)
+                for result in results:
+                    result.update({
+                        'boxes': [[[[0, 0], [1, 0], [1, 1], [0, 1]], 'CS10', 0.9]],
+                        'preprocessing': {'scale': 0.5},
+                        'timings_ms': {'detect': 12.0},
+                    })
+                return results
+        
+        monkeypatch.setattr(views, 'OCRService', DebugOCRService)
+        
+        response = api_client.post(reverse('torchecker:demo_ocr'), {
+            'images': [SimpleUploadedFile('page1.jpg', b'first')],
+        }, format='multipart')
+        
+        assert response.status_code == status.HTTP_200_OK
+        result = response.data['data']['results'][0]
+        assert set(result) == {'file_name', 'student_name', 'school_name', 'entries'}
+        assert len(result['entries']) == 3
+        assert TorTransferee.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestTorStatisticsAPI:
+    """Test the TOR statistics endpoint"""
+    
+    def test_statistics_for_many_accounts(self, api_client):
+        """Test account_ids returns statistics keyed by account"""
+        from torchecker.services.tor_service import TorService
+        
+        TorService.save_tor_entries('STATSAPI1', 'Juan', 'School', [{
+            'subject_code': 'CS101',
+            'total_academic_units': 3.0,
+            'final_grade': 1.5,
+            'remarks': 'PASSED',
+        }])
+        
+        response = api_client.get(
+            reverse('torchecker:tor_statistics'),
+            {'account_ids': 'STATSAPI1,STATSAPI2'}
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.data['data']
+        assert data['STATSAPI1']['passed'] == 1
+        assert data['STATSAPI2']['total_subjects'] == 0
+
+
+@pytest.mark.django_db
+class TestTorTransfereeListAPI:
+    """Test keyset-paginated TOR entry listings"""
+    
+    @pytest.fixture
+    def entries(self):
+        from torchecker.services.tor_service import TorService
+        
+        for account_id in ('LIST001', 'LIST002'):
+            TorService.save_tor_entries(account_id, 'Juan', 'School', [
+                {
+                    'subject_code': f'CS{number}',
+                    'total_academic_units': 3.0,
+                    'final_grade': 1.5,
+                    'remarks': 'PASSED',
+                }
+                for number in (3, 1, 2)
+            ])
+    
+    @pytest.mark.parametrize('url_name', ['torchecker:transferees-list', 'torchecker:tor_transferee_list'])
+    def test_cursor_walks_all_entries_in_order(self, api_client, entries, url_name):
+        """Test following next_cursor visits every entry once, in order"""
+        seen = []
+        params = {'page_size': 4}
+        
+        while True:
+            response = api_client.get(reverse(url_name), params)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(
+                (entry['account_id'], entry['subject_code'])
+                for entry in response.data['results']
+            )
+            if response.data['next_cursor'] is None:
+                break
+            params['cursor'] = response.data['next_cursor']
+        
+        assert seen == [
+            (account_id, f'CS{number}')
+            for account_id in ('LIST001', 'LIST002')
+            for number in (1, 2, 3)
+        ]
+    
+    def test_fields_limit_columns_and_queries(self, api_client, entries, django_assert_num_queries):
+        """Test fields= serializes only the requested fields in one query"""
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('torchecker:tor_transferee_list'), {
+                'account_id': 'LIST002',
+                'fields': 'subject_code,display_grade',
+            })
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0] == {
+            'subject_code': 'CS1',
+            'display_grade': '1.5 (PASSED)',
+        }
+    
+    def test_unique_pages_through_student_summaries(self, api_client, entries):
+        """Test unique=true pages and searches the student summaries"""
+        url = reverse('torchecker:transferees-list')
+        
+        first = api_client.get(url, {'unique': 'true', 'page_size': 1})
+        second = api_client.get(url, {
+            'unique': 'true', 'page_size': 1, 'cursor': first.data['next_cursor']
+        })
+        searched = api_client.get(url, {'unique': 'true', 'search': 'LIST002'})
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert first.data['results'][0]['account_id'] == 'LIST001'
+        assert first.data['results'][0]['entry_count'] == 3
+        assert second.data['results'][0]['account_id'] == 'LIST002'
+        assert second.data['next_cursor'] is None
+        assert [r['account_id'] for r in searched.data['results']] == ['LIST002']
+    
+    def test_invalid_parameters_are_rejected(self, api_client, entries):
+        """Test unknown fields and malformed cursors return 400"""
+        url = reverse('torchecker:transferees-list')
+        
+        assert api_client.get(url, {'fields': 'password'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'cursor': 'not-a-cursor'}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestOcrStreamAPI:
+    """Test the streaming OCR endpoint"""
+    
+    def test_streams_page_events_then_summary(self, api_client, monkeypatch):
+        """Test each page is streamed as NDJSON and a summary closes it"""
+        import json
+        from torchecker import views
+        from torchecker.models import TorTransferee
+        
+        monkeypatch.setattr(views, 'OCRService', StreamingOCRService)
+        
+        response = api_client.post(reverse('torchecker:ocr_stream'), {
+            'account_id': 'STREAM001',
+            'images': [
+                SimpleUploadedFile('page1.jpg', b'first'),
+                SimpleUploadedFile('page2.jpg', b'second'),
+            ],
+        }, format='multipart')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        events = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        
+        assert [e['event'] for e in events] == ['page', 'error', 'summary']
+        assert events[0]['ocr_results'][0]['subject_code'] == 'CS101'
+        assert events[1]['page'] == 2
+        assert events[2]['student_name'] == 'Juan Dela Cruz'
+        assert events[2]['total_entries'] == 1
+        assert events[2]['failed_pages'][0]['file_name'] == 'page2.jpg'
+        assert 'school_tor' in events[2]
+        assert TorTransferee.objects.filter(account_id='STREAM001').count() == 1
+    
+    def test_requires_account_id(self, api_client):
+        """Test validation errors are returned before streaming starts"""
+        response = api_client.post(reverse('torchecker:ocr_stream'), {
+            'images': [SimpleUploadedFile('page1.jpg', b'first')],
+        }, format='multipart')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_failed_pdf_page_is_reported_with_its_page_number(self, api_client, monkeypatch):
+        """Test the streamed failure and summary match ocr_view's failed_pages"""
+        import json
+        from torchecker import views
+        
+        class FailingPdfOCRService(StreamingOCRService):
+            def iter_process_images(self, images):
+                yield {
+                    'file_name': images[0].name,
+                    'page_number': 3,
+                    'student_name': None,
+                    'school_name': None,
+                    'entries': [],
+                    'error': 'Page 3 could not be rendered',
+                }
+        
+        monkeypatch.setattr(views, 'OCRService', FailingPdfOCRService)
+        
+        response = api_client.post(reverse('torchecker:ocr_stream'), {
+            'account_id': 'STREAM003',
+            'images': [SimpleUploadedFile('tor.pdf', b'%PDF-1.4')],
+        }, format='multipart')
+        events = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        
+        failed = {
+            'file_name': 'tor.pdf',
+            'page_number': 3,
+            'error': 'Page 3 could not be rendered',
+        }
+        assert events[0] == {'event': 'error', 'page': 1, **failed}
+        assert events[-1]['failed_pages'] == [failed]
+
+
+@pytest.mark.django_db
+class TestOcrInstrumentationAPI:
+    """Test OCR timing exposure"""
+    
+    def test_metrics_endpoint_exports_histograms(self, api_client):
+        """Test stage histograms are served in Prometheus text format"""
+        from torchecker.ocr.instrumentation import StageTimings
+        
+        StageTimings().add('decode', 0.02)
+        
+        response = api_client.get(reverse('torchecker:ocr_metrics'))
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/plain')
+        assert b'ocr_stage_seconds_bucket{stage="decode"' in response.content
+    
+    def test_stream_attaches_timings_in_debug_mode(self, api_client, monkeypatch, settings):
+        """Test page events carry stage timings when exposed"""
+        import json
+        from torchecker import views
+        
+        settings.OCR_EXPOSE_TIMINGS = True
+        monkeypatch.setattr(views, 'OCRService', StreamingOCRService)
+        
+        response = api_client.post(reverse('torchecker:ocr_stream'), {
+            'account_id': 'STREAM002',
+            'images': [
+                SimpleUploadedFile('page1.jpg', b'first'),
+                SimpleUploadedFile('page2.jpg', b'second'),
+            ],
+        }, format='multipart')
+        events = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        
+        assert 'db_save' in events[0]['timings_ms']
+        assert 'spooling' in events[-1]['timings_ms']['request']
@@ -15,8 +15,12 @@ urlpatterns = [
     
     # OCR endpoints
     path('ocr/', views.ocr_view, name='ocr'),
+    path('ocr/stream/', views.ocr_stream_view, name='ocr_stream'),
     path('demo-ocr/', views.demo_ocr_view, name='demo_ocr'),
     path('ocr/delete/', views.delete_ocr_entries, name='delete_ocr'),
+    path('ocr/pool/', views.ocr_pool_stats, name='ocr_pool_stats'),
+    path('ocr/metrics/', views.ocr_metrics, name='ocr_metrics'),
+    path('ocr/jobs/<uuid:job_id>/', views.ocr_job_status, name='ocr_job_status'),
     
     # TOR endpoints
     path('tor-transferees/', views.tor_transferee_list, name='tor_transferee_list'),
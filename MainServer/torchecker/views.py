@@ -2,27 +2,74 @@
 API views for TOR checking and OCR processing.
 Views are thin - business logic is in services.
 """
+import json
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status, viewsets
 from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from core.metrics import PROMETHEUS_CONTENT_TYPE, registry as metrics_registry
+from core.pagination import KeysetPagination
 from core.responses import APIResponse
 from core.exceptions import ServiceException
 from core.decorators import handle_service_exceptions
 from .services.ocr_service import OCRService
 from .services.tor_service import TorService
-from .serializers import TorTransfereeSerializer, UniqueStudentSerializer
+from .services.ocr_job_service import OcrJobService
+from .ocr.instrumentation import StageTimings
+from .ocr.reader_pool import EASYOCR_AVAILABLE, get_reader_pool
+from .ocr.sidecar import SidecarClient
+from .serializers import StudentSummarySerializer, TorTransfereeSerializer
 from .models import TorTransferee, TorDocument
-from curriculum.models import CitTorContent
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Page result keys returned by the demo endpoint. Raw boxes, preprocessing
+# details and stage timings stay internal (timings are on /api/ocr/metrics/).
+DEMO_RESULT_FIELDS = (
+    'file_name', 'page_number', 'student_name', 'school_name',
+    'entries', 'cached', 'error',
+)
+
+
+class TorTransfereePagination(KeysetPagination):
+    """Keyset pages in the model's (account_id, subject_code) order"""
+    ordering = ('account_id', 'subject_code', 'id')
+
+
+def _paginate_transferees(request, queryset, paginator):
+    """
+    Serialize one keyset page of TOR entries.
+    
+    ``fields`` (comma-separated) limits both the serialized fields and the
+    columns loaded; the ordering columns are always loaded for the cursor.
+    """
+    fields = TorTransfereeSerializer.parse_fields(request.query_params.get('fields'))
+    
+    if fields:
+        columns = TorTransfereeSerializer.columns_for(fields)
+        queryset = queryset.only(*columns, *paginator.ordering)
+    
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = TorTransfereeSerializer(page, many=True, fields=fields)
+    
+    return paginator.get_paginated_response(serializer.data)
+
+
+class StudentSummaryPagination(KeysetPagination):
+    """Keyset pages of student summaries in name order"""
+    ordering = ('student_name', 'id')
+
 
 class TorTransfereeViewSet(viewsets.ModelViewSet):
     """ViewSet for TorTransferee CRUD operations"""
     
     serializer_class = TorTransfereeSerializer
+    pagination_class = TorTransfereePagination
     
     def get_queryset(self):
         """Get queryset with optional filtering"""
@@ -35,18 +82,134 @@ class TorTransfereeViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @handle_service_exceptions
     def list(self, request):
-        """List unique students or all entries"""
-        # If unique=true, return unique student/school combinations
+        """
+        List unique students or a page of entries.
+        
+        Entries are keyset-paginated: follow ``next`` (or pass
+        ``cursor=<next_cursor>``) for the following page. ``page_size``
+        sets the page length and ``fields`` the serialized fields.
+        
+        ``unique=true`` pages through student summaries (one per account,
+        student and school) instead, optionally filtered by ``search``.
+        """
+        # If unique=true, return a page of per-account student summaries
         if request.query_params.get('unique') == 'true':
-            unique_students = TorService.get_unique_students()
-            serializer = UniqueStudentSerializer(unique_students, many=True)
-            return APIResponse.success(serializer.data)
+            paginator = StudentSummaryPagination()
+            page = paginator.paginate_queryset(
+                TorService.filter_student_summaries(request.query_params.get('search')),
+                request
+            )
+            serializer = StudentSummarySerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         
-        # Otherwise return normal list
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return APIResponse.success(serializer.data)
+        # Otherwise return one keyset page of entries
+        return _paginate_transferees(request, self.get_queryset(), self.paginator)
+    
+    def perform_create(self, serializer):
+        """Save the entry and refresh its account's student summary"""
+        with transaction.atomic():
+            entry = serializer.save()
+            TorService.refresh_student_summaries([entry.account_id])
+    
+    def perform_update(self, serializer):
+        """Save the entry and refresh the summaries it moved between"""
+        previous_account_id = serializer.instance.account_id
+        with transaction.atomic():
+            entry = serializer.save()
+            TorService.refresh_student_summaries([previous_account_id, entry.account_id])
+    
+    def perform_destroy(self, instance):
+        """Delete the entry and refresh its account's student summary"""
+        with transaction.atomic():
+            instance.delete()
+            TorService.refresh_student_summaries([instance.account_id])
+
+
+def _expose_timings():
+    """Whether per-stage OCR timings are attached to responses"""
+    return settings.DEBUG or getattr(settings, 'OCR_EXPOSE_TIMINGS', False)
+
+
+def _failed_page(result):
+    """Entry of ``failed_pages`` for a page result with an ``error``"""
+    return {
+        "file_name": result.get('file_name'),
+        "page_number": result.get('page_number'),
+        "error": result['error'],
+    }
+
+
+def _store_page_document(account_id, result, files, documents):
+    """
+    Save one page's uploaded file and raw OCR boxes.
+    
+    ``documents`` maps the names of files already stored for this upload to
+    their TorDocument, so a PDF is stored once rather than once per page.
+    Storage failures are logged and leave the page without a document.
+    
+    Returns:
+        The page's TorDocumentPage, or None
+    """
+    # Save file to TorDocument along with the page's raw boxes, so the page
+    # can be re-parsed later without OCR
+    try:
+        # result['file_name'] matches the uploaded file name
+        original_file = next(
+            (f for f in files if f.name == result.get('file_name')), 
+            None
+        )
+        
+        if not original_file:
+            return None
+        
+        # A savepoint, so a failure does not abort an enclosing transaction
+        with transaction.atomic():
+            document = documents.get(original_file.name)
+            if document is None:
+                document = TorDocument.objects.create(
+                    account_id=account_id,
+                    file=original_file
+                )
+                documents[original_file.name] = document
+            
+            return TorService.save_document_page(
+                document,
+                result.get('page_number'),
+                result.get('boxes'),
+                OCRService.PARSER_VERSION
+            )
+    except Exception as e:
+        logger.error(f"Failed to save TorDocument: {e}")
+        return None
+
+
+def _save_page_result(account_id, result, files, student_name, school_name, documents):
+    """
+    Save one page's uploaded file, raw OCR boxes and extracted entries.
+    
+    The save is timed as the page's ``db_save`` stage.
+    
+    Returns:
+        The saved entries serialized for the response
+    """
+    timings = StageTimings()
+    with timings.stage('db_save'):
+        source_page = _store_page_document(account_id, result, files, documents)
+        
+        saved = []
+        if result.get('entries'):
+            saved = TorService.save_tor_entries(
+                account_id=account_id,
+                student_name=student_name,
+                school_name=school_name,
+                entries=result['entries'],
+                source_page=source_page
+            )
+    result.setdefault('timings_ms', {}).update(timings.as_ms())
+    
+    return TorService.serialize_saved_entries(saved)
 
 
 @api_view(['POST'])
@@ -59,8 +222,10 @@ def ocr_view(request):
     POST /api/ocr/
     
     Form Data:
-        - images: Multiple image files
+        - images: Multiple image files or multi-page PDFs
         - account_id: Student account ID
+        - async: "true" to queue the upload as an OCR job and return
+          immediately with its job_id (202); poll /api/ocr/jobs/<job_id>/
     
     Response:
         {
@@ -69,11 +234,17 @@ def ocr_view(request):
                 "student_name": "John Doe",
                 "school_name": "Previous University",
                 "ocr_results": [...],
-                "school_tor": [...]
+                "school_tor": [...],
+                "failed_pages": [...],
+                "timings_ms": {...}  (DEBUG or OCR_EXPOSE_TIMINGS only)
             }
         }
     """
-    files = request.FILES.getlist("images")
+    request_timings = StageTimings()
+    
+    # Accessing FILES parses (spools) the multipart upload
+    with request_timings.stage('spooling'):
+        files = request.FILES.getlist("images")
     account_id = request.data.get("account_id")
     
     if not files:
@@ -82,6 +253,14 @@ def ocr_view(request):
     if not account_id:
         return APIResponse.error("account_id is required")
     
+    if str(request.data.get("async", "")).lower() in ("true", "1"):
+        job = OcrJobService.enqueue(account_id, files)
+        return APIResponse.success({
+            "job_id": str(job.id),
+            "status": job.status,
+            "total_pages": job.total_pages,
+        }, message="OCR job queued", status_code=status.HTTP_202_ACCEPTED)
+    
     # Initialize OCR service
     ocr_service = OCRService()
     
@@ -91,67 +270,202 @@ def ocr_view(request):
     # Extract student info from first result
     student_name = None
     school_name = None
-    all_entries = []
-    
-    for result in all_results:
-        if not student_name and result.get('student_name'):
-            student_name = result['student_name']
-        if not school_name and result.get('school_name'):
-            school_name = result['school_name']
-        
-        # Save entries to database
-        if result.get('entries'):
-            saved = TorService.save_tor_entries(
-                account_id=account_id,
-                student_name=student_name or "Unknown",
-                school_name=school_name or "Unknown",
-                entries=result['entries']
-            )
+    rows = []
+    failed_pages = []
+    documents = {}
+    
+    # The whole upload is saved in one transaction: rows of every page are
+    # validated first and then inserted together
+    with request_timings.stage('db_save'), transaction.atomic():
+        for result in all_results:
+            if result.get('error'):
+                failed_pages.append(_failed_page(result))
+                continue
             
-            # Save file to TorDocument
-            try:
-                # We need the original file for this result
-                # result['file_name'] matches the uploaded file name
-                original_file = next(
-                    (f for f in files if f.name == result.get('file_name')), 
-                    None
-                )
-                
-                if original_file:
-                    TorDocument.objects.create(
-                        account_id=account_id,
-                        file=original_file
-                    )
-            except Exception as e:
-                logger.error(f"Failed to save TorDocument: {e}")
-
-            # Convert to dict for response
-            for entry in saved:
-                all_entries.append({
-                    "id": entry.id,
-                    "subject_code": entry.subject_code,
-                    "subject_description": entry.subject_description,
-                    "student_year": entry.student_year,
-                    "semester": entry.semester,
-                    "school_year_offered": entry.school_year_offered,
-                    "total_academic_units": entry.total_academic_units,
-                    "final_grade": entry.final_grade,
-                    "remarks": entry.remarks,
-                })
+            if not student_name and result.get('student_name'):
+                student_name = result['student_name']
+            if not school_name and result.get('school_name'):
+                school_name = result['school_name']
+            
+            source_page = _store_page_document(account_id, result, files, documents)
+            
+            if result.get('entries'):
+                rows.extend(TorService.build_tor_entries(
+                    account_id=account_id,
+                    student_name=student_name,
+                    school_name=school_name,
+                    entries=result['entries'],
+                    source_page=source_page
+                ))
+        
+        saved = TorService.bulk_save_tor_entries(rows)
+    
+    all_entries = TorService.serialize_saved_entries(saved)
     
     # Get school TOR for reference
-    school_tor = list(
-        CitTorContent.objects.filter(is_active=True).values(
-            "subject_code", "prerequisite", "description", "units"
-        )
-    )
+    school_tor = TorService.get_school_tor_reference()
     
-    return APIResponse.success({
+    data = {
         "student_name": student_name,
         "school_name": school_name,
         "ocr_results": all_entries,
         "school_tor": school_tor,
-    })
+        "failed_pages": failed_pages,
+    }
+    
+    if _expose_timings():
+        data["timings_ms"] = {
+            "request": request_timings.as_ms(),
+            "pages": [
+                {
+                    "file_name": result.get('file_name'),
+                    "page_number": result.get('page_number'),
+                    **result.get('timings_ms', {})
+                }
+                for result in all_results
+            ],
+        }
+    
+    return APIResponse.success(data)
+
+
+def _ocr_stream_events(ocr_service, files, account_id, request_timings):
+    """Yield NDJSON events while the pages of an upload are OCR'd"""
+    student_name = None
+    school_name = None
+    failed_pages = []
+    documents = {}
+    entry_count = 0
+    
+    def event(payload):
+        return json.dumps(payload, cls=DjangoJSONEncoder) + "\n"
+    
+    try:
+        # PDFs contribute one page each of their pages
+        total_pages = ocr_service.count_pages(files)
+        
+        for page_number, result in enumerate(
+            ocr_service.iter_process_images(files), start=1
+        ):
+            if result.get('error'):
+                failed = _failed_page(result)
+                failed_pages.append(failed)
+                yield event({"event": "error", "page": page_number, **failed})
+                continue
+            
+            if not student_name and result.get('student_name'):
+                student_name = result['student_name']
+            if not school_name and result.get('school_name'):
+                school_name = result['school_name']
+            
+            entries = _save_page_result(
+                account_id, result, files,
+                student_name or "Unknown", school_name or "Unknown", documents
+            )
+            entry_count += len(entries)
+            
+            payload = {
+                "event": "page",
+                "page": page_number,
+                "total_pages": total_pages,
+                "file_name": result.get('file_name'),
+                "page_number": result.get('page_number'),
+                "cached": result.get('cached', False),
+                "ocr_results": entries,
+            }
+            if _expose_timings():
+                payload["timings_ms"] = result.get('timings_ms', {})
+            yield event(payload)
+        
+        summary = {
+            "event": "summary",
+            "student_name": student_name,
+            "school_name": school_name,
+            "total_pages": total_pages,
+            "total_entries": entry_count,
+            "failed_pages": failed_pages,
+            "school_tor": TorService.get_school_tor_reference(),
+        }
+        if _expose_timings():
+            summary["timings_ms"] = {"request": request_timings.as_ms()}
+        yield event(summary)
+    
+    except ServiceException as e:
+        yield event({"event": "error", "error": e.message})
+    
+    except Exception as e:
+        logger.error(f"OCR stream failed: {str(e)}", exc_info=True)
+        yield event({"event": "error", "error": "An unexpected error occurred"})
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@handle_service_exceptions
+def ocr_stream_view(request):
+    """
+    Process uploaded TOR images with OCR, streaming results page by page.
+    
+    POST /api/ocr/stream/
+    
+    Form Data:
+        - images: Multiple image files or multi-page PDFs
+        - account_id: Student account ID
+    
+    Response (application/x-ndjson), one JSON object per line:
+        {"event": "page", "page": 1, "total_pages": 3, "file_name": "...",
+         "page_number": null, "cached": false, "ocr_results": [...]}
+        {"event": "error", "page": 2, "file_name": "...", "page_number": 2,
+         "error": "..."}
+        {"event": "summary", "student_name": "...", "school_name": "...",
+         "total_pages": 3, "total_entries": 42, "failed_pages": [...],
+         "school_tor": [...]}
+    
+    ``page`` counts pages across the whole upload; ``page_number`` is the
+    page within a PDF (null for images). Entries of each page are saved
+    before its event is sent. An error event
+    without a page number means the upload failed as a whole and no summary
+    follows. With DEBUG or OCR_EXPOSE_TIMINGS, page and summary events carry
+    per-stage ``timings_ms``.
+    """
+    request_timings = StageTimings()
+    
+    # Accessing FILES parses (spools) the multipart upload
+    with request_timings.stage('spooling'):
+        files = request.FILES.getlist("images")
+    account_id = request.data.get("account_id")
+    
+    if not files:
+        return APIResponse.error("No images uploaded")
+    
+    if not account_id:
+        return APIResponse.error("account_id is required")
+    
+    # Fail fast (with a normal error response) if OCR is unavailable
+    ocr_service = OCRService()
+    ocr_service.ensure_available()
+    
+    response = StreamingHttpResponse(
+        _ocr_stream_events(ocr_service, files, account_id, request_timings),
+        content_type='application/x-ndjson'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@handle_service_exceptions
+def ocr_job_status(request, job_id):
+    """
+    Get progress and result of a queued OCR job.
+    
+    GET /api/ocr/jobs/<job_id>/
+    
+    Response data contains the job status, per-page progress and, once
+    completed, the same ocr_results/school_tor payload as /api/ocr/.
+    """
+    return APIResponse.success(OcrJobService.get_job_status(job_id))
 
 
 @api_view(['POST'])
@@ -165,6 +479,9 @@ def demo_ocr_view(request):
     
     Form Data:
         - images: Multiple image files
+    
+    Each result carries the extracted fields of one page
+    (DEMO_RESULT_FIELDS); raw OCR boxes and timings are not returned.
     """
     files = request.FILES.getlist("images")
     
@@ -177,27 +494,34 @@ def demo_ocr_view(request):
     # Process images
     all_results = ocr_service.process_images(files)
     
-    return APIResponse.success({"results": all_results})
+    results = [
+        {field: result[field] for field in DEMO_RESULT_FIELDS if field in result}
+        for result in all_results
+    ]
+    
+    return APIResponse.success({"results": results})
 
 
 @api_view(['GET'])
+@handle_service_exceptions
 def tor_transferee_list(request):
     """
-    Get list of TOR transferee entries.
+    Get a page of TOR transferee entries.
     
-    GET /api/tor-transferees/?account_id=STUDENT001
-    """
-    account_id = request.GET.get('account_id')
-    student_name = request.GET.get('student_name')
+    GET /api/tor-transferees/?account_id=STUDENT001&fields=subject_code,final_grade
     
-    entries = TorService.get_tor_entries(
-        account_id=account_id,
-        student_name=student_name
+    Query Params:
+        - account_id, student_name: Filters
+        - fields: Comma-separated fields to return (default: all)
+        - page_size: Entries per page (default 50, max 1000)
+        - cursor: ``next_cursor`` of the previous page
+    """
+    queryset = TorService.filter_tor_entries(
+        account_id=request.GET.get('account_id'),
+        student_name=request.GET.get('student_name')
     )
     
-    serializer = TorTransfereeSerializer(entries, many=True)
-    
-    return APIResponse.success(serializer.data)
+    return _paginate_transferees(request, queryset, TorTransfereePagination())
 
 
 @api_view(['DELETE'])
@@ -232,10 +556,19 @@ def delete_ocr_entries(request):
 @handle_service_exceptions
 def get_tor_statistics(request):
     """
-    Get TOR statistics for an account.
+    Get TOR statistics for an account, or for many accounts at once.
     
     GET /api/tor-statistics/?account_id=STUDENT001
+    GET /api/tor-statistics/?account_ids=STUDENT001,STUDENT002
+    
+    With ``account_ids`` the response maps each account ID to its
+    statistics.
     """
+    account_ids = request.GET.get('account_ids')
+    if account_ids:
+        stats = TorService.get_tor_statistics_bulk(account_ids.split(','))
+        return APIResponse.success(stats)
+    
     account_id = request.GET.get('account_id')
     
     if not account_id:
@@ -244,3 +577,38 @@ def get_tor_statistics(request):
     stats = TorService.get_tor_statistics(account_id)
     
     return APIResponse.success(stats)
+
+
+@api_view(['GET'])
+def ocr_metrics(request):
+    """
+    Export OCR stage histograms of this worker process.
+    
+    GET /api/ocr/metrics/
+    
+    Response is Prometheus text format (ocr_stage_seconds,
+    ocr_page_seconds). Each gunicorn worker keeps its own histograms.
+    """
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+@api_view(['GET'])
+@handle_service_exceptions
+def ocr_pool_stats(request):
+    """
+    Get OCR reader pool statistics for this worker process, or for the
+    OCR sidecar when one is configured.
+    
+    GET /api/ocr/pool/
+    """
+    sidecar = SidecarClient.from_settings()
+    if sidecar:
+        return APIResponse.success(sidecar.stats())
+    
+    if not EASYOCR_AVAILABLE:
+        return APIResponse.error("OCR service not available")
+    
+    return APIResponse.success(get_reader_pool().stats())